@@ -1,13 +1,37 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, g, abort, has_request_context, Response, stream_with_context, make_response
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.exc import IntegrityError
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user, UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_cors import CORS
+from grader import answer_key_cache, GradingTraceStore, serialize_results, deserialize_results
+from stats import SubmissionStatsCache
+from item_analysis import analyze, ItemAnalysisCache
+from ingest import SubmissionQueue, IngestWorkerPool
+from cache import create_cache_backend, QuizCache
+from profiling import RequestProfiler, timed
+from database import engine_options, configure_engine, pool_status, normalize_database_url, ReplicaSet, RoutingSession
+from events import create_submission_events, TooManyConnections
+from regrade import RegradePool, question_rows, answer_key_fingerprint, new_report, update_report
+from similarity import answer_signature, SimilarityIndexCache
+from assets import StaticAssets, build_assets, missing_minifiers, vendor_package, VENDOR_PACKAGES
+import archive
+import migrations
+from question_io import validate_question, iter_records, iter_jsonl_export, iter_csv_export, JSONL_MIMETYPE
+from export import iter_csv, iter_xlsx, format_answer, CSV_MIMETYPE, XLSX_MIMETYPE
 import json
+import re
 import uuid
-from datetime import datetime
+import base64
+import hashlib
+from datetime import datetime, timedelta
+from functools import wraps
+from urllib.parse import quote
 import os
 import sys
+import time
+import threading
+import click
 
 # 環境設置
 ENVIRONMENT = os.environ.get('FLASK_ENV', 'development')
@@ -18,21 +42,95 @@ app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-here')
 # 根據環境選擇數據庫
 if ENVIRONMENT == 'production':
     # 處理 render.com 中的 postgres:// 前綴問題
-    database_url = os.environ.get('DATABASE_URL', '')
-    if database_url.startswith('postgres://'):
-        database_url = database_url.replace('postgres://', 'postgresql://', 1)
-    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_DATABASE_URI'] = normalize_database_url(os.environ.get('DATABASE_URL', ''))
 else:  # development
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///quiz_platform.db'
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# 連線池與逾時設定（DB_POOL_SIZE、DB_POOLER 等環境變數，見 database.py）
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 
-db = SQLAlchemy(app)
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+with app.app_context():
+    pool_statistics = configure_engine(db.engine)
+
+# 唯讀副本：DATABASE_REPLICA_URLS 為逗號分隔的副本網址（未設定時全部使用主資料庫）
+# 成績列表、成績頁、統計分析與匯出等以 @read_replica 標記的頁面由副本讀取；提交與題目編輯等寫入一律使用主資料庫
+replicas = ReplicaSet([url for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()])
+# 寫入後這段秒數內，同一瀏覽器的請求仍讀主資料庫，避免副本尚未同步時看不到自己剛送出的資料
+REPLICA_STICKY_SECONDS = float(os.environ.get('DB_REPLICA_STICKY_SECONDS', 10))
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 CORS(app)
 
+# 請求效能分析：REQUEST_PROFILING=true 時記錄 SQL、模板與評分時間（Server-Timing 標頭與 /metrics）
+request_profiler = None
+if os.environ.get('REQUEST_PROFILING', 'false').lower() == 'true':
+    request_profiler = RequestProfiler(
+        app,
+        duplicate_threshold=int(os.environ.get('PROFILING_DUPLICATE_THRESHOLD', 5)),
+        metrics_token=os.environ.get('METRICS_TOKEN')
+    )
+
+# 靜態資源：flask build-assets 建置的 bundle 與 flask vendor-assets 下載的 MathJax / Font Awesome 由 /static/dist/ 以永久快取提供
+# 動態的 HTML / JSON 回應超過 COMPRESS_MIN_SIZE 位元組時壓縮；已由反向代理壓縮時設 COMPRESS_RESPONSES=false
+static_assets = StaticAssets(
+    app,
+    compress_min_size=int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    if os.environ.get('COMPRESS_RESPONSES', 'true').lower() == 'true' else None,
+    compress_level=int(os.environ.get('COMPRESS_LEVEL', 6))
+)
+
+# 題庫快取（測驗頁面）：CACHE_BACKEND 可設為 memory、sqlite:///路徑 或 redis://...
+# 版本號存在資料庫（QuizBank.cache_version），任何後端下題目變更都會在所有 worker 上失效；共用後端只是讓各 worker 共用渲染結果
+quiz_cache = QuizCache(
+    create_cache_backend(os.environ.get('CACHE_BACKEND', 'memory'), int(os.environ.get('CACHE_MAX_ENTRIES', 256))),
+    local_max_entries=int(os.environ.get('CACHE_MAX_ENTRIES', 256)),
+    ttl=int(os.environ.get('CACHE_TTL', 3600))
+)
+
+# 成績統計快取
+submission_stats_cache = SubmissionStatsCache(ttl=int(os.environ.get('STATS_CACHE_TTL', 30)))
+
+# 成績頁即時推播：EVENTS_BACKEND 可設為 memory 或 redis://...（多個 worker 行程時需使用 redis）
+# 每條串流占用一個請求處理單位，同步 worker 下會讓學生的請求無法處理，gunicorn.conf.py 只在 gthread / gevent 時開啟；
+# 關閉時成績頁改為定期檢查新作答。串流長度需小於 gunicorn 的 timeout
+SSE_ENABLED = os.environ.get('SSE_ENABLED', 'true').lower() == 'true'
+submission_events = create_submission_events(
+    os.environ.get('EVENTS_BACKEND', 'memory'),
+    max_connections=int(os.environ.get('EVENTS_MAX_CONNECTIONS', 200)),
+    max_duration=int(os.environ.get('EVENTS_MAX_DURATION', 45))
+)
+
+# 試題分析快取
+item_analysis_cache = ItemAnalysisCache()
+
+# 相似作答偵測的 LSH 索引（每個行程各自由資料庫中的簽章逐步建立）
+similarity_index_cache = SimilarityIndexCache()
+
+# 評分追蹤：GRADING_TRACE_QUIZ_BANKS 為逗號分隔的題庫ID，預設關閉
+grading_trace = GradingTraceStore(
+    max_entries=int(os.environ.get('GRADING_TRACE_MAX_ENTRIES', 100)),
+    enabled_quiz_banks=[int(x) for x in os.environ.get('GRADING_TRACE_QUIZ_BANKS', '').split(',') if x.strip().isdigit()]
+)
+
+def read_replica(view):
+    """檢視函式中的查詢改由唯讀副本執行"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if replicas and time.time() - session.get('db_written_at', 0) > REPLICA_STICKY_SECONDS:
+            g.db_replica = replicas.choose()
+        return view(*args, **kwargs)
+    return wrapper
+
+@app.after_request
+def remember_primary_write(response):
+    """本次請求寫入過主資料庫時記錄時間（讀到自己的寫入，見 read_replica）"""
+    if replicas and g.get('db_wrote'):
+        session['db_written_at'] = time.time()
+    return response
+
 # 模板過濾器
 @app.template_filter('from_json')
 def from_json_filter(value):
@@ -72,11 +170,16 @@ class QuizBank(db.Model):
     access_code = db.Column(db.String(10), unique=True, nullable=False)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    teacher_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    teacher_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    # 快取版本號：題目或狀態變更時遞增（見 invalidate_quiz_bank）
+    cache_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # 關聯
     questions = db.relationship('Question', backref='quiz_bank', lazy=True, cascade='all, delete-orphan')
     submissions = db.relationship('Submission', backref='quiz_bank', lazy=True)
+    drafts = db.relationship('DraftAttempt', lazy=True, cascade='all, delete-orphan')
+    regrade_jobs = db.relationship('RegradeJob', lazy=True, cascade='all, delete-orphan')
+    archives = db.relationship('SubmissionArchive', lazy=True, cascade='all, delete-orphan')
 
 class Question(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -88,6 +191,10 @@ class Question(db.Model):
     order_index = db.Column(db.Integer, default=0)
     quiz_bank_id = db.Column(db.Integer, db.ForeignKey('quiz_bank.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_question_quiz_bank_order', 'quiz_bank_id', 'order_index'),
+    )
 
 class Submission(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -98,6 +205,104 @@ class Submission(db.Model):
     total_points = db.Column(db.Integer, default=0)
     submitted_at = db.Column(db.DateTime, default=datetime.utcnow)
     quiz_bank_id = db.Column(db.Integer, db.ForeignKey('quiz_bank.id'), nullable=False)
+    
+    
+    # 關聯
+    result = db.relationship('SubmissionResult', backref='submission', uselist=False, lazy=True, cascade='all, delete-orphan')
+    answer_rows = db.relationship('SubmissionAnswer', lazy=True, cascade='all, delete-orphan')
+    receipt = db.relationship('SubmissionReceipt', backref='submission', uselist=False, lazy=True, cascade='all, delete-orphan')
+    signature = db.relationship('AnswerSignature', uselist=False, lazy=True, cascade='all, delete-orphan')
+    
+    __table_args__ = (
+        db.Index('ix_submission_quiz_bank_submitted_at', 'quiz_bank_id', 'submitted_at'),
+        db.Index('ix_submission_quiz_bank_score', 'quiz_bank_id', 'score'),
+    )
+
+class SubmissionReceipt(db.Model):
+    key = db.Column(db.String(64), primary_key=True)  # 收據編號（排隊模式）或學生端送出的冪等鍵
+    submission_id = db.Column(db.Integer, db.ForeignKey('submission.id'), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class DraftAttempt(db.Model):
+    """作答中的草稿：逐題變更合併儲存，提交時轉為正式作答"""
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)  # 亦作為提交的冪等鍵
+    quiz_bank_id = db.Column(db.Integer, db.ForeignKey('quiz_bank.id'), nullable=False, index=True)
+    student_name = db.Column(db.String(100), nullable=False)
+    student_email = db.Column(db.String(120))
+    answers = db.Column(db.Text, default='{}')  # JSON格式儲存目前作答
+    revision = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    submitted_at = db.Column(db.DateTime)
+
+class SubmissionResult(db.Model):
+    submission_id = db.Column(db.Integer, db.ForeignKey('submission.id'), primary_key=True)
+    results = db.Column(db.Text, nullable=False)  # JSON格式儲存逐題評分結果 {題目ID: [是否正確, 得分, 比對方式]}
+
+class SubmissionAnswer(db.Model):
+    """逐題作答（正規化），可在資料庫中依題目篩選與彙總"""
+    submission_id = db.Column(db.Integer, db.ForeignKey('submission.id'), primary_key=True)
+    question_id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # 題目刪除後仍保留作答紀錄，不設外鍵
+    quiz_bank_id = db.Column(db.Integer, nullable=False)
+    answer = db.Column(migrations.ANSWER_JSON)  # PostgreSQL 為 JSONB
+    is_correct = db.Column(db.Boolean, nullable=False)
+    points = db.Column(db.Float, nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_submission_answer_bank_question', 'quiz_bank_id', 'question_id', 'is_correct'),
+    )
+
+class AnswerSignature(db.Model):
+    """作答的 MinHash 簽章，供相似作答偵測使用（見 similarity.py）"""
+    submission_id = db.Column(db.Integer, db.ForeignKey('submission.id'), primary_key=True)
+    quiz_bank_id = db.Column(db.Integer, nullable=False)
+    signature = db.Column(db.LargeBinary)  # 沒有答錯的填空題或排序題時為 NULL
+    
+    __table_args__ = (
+        db.Index('ix_answer_signature_bank_submission', 'quiz_bank_id', 'submission_id'),
+    )
+
+class SubmissionArchive(db.Model):
+    """作答封存檔（見 archive.py）；status 為 archived（作答只在封存檔中）或 rehydrated（已讀回資料表，檔案已刪除）"""
+    id = db.Column(db.Integer, primary_key=True)
+    quiz_bank_id = db.Column(db.Integer, db.ForeignKey('quiz_bank.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='archived')
+    path = db.Column(db.String(500), nullable=False)
+    format = db.Column(db.String(20), nullable=False, default=archive.FORMAT)
+    checksum = db.Column(db.String(64), nullable=False)  # SHA-256
+    size_bytes = db.Column(db.Integer, nullable=False)
+    submission_count = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    rehydrated_at = db.Column(db.DateTime)
+    
+    # 關聯
+    locations = db.relationship('ArchivedSubmission', lazy=True, cascade='all, delete-orphan')
+    
+    __table_args__ = (
+        db.Index('ix_submission_archive_bank_status', 'quiz_bank_id', 'status'),
+    )
+
+class ArchivedSubmission(db.Model):
+    """已封存作答所在的封存檔，成績頁依此找到並讀回作答"""
+    submission_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    archive_id = db.Column(db.Integer, db.ForeignKey('submission_archive.id'), nullable=False, index=True)
+
+class RegradeJob(db.Model):
+    """題目修正後的重新評分工作；last_submission_id 為進度游標，中斷後由此繼續"""
+    id = db.Column(db.Integer, primary_key=True)
+    quiz_bank_id = db.Column(db.Integer, db.ForeignKey('quiz_bank.id'), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, done, failed
+    dry_run = db.Column(db.Boolean, nullable=False, default=False)  # 只計算分數差異，不寫回
+    answer_key_fingerprint = db.Column(db.String(40))  # 開始時的答案鍵指紋，題目再次變更時從頭重新評分
+    total = db.Column(db.Integer, nullable=False, default=0)
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    changed = db.Column(db.Integer, nullable=False, default=0)
+    last_submission_id = db.Column(db.Integer, nullable=False, default=0)
+    report = db.Column(db.Text)  # JSON格式儲存分數差異報告
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -168,9 +373,32 @@ def logout():
 
 @app.route('/teacher-dashboard')
 @login_required
+@read_replica
 def teacher_dashboard():
-    quiz_banks = QuizBank.query.filter_by(teacher_id=current_user.id).all()
-    return render_template('teacher_dashboard.html', quiz_banks=quiz_banks)
+    # 以單一查詢取得題庫與各自的題目數、作答次數，避免逐一載入關聯資料
+    question_count = db.session.query(db.func.count(Question.id)).filter(
+        Question.quiz_bank_id == QuizBank.id
+    ).correlate(QuizBank).scalar_subquery()
+    submission_count = db.session.query(db.func.count(Submission.id)).filter(
+        Submission.quiz_bank_id == QuizBank.id
+    ).correlate(QuizBank).scalar_subquery()
+    archived_count = db.session.query(db.func.coalesce(db.func.sum(SubmissionArchive.submission_count), 0)).filter(
+        SubmissionArchive.quiz_bank_id == QuizBank.id, SubmissionArchive.status == 'archived'
+    ).correlate(QuizBank).scalar_subquery()
+    rows = db.session.query(QuizBank, question_count, submission_count, archived_count).filter(
+        QuizBank.teacher_id == current_user.id
+    ).order_by(QuizBank.id).all()
+    
+    quiz_banks = [bank for bank, _, _, _ in rows]
+    question_counts = {bank.id: count for bank, count, _, _ in rows}
+    # 已封存的作答也計入作答次數
+    submission_counts = {bank.id: count + archived for bank, _, count, archived in rows}
+    return render_template('teacher_dashboard.html',
+                           quiz_banks=quiz_banks,
+                           question_counts=question_counts,
+                           submission_counts=submission_counts,
+                           total_questions=sum(question_counts.values()),
+                           total_submissions=sum(submission_counts.values()))
 
 @app.route('/create-quiz-bank', methods=['GET', 'POST'])
 @login_required
@@ -207,9 +435,7 @@ def manage_quiz_bank(quiz_bank_id):
     questions = Question.query.filter_by(quiz_bank_id=quiz_bank_id).order_by(Question.order_index).all()
     return render_template('manage_quiz_bank.html', quiz_bank=quiz_bank, questions=questions)
 
-@app.route('/quiz/<access_code>')
-def take_quiz(access_code):
-    quiz_bank = QuizBank.query.filter_by(access_code=access_code, is_active=True).first_or_404()
+def render_quiz_page(quiz_bank):
     questions = Question.query.filter_by(quiz_bank_id=quiz_bank.id).order_by(Question.order_index).all()
     
     # 準備題目資料，解析JSON格式的question_data
@@ -228,6 +454,42 @@ def take_quiz(access_code):
     
     return render_template('take_quiz.html', quiz_bank=quiz_bank, questions=questions_data)
 
+@app.route('/quiz/<access_code>')
+def take_quiz(access_code):
+    # 測驗頁面只與題庫內容有關，依題庫版本號快取整頁 HTML；每次只以存取代碼索引查詢題庫ID、版本號與是否開放
+    row = db.session.query(QuizBank.id, QuizBank.cache_version).filter_by(
+        access_code=access_code, is_active=True
+    ).first()
+    if row is None:
+        abort(404)
+    quiz_bank_id, version = row
+    page = quiz_cache.get('quiz-page', quiz_bank_id, version)
+    
+    if page is None:
+        # 版本號在讀取題目之前取得，讀取期間若有變更，寫入的會是已失效的舊版本
+        quiz_bank = db.session.get(QuizBank, quiz_bank_id)
+        body = render_quiz_page(quiz_bank)
+        # 壓縮後的內容與頁面一起快取（同一版本號與 ETag），不必每個請求重新壓縮
+        page = {'etag': hashlib.sha1(body.encode('utf-8')).hexdigest(), 'body': body,
+                'encoded': static_assets.compressed_variants(body)}
+        quiz_cache.set('quiz-page', quiz_bank_id, version, page)
+    
+    response = make_response(page['body'])
+    response.set_etag(page['etag'])
+    response.headers['Cache-Control'] = 'no-cache'
+    return static_assets.use_variant(response.make_conditional(request), page.get('encoded'))
+
+def invalidate_quiz_bank(quiz_bank_id):
+    """題目或題庫狀態變更（已提交）後遞增題庫版本號，所有 worker 與行程上的答案鍵與測驗頁面快取隨之失效"""
+    db.session.execute(
+        db.update(QuizBank).where(QuizBank.id == quiz_bank_id).values(cache_version=QuizBank.cache_version + 1)
+    )
+    db.session.commit()
+    answer_key_cache.invalidate(quiz_bank_id)
+
+def quiz_bank_version(quiz_bank_id):
+    return db.session.query(QuizBank.cache_version).filter(QuizBank.id == quiz_bank_id).scalar()
+
 # API 路由
 @app.route('/api/quiz-bank/<int:quiz_bank_id>/toggle', methods=['POST'])
 @login_required
@@ -238,6 +500,7 @@ def toggle_quiz_bank(quiz_bank_id):
     
     quiz_bank.is_active = not quiz_bank.is_active
     db.session.commit()
+    invalidate_quiz_bank(quiz_bank_id)
     
     return jsonify({'message': '操作成功', 'is_active': quiz_bank.is_active})
 
@@ -251,6 +514,7 @@ def delete_quiz_bank(quiz_bank_id):
     try:
         db.session.delete(quiz_bank)
         db.session.commit()
+        invalidate_quiz_bank(quiz_bank_id)
         return jsonify({'message': '題庫已成功刪除'})
     except Exception as e:
         db.session.rollback()
@@ -298,9 +562,92 @@ def manage_questions(quiz_bank_id):
         
         db.session.add(question)
         db.session.commit()
+        invalidate_quiz_bank(quiz_bank_id)
         
         return jsonify({'message': '題目新增成功', 'question_id': question.id})
 
+QUESTION_IMPORT_BATCH_SIZE = 200
+QUESTION_IMPORT_MAX_ERRORS = 100
+
+@app.route('/api/quiz-bank/<int:quiz_bank_id>/questions/import', methods=['POST'])
+@login_required
+def import_questions(quiz_bank_id):
+    """批次匯入題目：請求本文為 JSON Lines（預設）或 CSV，逐行檢查後分批寫入；有錯誤的行會略過並回報"""
+    quiz_bank = QuizBank.query.get_or_404(quiz_bank_id)
+    if quiz_bank.teacher_id != current_user.id:
+        return jsonify({'error': '無權限操作'}), 403
+    
+    file_format = request.args.get('format') or ('csv' if request.mimetype == 'text/csv' else 'jsonl')
+    if file_format not in ('jsonl', 'csv'):
+        return jsonify({'error': '不支援的匯入格式'}), 400
+    dry_run = request.args.get('dry_run') == '1'
+    
+    # 排序位置只查詢一次，之後依序遞增
+    next_order = (db.session.query(db.func.max(Question.order_index)).filter_by(quiz_bank_id=quiz_bank_id).scalar() or 0) + 1
+    imported = 0
+    error_count = 0
+    errors = []
+    batch = []
+    
+    def flush():
+        if batch and not dry_run:
+            db.session.execute(db.insert(Question), batch)
+            db.session.commit()
+        batch.clear()
+    
+    for line_number, record, parse_error in iter_records(request.stream, file_format):
+        values, problems = (None, [parse_error]) if parse_error else validate_question(record)
+        if problems:
+            error_count += 1
+            if len(errors) < QUESTION_IMPORT_MAX_ERRORS:
+                errors.append({'line': line_number, 'errors': problems})
+            continue
+        values.update(order_index=next_order, quiz_bank_id=quiz_bank_id)
+        next_order += 1
+        batch.append(values)
+        imported += 1
+        if len(batch) >= QUESTION_IMPORT_BATCH_SIZE:
+            flush()
+    flush()
+    
+    if imported and not dry_run:
+        invalidate_quiz_bank(quiz_bank_id)
+    return jsonify({
+        'message': '檢查完成' if dry_run else '匯入完成',
+        'imported': 0 if dry_run else imported,
+        'valid': imported,
+        'error_count': error_count,
+        'errors': errors
+    })
+
+@app.route('/api/quiz-bank/<int:quiz_bank_id>/questions/export')
+@login_required
+def export_questions(quiz_bank_id):
+    """串流匯出題目（JSON Lines 或 CSV），可再匯入其他題庫"""
+    quiz_bank = QuizBank.query.get_or_404(quiz_bank_id)
+    if quiz_bank.teacher_id != current_user.id:
+        return jsonify({'error': '無權限操作'}), 403
+    
+    file_format = request.args.get('format', 'jsonl')
+    if file_format not in ('jsonl', 'csv'):
+        return jsonify({'error': '不支援的匯出格式'}), 400
+    
+    # 只選取需要的欄位，分批讀取
+    questions = db.session.query(
+        Question.title, Question.question_text, Question.question_type, Question.points, Question.question_data
+    ).filter_by(quiz_bank_id=quiz_bank_id).order_by(
+        Question.order_index, Question.id
+    ).execution_options(yield_per=200)
+    if file_format == 'csv':
+        body, mimetype = iter_csv_export(questions), CSV_MIMETYPE
+    else:
+        body, mimetype = iter_jsonl_export(questions), JSONL_MIMETYPE
+    
+    filename = f'{quiz_bank.title}_題目.{file_format}'
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f"attachment; filename=questions.{file_format}; filename*=UTF-8''{quote(filename)}"
+    return response
+
 @app.route('/api/question/<int:question_id>', methods=['PUT', 'DELETE'])
 @login_required
 def manage_question(question_id):
@@ -312,6 +659,8 @@ def manage_question(question_id):
     
     if request.method == 'PUT':
         data = request.get_json()
+        # 以解析後的內容比較：匯入或舊資料的 JSON 鍵順序、格式不同時不算變更
+        grading = (question.question_type, json.loads(question.question_data or '{}'), question.points)
         question.title = data.get('title', question.title)
         question.question_text = data.get('question_text', question.question_text)
         question.question_type = data.get('question_type', question.question_type)
@@ -319,12 +668,98 @@ def manage_question(question_id):
         question.points = data.get('points', question.points)
         
         db.session.commit()
-        return jsonify({'message': '題目更新成功'})
+        invalidate_quiz_bank(quiz_bank.id)
+        # 題型、答案或配分變更時，既有作答的分數需重新評分（見 /api/quiz-bank/<id>/regrade）
+        affected = 0
+        if grading != (question.question_type, data.get('question_data', {}), question.points):
+            affected = regradable_submission_count(quiz_bank.id)
+        return jsonify({'message': '題目更新成功', 'affected_submissions': affected})
     
     elif request.method == 'DELETE':
         db.session.delete(question)
         db.session.commit()
-        return jsonify({'message': '題目刪除成功'})
+        invalidate_quiz_bank(quiz_bank.id)
+        affected = regradable_submission_count(quiz_bank.id)
+        return jsonify({'message': '題目刪除成功', 'affected_submissions': affected})
+
+def regradable_submission_count(quiz_bank_id):
+    """重新評分會處理的作答數；已封存的作答不在重新評分範圍內"""
+    return db.session.query(db.func.count(Submission.id)).filter(
+        Submission.quiz_bank_id == quiz_bank_id,
+        ~db.exists().where(ArchivedSubmission.submission_id == Submission.id)
+    ).scalar()
+
+def get_answer_key(quiz_bank_id, questions=None):
+    """取得題庫的答案鍵（快取；版本號改變時重新編譯，其他 worker 上的題目變更也會生效）"""
+    return answer_key_cache.get(
+        quiz_bank_id,
+        lambda: questions if questions is not None else
+        Question.query.filter_by(quiz_bank_id=quiz_bank_id).order_by(Question.order_index).all(),
+        version=quiz_bank_version(quiz_bank_id)
+    )
+
+def build_submission(quiz_bank_id, student_name, student_email, answers, trace=None):
+    """評分並建立 Submission（含逐題結果），尚未加入 session"""
+    with timed('grading'):
+        answer_key = get_answer_key(quiz_bank_id)
+        grade_result = answer_key.grade(answers, trace=trace)
+    submission = Submission(
+        student_name=student_name,
+        student_email=student_email,
+        answers=json.dumps(answers),
+        score=grade_result.score,
+        total_points=grade_result.total_points,
+        quiz_bank_id=quiz_bank_id
+    )
+    submission.result = SubmissionResult(results=serialize_results(grade_result.results))
+    answer_rows = answer_row_values(quiz_bank_id, answer_key, answers, grade_result)
+    submission.answer_rows = [SubmissionAnswer(**row) for row in answer_rows]
+    submission.signature = AnswerSignature(quiz_bank_id=quiz_bank_id, signature=signature_for(answer_key, answer_rows))
+    return submission, grade_result
+
+def answer_row_values(quiz_bank_id, answer_key, answers, grade_result, submission_id=None):
+    """逐題作答資料列（SubmissionAnswer 的欄位值）"""
+    rows = []
+    for item, result in zip(answer_key.items, grade_result.results):
+        row = {'question_id': item.question_id, 'quiz_bank_id': quiz_bank_id,
+               'answer': answers.get(item.answer_id) if isinstance(answers, dict) else None,
+               'is_correct': result.is_correct, 'points': result.points}
+        if submission_id is not None:
+            row['submission_id'] = submission_id
+        rows.append(row)
+    return rows
+
+def signature_for(answer_key, answer_rows):
+    """由逐題作答資料列計算相似作答偵測用的簽章"""
+    return answer_signature(
+        {item.question_id: item.question_type for item in answer_key.items},
+        [(row['question_id'], row['answer'], row['is_correct']) for row in answer_rows]
+    )
+
+def submission_summary(submission):
+    """提交後回傳給學生的分數摘要"""
+    return {
+        'score': submission.score,
+        'total_points': submission.total_points,
+        'percentage': round(submission_percentage(submission.score, submission.total_points), 2),
+        'submission_id': submission.id
+    }
+
+# 學生端每次作答產生一個冪等鍵，重送時沿用，伺服器以此避免重複建立作答
+IDEMPOTENCY_KEY_RE = re.compile(r'^[A-Za-z0-9_-]{16,64}$')
+
+def find_idempotent_submission(quiz_bank_id, idempotency_key):
+    """回傳 (既有作答或 None, 是否屬於其他題庫)"""
+    receipt = db.session.get(SubmissionReceipt, idempotency_key)
+    if receipt is None:
+        return None, False
+    submission = receipt.submission
+    return submission, submission.quiz_bank_id != quiz_bank_id
+
+def replay_submission(submission):
+    response = jsonify(dict(message='測驗提交成功', **submission_summary(submission)))
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
 
 @app.route('/api/quiz/<access_code>/submit', methods=['POST'])
 def submit_quiz(access_code):
@@ -338,311 +773,286 @@ def submit_quiz(access_code):
     if not student_name:
         return jsonify({'error': '請輸入姓名'}), 400
     
-    # 計算分數
-    questions = Question.query.filter_by(quiz_bank_id=quiz_bank.id).all()
-    total_points = sum(q.points for q in questions)
-    score = 0
+    idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+    if idempotency_key:
+        if not IDEMPOTENCY_KEY_RE.match(idempotency_key):
+            return jsonify({'error': '無效的 Idempotency-Key'}), 400
+        # 重送：已建立的作答直接回傳原結果，不重新評分
+        existing, conflict = find_idempotent_submission(quiz_bank.id, idempotency_key)
+        if conflict:
+            return jsonify({'error': '此 Idempotency-Key 已用於其他測驗'}), 409
+        if existing is not None:
+            return replay_submission(existing)
     
-    for question in questions:
-        question_data = json.loads(question.question_data) if question.question_data else {}
-        user_answer = answers.get(str(question.id))
-        
-        if question.question_type in ['single_choice', 'dropdown']:
-            correct_answer = question_data.get('correct_answer')
-            
-            # 調試信息
-            # 注意：LaTeX 語法會保留在原始文本中進行比對，確保數學公式的準確性
-            print(f"Question {question.id} ({question.question_type}): {question.title}")
-            print(f"  User answer: {repr(user_answer)} (type: {type(user_answer)})")
-            print(f"  Correct answer: {repr(correct_answer)} (type: {type(correct_answer)})")
-            
-            # 特殊處理：檢查是否是JSON轉義問題
-            if user_answer and correct_answer:
-                print(f"  User answer length: {len(str(user_answer))}")
-                print(f"  Correct answer length: {len(str(correct_answer))}")
-                print(f"  User answer first 100 chars: {repr(str(user_answer)[:100])}")
-                print(f"  Correct answer first 100 chars: {repr(str(correct_answer)[:100])}")
-            
-            # 多行文本比較策略
-            is_correct = False
-            comparison_method = ""
-            
-            # 1. 直接比較
-            if user_answer == correct_answer:
-                is_correct = True
-                comparison_method = "exact_match"
-            
-            # 2. 字符串化後比較
-            elif str(user_answer) == str(correct_answer):
-                is_correct = True
-                comparison_method = "string_match"
-            
-            # 3. 標準化比較（去除前後空白）
-            elif str(user_answer).strip() == str(correct_answer).strip():
-                is_correct = True
-                comparison_method = "normalized_match"
-            
-            # 4. 換行符標準化比較
-            else:
-                import re
-                # 統一換行符為 \n
-                user_normalized = str(user_answer).replace('\r\n', '\n').replace('\r', '\n').strip() if user_answer else ""
-                correct_normalized = str(correct_answer).replace('\r\n', '\n').replace('\r', '\n').strip() if correct_answer else ""
-                
-                if user_normalized == correct_normalized:
-                    is_correct = True
-                    comparison_method = "newline_normalized_match"
-                
-                # 5. 深度清理比較（保持行結構但標準化空白）
-                elif not is_correct:
-                    # 分行處理，每行內部標準化空白，但保持行結構
-                    def normalize_multiline_code(text):
-                        if not text:
-                            return ""
-                        print(f"    Normalizing: {repr(text[:100])}")
-                        # 統一換行符
-                        text = text.replace('\r\n', '\n').replace('\r', '\n')
-                        lines = text.split('\n')
-                        normalized_lines = []
-                        for i, line in enumerate(lines):
-                            # 保持行首縮排，但標準化其他空白
-                            stripped = line.rstrip()  # 去除行尾空白
-                            if stripped:
-                                # 計算行首空白
-                                leading_spaces = len(line) - len(line.lstrip())
-                                # 將制表符轉換為4個空格
-                                content = line.lstrip().replace('\t', '    ')
-                                # 標準化內容中的多餘空白
-                                content = re.sub(r' +', ' ', content)
-                                normalized_lines.append(' ' * leading_spaces + content)
-                                print(f"    Line {i}: {repr(line)} -> {repr(' ' * leading_spaces + content)}")
-                            else:
-                                normalized_lines.append('')
-                                print(f"    Line {i}: empty")
-                        result = '\n'.join(normalized_lines).strip()
-                        print(f"    Result: {repr(result[:100])}")
-                        return result
-                    
-                    user_multiline_clean = normalize_multiline_code(user_answer)
-                    correct_multiline_clean = normalize_multiline_code(correct_answer)
-                    
-                    if user_multiline_clean == correct_multiline_clean:
-                        is_correct = True
-                        comparison_method = "multiline_normalized_match"
-                    
-                    # 6. 最後的降級比較（完全忽略空白結構）
-                    elif not is_correct:
-                        # 移除所有空白字符後比較
-                        user_no_whitespace = re.sub(r'\s+', '', str(user_answer)) if user_answer else ""
-                        correct_no_whitespace = re.sub(r'\s+', '', str(correct_answer)) if correct_answer else ""
-                        
-                        print(f"  Whitespace removed comparison:")
-                        print(f"    User: {repr(user_no_whitespace[:50])}")
-                        print(f"    Correct: {repr(correct_no_whitespace[:50])}")
-                        
-                        if user_no_whitespace == correct_no_whitespace:
-                            is_correct = True
-                            comparison_method = "whitespace_ignored_match"
-                        
-                        # 7. 終極比較：處理可能的JSON轉義問題
-                        elif not is_correct:
-                            try:
-                                # 嘗試解碼可能的JSON轉義
-                                import json as json_module
-                                user_decoded = user_answer
-                                correct_decoded = correct_answer
-                                
-                                # 如果看起來像JSON字符串，嘗試解碼
-                                if isinstance(user_answer, str) and (user_answer.startswith('"') or '\\n' in user_answer):
-                                    try:
-                                        user_decoded = json_module.loads('"' + user_answer.replace('"', '\\"') + '"')
-                                    except:
-                                        pass
-                                
-                                if isinstance(correct_answer, str) and (correct_answer.startswith('"') or '\\n' in correct_answer):
-                                    try:
-                                        correct_decoded = json_module.loads('"' + correct_answer.replace('"', '\\"') + '"')
-                                    except:
-                                        pass
-                                
-                                print(f"  JSON decode attempt:")
-                                print(f"    User decoded: {repr(user_decoded[:50])}")
-                                print(f"    Correct decoded: {repr(correct_decoded[:50])}")
-                                
-                                if user_decoded == correct_decoded:
-                                    is_correct = True
-                                    comparison_method = "json_decoded_match"
-                                
-                            except Exception as e:
-                                print(f"  JSON decode error: {e}")
-            
-            print(f"  Match result: {is_correct} (method: {comparison_method})")
-            
-            if is_correct:
-                score += question.points
-                print(f"  ✓ Correct! Points added: {question.points}")
-            else:
-                print(f"  ✗ Incorrect!")
-                # 詳細錯誤分析
-                if user_answer and correct_answer:
-                    print(f"  User length: {len(str(user_answer))}, Correct length: {len(str(correct_answer))}")
-                    
-                    # 顯示前50個字符的差異
-                    user_str = str(user_answer)
-                    correct_str = str(correct_answer)
-                    max_check = min(50, max(len(user_str), len(correct_str)))
-                    
-                    for i in range(max_check):
-                        u_char = user_str[i] if i < len(user_str) else '(end)'
-                        c_char = correct_str[i] if i < len(correct_str) else '(end)'
-                        
-                        if u_char != c_char:
-                            print(f"  First diff at pos {i}: user='{u_char}' (ord {ord(u_char) if u_char != '(end)' else 'N/A'}), correct='{c_char}' (ord {ord(c_char) if c_char != '(end)' else 'N/A'})")
-                            break
-                
-        elif question.question_type == 'dropdown_fillblank':
-            # 下拉選單填空題評分
-            blanks_data = question_data.get('blanks', [])
-            user_answers = user_answer if isinstance(user_answer, dict) else {}
-            
-            # 檢查所有空格是否都回答正確
-            all_correct = True
-            for i, blank in enumerate(blanks_data):
-                blank_id = f"blank_{i}"
-                correct_answer = blank.get('correct_answer')
-                user_blank_answer = user_answers.get(blank_id)
-                if user_blank_answer != correct_answer:
-                    all_correct = False
-                    break
-            
-            if all_correct and len(user_answers) == len(blanks_data):
-                score += question.points
-                
-        elif question.question_type == 'multiple_choice':
-            correct_answers = set(question_data.get('correct_answers', []))
-            user_answers = set(user_answer if isinstance(user_answer, list) else [])
-            if user_answers == correct_answers:
-                score += question.points
-                
-        elif question.question_type == 'fill_blank':
-            # 填空題比對：LaTeX 語法會被保留並比對，確保數學公式準確性
-            correct_answer = question_data.get('correct_answer', '').lower().strip()
-            user_answer_clean = (user_answer or '').lower().strip()
-            if user_answer_clean == correct_answer:
-                score += question.points
-                
-        elif question.question_type == 'parsons':
-            # 處理程式排序題
-            print(f"Question {question.id} - Parsons type")
-            print(f"  Question data: {question_data}")
-            print(f"  User answer: {user_answer}")
-            
-            # 新格式：使用slot_answers比對
-            if 'slot_answers' in question_data and isinstance(user_answer, dict) and 'slot_answers' in user_answer:
-                correct_slot_answers = question_data.get('slot_answers', {})
-                user_slot_answers = user_answer.get('slot_answers', {})
-                fixed_blocks = question_data.get('fixed_blocks', {})  # 獲取固定區塊
-                
-                print(f"  New format - Correct slot answers: {correct_slot_answers}")
-                print(f"  New format - User slot answers: {user_slot_answers}")
-                print(f"  Fixed blocks positions: {list(fixed_blocks.keys())}")
-                
-                # 過濾掉固定區塊位置的正確答案（防止老師誤設定）
-                correct_slot_answers_filtered = {
-                    slot: label for slot, label in correct_slot_answers.items()
-                    if slot not in fixed_blocks
-                }
-                print(f"  Filtered correct answers (excluding fixed blocks): {correct_slot_answers_filtered}")
-                
-                # 比較每個空格的答案是否正確
-                all_correct = True
-                for slot_num, correct_label in correct_slot_answers_filtered.items():
-                    user_label = user_slot_answers.get(str(slot_num))
-                    print(f"    Slot {slot_num}: user={user_label}, correct={correct_label}")
-                    if user_label != correct_label:
-                        all_correct = False
-                        break
-                
-                # 檢查數量是否匹配（使用過濾後的正確答案）
-                if all_correct and len(user_slot_answers) == len(correct_slot_answers_filtered):
-                    score += question.points
-                    print(f"  ✓ Correct! Points added: {question.points}")
-                else:
-                    print(f"  ✗ Incorrect! Expected {len(correct_slot_answers_filtered)} answers, got {len(user_slot_answers)}")
-            
-            # 舊格式兼容：使用correct_order比對
-            elif 'correct_order' in question_data:
-                correct_order = question_data.get('correct_order', [])
-                
-                # 檢查答案格式並提取答案
-                user_order = []
-                
-                # 新的複合格式 {order: [...], slots: {...}}
-                if isinstance(user_answer, dict) and 'order' in user_answer:
-                    user_order = user_answer['order'] if isinstance(user_answer['order'], list) else []
-                
-                # 字典格式 {1: "code1", 2: "code2", ...}
-                elif isinstance(user_answer, dict) and 'slot_answers' in user_answer:
-                    # 從slot_answers提取順序
-                    slot_answers = user_answer['slot_answers']
-                    sorted_slots = sorted([int(k) for k in slot_answers.keys()])
-                    user_order = [slot_answers[str(slot)] for slot in sorted_slots]
-                
-                # 舊的字典格式 {1: "code1", 2: "code2", ...}
-                elif isinstance(user_answer, dict):
-                    # 將字典轉換為列表
-                    for i in range(1, len(correct_order) + 1):
-                        if str(i) in user_answer:
-                            user_order.append(user_answer[str(i)])
-                        elif i in user_answer:
-                            user_order.append(user_answer[i])
-                
-                # 列表格式 ["code1", "code2", ...]
-                elif isinstance(user_answer, list):
-                    user_order = user_answer
-                
-                print(f"  Old format - User order: {user_order}")
-                print(f"  Old format - Correct order: {correct_order}")
-                
-                # 比較順序是否正確
-                if len(user_order) == len(correct_order) and all(a == b for a, b in zip(user_order, correct_order)):
-                    score += question.points
-                    print(f"  ✓ Correct! Points added: {question.points}")
-                else:
-                    print(f"  ✗ Incorrect!")
+    return accept_submission(quiz_bank, student_name, student_email, answers, idempotency_key)
+
+def accept_submission(quiz_bank, student_name, student_email, answers, idempotency_key=None):
+    """評分並儲存作答（排隊模式則寫入佇列），回傳給學生端的回應"""
+    access_code = quiz_bank.access_code
+    # 排隊模式：寫入佇列後立即回傳收據，由背景 worker 評分與寫入
+    if submission_queue is not None:
+        receipt = submission_queue.enqueue(quiz_bank.id, {
+            'student_name': student_name,
+            'student_email': student_email,
+            'answers': answers
+        }, receipt=idempotency_key)
+        if idempotency_key and submission_queue.status(receipt)['quiz_bank_id'] != quiz_bank.id:
+            return jsonify({'error': '此 Idempotency-Key 已用於其他測驗'}), 409
+        ingest_workers.notify()
+        return jsonify({
+            'message': '作答已送出，評分中',
+            'receipt': receipt,
+            'status_url': url_for('submission_status', access_code=access_code, receipt=receipt)
+        }), 202
     
-    # 儲存結果
-    submission = Submission(
-        student_name=student_name,
-        student_email=student_email,
-        answers=json.dumps(answers),
-        score=score,
-        total_points=total_points,
-        quiz_bank_id=quiz_bank.id
-    )
+    # 計算分數（使用快取的答案鍵）
+    trace = None
+    if grading_trace.is_enabled(quiz_bank.id, request.headers.get('X-Grading-Trace') == '1'):
+        trace = []
+        grading_started = time.perf_counter()
+    submission, grade_result = build_submission(quiz_bank.id, student_name, student_email, answers, trace=trace)
+    if trace is not None:
+        grading_elapsed_ms = (time.perf_counter() - grading_started) * 1000
     
+    # 儲存結果
+    if idempotency_key:
+        submission.receipt = SubmissionReceipt(key=idempotency_key)
     db.session.add(submission)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # 同一冪等鍵的重送同時抵達，以先寫入的作答為準
+        db.session.rollback()
+        existing, conflict = find_idempotent_submission(quiz_bank.id, idempotency_key) if idempotency_key else (None, False)
+        if existing is None or conflict:
+            raise
+        return replay_submission(existing)
+    submission_stats_cache.record_submission(quiz_bank.id, submission_percentage(submission.score, submission.total_points))
+    publish_submission_event(submission)
+    
+    if trace is not None:
+        grading_trace.record(quiz_bank.id, submission.id, grade_result, trace, grading_elapsed_ms)
+    
+    return jsonify(dict(message='測驗提交成功', **submission_summary(submission)))
+
+# 作答草稿：同一份草稿兩次儲存的最短間隔（秒）；用戶端在間隔內累積變更，下次一起送出
+DRAFT_SAVE_INTERVAL = float(os.environ.get('DRAFT_SAVE_INTERVAL', 5))
+DRAFT_MAX_CHANGES = 500
+
+def load_draft(quiz_bank_id, draft_id, for_update=False):
+    query = DraftAttempt.query.filter_by(id=draft_id, quiz_bank_id=quiz_bank_id)
+    if for_update:
+        query = query.with_for_update()
+    return query.first()
+
+def parse_draft_changes(data):
+    """取出 {題目ID: 作答} 的變更；作答為 null 表示清除該題"""
+    changes = (data or {}).get('changes', {})
+    if not isinstance(changes, dict) or len(changes) > DRAFT_MAX_CHANGES:
+        return None
+    return {str(question_id): answer for question_id, answer in changes.items()}
+
+def apply_draft_changes(draft, changes):
+    """將變更合併進草稿（同一題只保留最新作答），回傳合併後的作答"""
+    answers = json.loads(draft.answers) if draft.answers else {}
+    for question_id, answer in changes.items():
+        if answer is None:
+            answers.pop(question_id, None)
+        else:
+            answers[question_id] = answer
+    draft.answers = json.dumps(answers, ensure_ascii=False)
+    draft.revision += 1
+    draft.updated_at = datetime.utcnow()
+    return answers
+
+@app.route('/api/quiz/<access_code>/drafts', methods=['POST'])
+def create_draft(access_code):
+    quiz_bank = QuizBank.query.filter_by(access_code=access_code, is_active=True).first_or_404()
+    data = request.get_json() or {}
+    student_name = (data.get('student_name') or '').strip()
+    if not student_name:
+        return jsonify({'error': '請輸入姓名'}), 400
+    
+    draft = DraftAttempt(quiz_bank_id=quiz_bank.id, student_name=student_name,
+                         student_email=data.get('student_email', ''))
+    db.session.add(draft)
+    db.session.commit()
+    return jsonify({'draft_id': draft.id, 'revision': draft.revision, 'save_interval': DRAFT_SAVE_INTERVAL}), 201
+
+@app.route('/api/quiz/<access_code>/drafts/<draft_id>', methods=['GET', 'PATCH'])
+def manage_draft(access_code, draft_id):
+    quiz_bank = QuizBank.query.filter_by(access_code=access_code, is_active=True).first_or_404()
+    
+    if request.method == 'GET':
+        draft = load_draft(quiz_bank.id, draft_id)
+        if draft is None:
+            return jsonify({'error': '找不到作答草稿'}), 404
+        return jsonify({
+            'draft_id': draft.id,
+            'student_name': draft.student_name,
+            'student_email': draft.student_email,
+            'answers': json.loads(draft.answers) if draft.answers else {},
+            'revision': draft.revision,
+            'submitted': draft.submitted_at is not None
+        })
+    
+    changes = parse_draft_changes(request.get_json())
+    if changes is None:
+        return jsonify({'error': '無效的作答變更'}), 400
+    draft = load_draft(quiz_bank.id, draft_id, for_update=bool(changes))
+    if draft is None:
+        return jsonify({'error': '找不到作答草稿'}), 404
+    if draft.submitted_at is not None:
+        return jsonify({'error': '此作答已提交'}), 409
+    if not changes:
+        return jsonify({'revision': draft.revision})
+    
+    # 限制儲存頻率：間隔內的請求不寫入，由用戶端保留變更稍後重送
+    elapsed = (datetime.utcnow() - draft.updated_at).total_seconds()
+    if draft.revision and elapsed < DRAFT_SAVE_INTERVAL:
+        db.session.rollback()
+        retry_after = max(1, int(DRAFT_SAVE_INTERVAL - elapsed + 0.999))
+        response = jsonify({'error': '儲存過於頻繁，請稍後再試', 'retry_after': retry_after})
+        response.headers['Retry-After'] = str(retry_after)
+        return response, 429
+    
+    apply_draft_changes(draft, changes)
     db.session.commit()
+    return jsonify({'revision': draft.revision})
+
+@app.route('/api/quiz/<access_code>/drafts/<draft_id>/submit', methods=['POST'])
+def submit_draft(access_code, draft_id):
+    """以草稿內容提交作答；請求只需帶上次儲存後的變更。草稿編號同時作為冪等鍵，重送不會重複建立作答"""
+    quiz_bank = QuizBank.query.filter_by(access_code=access_code, is_active=True).first_or_404()
+    changes = parse_draft_changes(request.get_json())
+    if changes is None:
+        return jsonify({'error': '無效的作答變更'}), 400
+    
+    existing, _ = find_idempotent_submission(quiz_bank.id, draft_id)
+    if existing is not None:
+        return replay_submission(existing)
+    draft = load_draft(quiz_bank.id, draft_id, for_update=True)
+    if draft is None:
+        return jsonify({'error': '找不到作答草稿'}), 404
+    
+    answers = apply_draft_changes(draft, changes)
+    draft.submitted_at = datetime.utcnow()
+    student_name, student_email = draft.student_name, draft.student_email
+    db.session.commit()
+    return accept_submission(quiz_bank, student_name, student_email, answers, idempotency_key=draft_id)
+
+def publish_submission_event(submission):
+    """推播新作答給開啟中的成績頁；統計只在本行程已快取時附上，否則由成績頁自行重新查詢"""
+    submission_events.publish(submission.quiz_bank_id, 'submission', {
+        'submission': {
+            'id': submission.id,
+            'rank': None,  # 名次在重新載入列表時才計算
+            'student_name': submission.student_name,
+            'student_email': submission.student_email,
+            'score': submission.score,
+            'total_points': submission.total_points,
+            'percentage': round(submission_percentage(submission.score, submission.total_points), 2),
+            'submitted_at': submission.submitted_at.strftime('%Y-%m-%d %H:%M:%S')
+        },
+        'stats': submission_stats_cache.summary(submission.quiz_bank_id)
+    })
+
+def process_submission_batch(entries):
+    """背景 worker 的批次處理：評分後一次寫入，收據已存在的項目直接回傳既有結果"""
+    with app.app_context():
+        receipts = [entry['receipt'] for entry in entries]
+        existing = dict(db.session.query(SubmissionReceipt.key, SubmissionReceipt.submission_id).filter(
+            SubmissionReceipt.key.in_(receipts)
+        ).all())
+        
+        new_submissions = []
+        for entry in entries:
+            if entry['receipt'] in existing:
+                continue
+            payload = entry['payload']
+            submission, _ = build_submission(entry['quiz_bank_id'], payload.get('student_name'),
+                                             payload.get('student_email', ''), payload.get('answers', {}))
+            submission.receipt = SubmissionReceipt(key=entry['receipt'])
+            new_submissions.append(submission)
+        
+        db.session.add_all(new_submissions)
+        db.session.commit()
+        for submission in new_submissions:
+            submission_stats_cache.record_submission(
+                submission.quiz_bank_id, submission_percentage(submission.score, submission.total_points))
+            publish_submission_event(submission)
+        
+        results = {submission.receipt.key: submission_summary(submission) for submission in new_submissions}
+        if existing:
+            for submission in Submission.query.filter(Submission.id.in_(existing.values())).all():
+                results[submission.receipt.key] = submission_summary(submission)
+        return results
+
+@app.route('/api/quiz/<access_code>/submission/<receipt>')
+def submission_status(access_code, receipt):
+    quiz_bank = QuizBank.query.filter_by(access_code=access_code).first_or_404()
+    status = submission_queue.status(receipt) if submission_queue is not None else None
+    if status is None or status['quiz_bank_id'] != quiz_bank.id:
+        return jsonify({'error': '找不到此作答'}), 404
     
+    response = {'receipt': receipt, 'status': status['status']}
+    if status['result']:
+        response.update(status['result'])
+    if status['error']:
+        response['error'] = '評分失敗，請聯繫老師'
+    return jsonify(response)
+
+@app.route('/api/quiz-bank/<int:quiz_bank_id>/grading-trace', methods=['GET', 'POST', 'DELETE'])
+@login_required
+def manage_grading_trace(quiz_bank_id):
+    quiz_bank = QuizBank.query.get_or_404(quiz_bank_id)
+    if quiz_bank.teacher_id != current_user.id:
+        return jsonify({'error': '無權限操作'}), 403
+    
+    if request.method == 'POST':
+        # 開啟/關閉題庫的評分追蹤
+        data = request.get_json() or {}
+        grading_trace.set_enabled(quiz_bank_id, bool(data.get('enabled', True)))
+    elif request.method == 'DELETE':
+        grading_trace.clear(quiz_bank_id)
+    
+    limit = request.args.get('limit', type=int)
     return jsonify({
-        'message': '測驗提交成功',
-        'score': score,
-        'total_points': total_points,
-        'percentage': round((score / total_points * 100) if total_points > 0 else 0, 2),
-        'submission_id': submission.id
+        'enabled': grading_trace.is_quiz_bank_enabled(quiz_bank_id),
+        'traces': grading_trace.get(quiz_bank_id, limit)
     })
 
+def load_question_results(submission, student_answers):
+    """讀取提交時儲存的逐題評分結果；尚未回填的舊資料則即時評分（不寫回）"""
+    if submission.result is not None:
+        return deserialize_results(submission.result.results)
+    with timed('grading'):
+        return {r.question_id: r for r in get_answer_key(submission.quiz_bank_id).grade(student_answers).results}
+
 @app.route('/result/<int:submission_id>')
+@read_replica
 def view_result(submission_id):
-    submission = Submission.query.get_or_404(submission_id)
+    submission = db.session.get(Submission, submission_id)
+    if submission is None:
+        # 副本可能尚未同步剛提交的作答，改由主資料庫讀取；已封存的作答先讀回資料表
+        g.db_replica = None
+        submission = db.session.get(Submission, submission_id)
+        if submission is None and rehydrate_submission(submission_id):
+            submission = db.session.get(Submission, submission_id)
+        if submission is None:
+            abort(404)
     
     # 獲取題目和答案詳情
     questions = Question.query.filter_by(quiz_bank_id=submission.quiz_bank_id).order_by(Question.order_index).all()
+    with timed('json'):
+        question_data_by_id = {q.id: from_json_filter(q.question_data) for q in questions}
+        # 解析學生答案
+        student_answers = json.loads(submission.answers) if submission.answers else {}
+    question_results = load_question_results(submission, student_answers)
     
-    # 解析學生答案
-    student_answers = json.loads(submission.answers) if submission.answers else {}
-    
-    return render_template('result.html', submission=submission, questions=questions, student_answers=student_answers)
+    return render_template('result.html', submission=submission, questions=questions,
+                           question_data_by_id=question_data_by_id, student_answers=student_answers,
+                           question_results=question_results)
 
 @app.route('/quiz-bank/<int:quiz_bank_id>/submissions')
 @login_required
@@ -651,30 +1061,418 @@ def view_submissions_page(quiz_bank_id):
     if quiz_bank.teacher_id != current_user.id:
         return redirect(url_for('teacher_dashboard'))
     
-    return render_template('submissions.html', quiz_bank=quiz_bank)
+    return render_template('submissions.html', quiz_bank=quiz_bank, live_updates=SSE_ENABLED)
+
+def encode_cursor(value, submission_id):
+    """將分頁游標編碼為 URL 安全字串"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, submission_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor, sort):
+    """解碼分頁游標，格式錯誤時拋出 ValueError"""
+    try:
+        value, submission_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        if sort == 'time':
+            value = datetime.fromisoformat(value)
+        else:
+            value = float(value)
+        return value, int(submission_id)
+    except Exception:
+        raise ValueError('invalid cursor')
+
+def submission_percentage(score, total_points):
+    """成績百分比（未四捨五入）"""
+    return (score * 100.0 / total_points) if total_points and total_points > 0 else 0.0
+
+def submission_percentage_expr():
+    """成績百分比的 SQL 運算式"""
+    return db.case(
+        (Submission.total_points > 0, Submission.score * 100.0 / Submission.total_points),
+        else_=0.0
+    )
+
+def like_pattern(value):
+    """使用者輸入 -> 部分比對的 LIKE 樣式（跳脫 %、_ 與跳脫字元本身）"""
+    escaped = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+def submission_ranks(quiz_bank_id, scores):
+    """分數 -> 題庫內的排名（同分同名次）；只計算本頁出現的分數，每個分數以 (quiz_bank_id, score) 索引計數"""
+    ranks = {}
+    for score in scores:
+        higher = db.session.query(db.func.count(Submission.id)).filter(Submission.quiz_bank_id == quiz_bank_id)
+        higher = higher.filter(Submission.score > score) if score is not None else higher.filter(Submission.score.isnot(None))
+        ranks[score] = higher.scalar() + 1
+    return ranks
 
 @app.route('/api/quiz-bank/<int:quiz_bank_id>/submissions')
 @login_required
+@read_replica
 def view_submissions(quiz_bank_id):
     quiz_bank = QuizBank.query.get_or_404(quiz_bank_id)
     if quiz_bank.teacher_id != current_user.id:
         return jsonify({'error': '無權限查看'}), 403
     
-    submissions = Submission.query.filter_by(quiz_bank_id=quiz_bank_id).order_by(Submission.submitted_at.desc()).all()
-    submissions_data = []
+    rehydrate_quiz_bank(quiz_bank_id)
+    
+    sort = request.args.get('sort', 'time')
+    order = request.args.get('order', 'desc')
+    if sort not in ('time', 'score') or order not in ('asc', 'desc'):
+        return jsonify({'error': '無效的排序參數'}), 400
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+    
+    query = db.session.query(
+        Submission.id, Submission.student_name, Submission.student_email, Submission.score,
+        Submission.total_points, Submission.submitted_at, submission_percentage_expr().label('percentage')
+    ).filter(Submission.quiz_bank_id == quiz_bank_id)
+    name = request.args.get('name', '').strip()
+    if name:
+        query = query.filter(Submission.student_name.ilike(like_pattern(name), escape='\\'))
+    email = request.args.get('email', '').strip()
+    if email:
+        query = query.filter(Submission.student_email.ilike(like_pattern(email), escape='\\'))
+    # 依單題作答結果篩選（例如找出答錯第 N 題的學生）
+    question_id = request.args.get('question_id', type=int)
+    if question_id is not None:
+        answered = db.session.query(SubmissionAnswer.submission_id).filter(
+            SubmissionAnswer.quiz_bank_id == quiz_bank_id, SubmissionAnswer.question_id == question_id
+        )
+        correct = request.args.get('correct')
+        if correct in ('1', 'true'):
+            answered = answered.filter(SubmissionAnswer.is_correct.is_(True))
+        elif correct in ('0', 'false'):
+            answered = answered.filter(SubmissionAnswer.is_correct.is_(False))
+        query = query.filter(Submission.id.in_(answered))
+    
+    # 總筆數只在第一頁計算，之後的頁面沿用（回傳 null）
+    cursor = request.args.get('cursor')
+    total = None if cursor else query.with_entities(db.func.count(Submission.id)).scalar()
     
-    for s in submissions:
+    # 鍵集分頁（keyset pagination）：以 (排序欄位, id) 作為游標
+    sort_column = Submission.submitted_at if sort == 'time' else Submission.score
+    if cursor:
+        try:
+            cursor_value, cursor_id = decode_cursor(cursor, sort)
+        except ValueError:
+            return jsonify({'error': '無效的分頁游標'}), 400
+        if order == 'desc':
+            query = query.filter(db.or_(sort_column < cursor_value,
+                                        db.and_(sort_column == cursor_value, Submission.id < cursor_id)))
+        else:
+            query = query.filter(db.or_(sort_column > cursor_value,
+                                        db.and_(sort_column == cursor_value, Submission.id > cursor_id)))
+    if order == 'desc':
+        query = query.order_by(sort_column.desc(), Submission.id.desc())
+    else:
+        query = query.order_by(sort_column.asc(), Submission.id.asc())
+    
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    ranks = submission_ranks(quiz_bank_id, {row.score for row in rows})
+    
+    submissions_data = []
+    for s in rows:
         submissions_data.append({
             'id': s.id,
+            'rank': ranks[s.score],
             'student_name': s.student_name,
             'student_email': s.student_email,
             'score': s.score,
             'total_points': s.total_points,
-            'percentage': round((s.score / s.total_points * 100) if s.total_points > 0 else 0, 2),
+            'percentage': round(s.percentage, 2),
             'submitted_at': s.submitted_at.strftime('%Y-%m-%d %H:%M:%S')
         })
     
-    return jsonify(submissions_data)
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(last.submitted_at if sort == 'time' else last.score, last.id)
+    
+    return jsonify({
+        'submissions': submissions_data,
+        'total': total,
+        'next_cursor': next_cursor
+    })
+
+@app.route('/api/quiz-bank/<int:quiz_bank_id>/events')
+@login_required
+def submission_event_stream(quiz_bank_id):
+    """成績頁的 Server-Sent Events 串流：submission（新作答）、deletion（刪除）、reset（需重新載入）"""
+    quiz_bank = QuizBank.query.get_or_404(quiz_bank_id)
+    if quiz_bank.teacher_id != current_user.id:
+        return jsonify({'error': '無權限查看'}), 403
+    if not SSE_ENABLED:
+        return jsonify({'error': '未開啟即時推播'}), 503
+    
+    try:
+        stream = submission_events.stream(quiz_bank_id, request.headers.get('Last-Event-ID', type=int))
+    except TooManyConnections:
+        return jsonify({'error': '即時連線數已滿，請稍後再試'}), 503
+    response = Response(stream, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # 避免反向代理緩衝
+    return response
+
+@app.route('/api/quiz-bank/<int:quiz_bank_id>/export')
+@login_required
+@read_replica
+def export_submissions(quiz_bank_id):
+    quiz_bank = QuizBank.query.get_or_404(quiz_bank_id)
+    if quiz_bank.teacher_id != current_user.id:
+        return jsonify({'error': '無權限查看'}), 403
+    
+    rehydrate_quiz_bank(quiz_bank_id)
+    
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'xlsx'):
+        return jsonify({'error': '不支援的匯出格式'}), 400
+    
+    questions = Question.query.filter_by(quiz_bank_id=quiz_bank_id).order_by(Question.order_index).all()
+    answer_key = get_answer_key(quiz_bank_id, questions)
+    
+    header = ['排名', '學生姓名', '電子郵件', '得分', '總分', '百分比', '完成時間']
+    for index, question in enumerate(questions, 1):
+        header.append(f'題目{index}：{question.title}')
+        header.append(f'題目{index} 結果')
+    
+    # 只選取需要的欄位並分批讀取，answers 與逐題結果逐列解析
+    query = db.session.query(
+        Submission.student_name,
+        Submission.student_email,
+        Submission.score,
+        Submission.total_points,
+        Submission.submitted_at,
+        Submission.answers,
+        SubmissionResult.results,
+        db.func.rank().over(order_by=Submission.score.desc()).label('rank')
+    ).outerjoin(SubmissionResult).filter(Submission.quiz_bank_id == quiz_bank_id).order_by(
+        Submission.score.desc(), Submission.id
+    ).execution_options(yield_per=500)
+    
+    def generate_rows():
+        for s in query:
+            try:
+                answers = json.loads(s.answers) if s.answers else {}
+            except ValueError:
+                answers = {}
+            if not isinstance(answers, dict):
+                answers = {}
+            if s.results is not None:
+                results = {qid: r.is_correct for qid, r in deserialize_results(s.results).items()}
+            else:
+                results = {r.question_id: r.is_correct for r in answer_key.grade(answers).results}
+            row = [
+                s.rank,
+                s.student_name,
+                s.student_email or '',
+                s.score,
+                s.total_points,
+                round(submission_percentage(s.score, s.total_points), 1),
+                s.submitted_at.strftime('%Y-%m-%d %H:%M:%S')
+            ]
+            for question in questions:
+                row.append(format_answer(answers.get(str(question.id))))
+                row.append('正確' if results.get(question.id) else '錯誤')
+            yield row
+    
+    filename = f'{quiz_bank.title}_成績統計.{export_format}'
+    if export_format == 'csv':
+        body, mimetype = iter_csv(header, generate_rows()), CSV_MIMETYPE
+    else:
+        body, mimetype = iter_xlsx(header, generate_rows(), sheet_name=quiz_bank.title), XLSX_MIMETYPE
+    
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f"attachment; filename=export.{export_format}; filename*=UTF-8''{quote(filename)}"
+    return response
+
+@app.route('/api/quiz-bank/<int:quiz_bank_id>/item-analysis')
+@login_required
+@read_replica
+def item_analysis(quiz_bank_id):
+    quiz_bank = QuizBank.query.get_or_404(quiz_bank_id)
+    if quiz_bank.teacher_id != current_user.id:
+        return jsonify({'error': '無權限查看'}), 403
+    
+    rehydrate_quiz_bank(quiz_bank_id)
+    
+    questions = Question.query.filter_by(quiz_bank_id=quiz_bank_id).order_by(Question.order_index).all()
+    answer_key = get_answer_key(quiz_bank_id, questions)
+    questions_by_id = {q.id: q for q in questions}
+    if set(questions_by_id) != {item.question_id for item in answer_key.items}:
+        answer_key_cache.invalidate(quiz_bank_id)
+        answer_key = get_answer_key(quiz_bank_id, questions)
+    ordered_questions = [questions_by_id[item.question_id] for item in answer_key.items]
+    
+    # 作答數與最大ID作為資料指紋，答案鍵重新編譯時也會重新分析
+    count, max_id = db.session.query(
+        db.func.count(Submission.id), db.func.max(Submission.id)
+    ).filter(Submission.quiz_bank_id == quiz_bank_id).one()
+    
+    def compute():
+        rows = db.session.query(Submission.answers, SubmissionResult.results).outerjoin(SubmissionResult).filter(
+            Submission.quiz_bank_id == quiz_bank_id
+        ).order_by(Submission.id).execution_options(yield_per=1000)
+        return analyze(answer_key, ordered_questions, rows)
+    
+    result = item_analysis_cache.get(quiz_bank_id, (count, max_id, answer_key), compute)
+    return jsonify(result)
+
+@app.route('/api/quiz-bank/<int:quiz_bank_id>/similar-submissions')
+@login_required
+@read_replica
+def similar_submissions(quiz_bank_id):
+    """答錯的填空題與程式碼排序題作答幾乎相同的作答群組（MinHash/LSH，見 similarity.py）"""
+    quiz_bank = QuizBank.query.get_or_404(quiz_bank_id)
+    if quiz_bank.teacher_id != current_user.id:
+        return jsonify({'error': '無權限查看'}), 403
+    
+    rehydrate_quiz_bank(quiz_bank_id)
+    
+    threshold = request.args.get('threshold', 0.7, type=float)
+    min_size = request.args.get('min_size', 2, type=int)
+    if not 0 < threshold <= 1 or min_size < 2:
+        return jsonify({'error': 'threshold 需介於 0 與 1 之間，min_size 至少為 2'}), 400
+    
+    has_signature = AnswerSignature.signature.isnot(None)
+    count = db.session.query(db.func.count()).filter(
+        AnswerSignature.quiz_bank_id == quiz_bank_id, has_signature
+    ).scalar()
+    
+    def load_signatures(after_id):
+        return db.session.query(AnswerSignature.submission_id, AnswerSignature.signature).filter(
+            AnswerSignature.quiz_bank_id == quiz_bank_id, has_signature, AnswerSignature.submission_id > after_id
+        ).order_by(AnswerSignature.submission_id).execution_options(yield_per=1000)
+    
+    indexed, clusters = similarity_index_cache.clusters(
+        quiz_bank_id, load_signatures, count, threshold=threshold, min_size=min_size
+    )
+    
+    member_ids = [submission_id for cluster in clusters for submission_id in cluster['submission_ids']]
+    submissions = {}
+    for i in range(0, len(member_ids), 1000):
+        for row in db.session.query(
+            Submission.id, Submission.student_name, Submission.student_email, Submission.score,
+            Submission.total_points, Submission.submitted_at
+        ).filter(Submission.id.in_(member_ids[i:i + 1000])):
+            submissions[row.id] = {
+                'id': row.id,
+                'student_name': row.student_name,
+                'student_email': row.student_email,
+                'score': row.score,
+                'total_points': row.total_points,
+                'submitted_at': row.submitted_at.strftime('%Y-%m-%d %H:%M:%S')
+            }
+    for cluster in clusters:
+        cluster['submissions'] = [submissions[i] for i in cluster.pop('submission_ids') if i in submissions]
+    
+    return jsonify({'indexed_submissions': indexed, 'threshold': threshold, 'clusters': clusters})
+
+@app.route('/api/quiz-bank/<int:quiz_bank_id>/question-stats')
+@login_required
+@read_replica
+def question_stats(quiz_bank_id):
+    quiz_bank = QuizBank.query.get_or_404(quiz_bank_id)
+    if quiz_bank.teacher_id != current_user.id:
+        return jsonify({'error': '無權限查看'}), 403
+    
+    rehydrate_quiz_bank(quiz_bank_id)
+    
+    # 逐題統計直接在資料庫彙總，不需載入每筆作答
+    correct = db.func.sum(db.case((SubmissionAnswer.is_correct.is_(True), 1), else_=0))
+    omitted = db.func.sum(db.case((SubmissionAnswer.answer.is_(None), 1), else_=0))
+    rows = db.session.query(
+        SubmissionAnswer.question_id, db.func.count(), correct, omitted, db.func.avg(SubmissionAnswer.points)
+    ).filter(SubmissionAnswer.quiz_bank_id == quiz_bank_id).group_by(SubmissionAnswer.question_id).all()
+    stats_by_question = {row[0]: row for row in rows}
+    
+    questions = db.session.query(Question.id, Question.title, Question.points).filter(
+        Question.quiz_bank_id == quiz_bank_id
+    ).order_by(Question.order_index).all()
+    results = []
+    for question_id, title, points in questions:
+        _, responses, correct_count, omitted_count, average_points = stats_by_question.get(
+            question_id, (question_id, 0, 0, 0, None)
+        )
+        results.append({
+            'question_id': question_id,
+            'title': title,
+            'points': points,
+            'responses': responses,
+            'correct': int(correct_count or 0),
+            'omitted': int(omitted_count or 0),
+            'correct_rate': round(correct_count / responses * 100, 2) if responses else 0,
+            'average_points': round(float(average_points), 2) if average_points is not None else 0
+        })
+    return jsonify({'questions': results})
+
+HISTOGRAM_BINS = (1, 2, 4, 5, 10, 20, 25, 50, 100)
+
+@app.route('/api/quiz-bank/<int:quiz_bank_id>/stats')
+@login_required
+@read_replica
+def quiz_bank_stats(quiz_bank_id):
+    quiz_bank = QuizBank.query.get_or_404(quiz_bank_id)
+    if quiz_bank.teacher_id != current_user.id:
+        return jsonify({'error': '無權限查看'}), 403
+    
+    rehydrate_quiz_bank(quiz_bank_id)
+    
+    pass_threshold = request.args.get('pass_threshold', 60, type=int)
+    bins = request.args.get('bins', 10, type=int)
+    try:
+        percentiles = sorted({float(p) for p in request.args.get('percentiles', '25,50,75,90').split(',') if p.strip()})
+    except ValueError:
+        return jsonify({'error': '無效的百分位數'}), 400
+    if not 0 <= pass_threshold <= 100 or bins not in HISTOGRAM_BINS or any(not 0 < p <= 100 for p in percentiles):
+        return jsonify({'error': '無效的統計參數'}), 400
+    
+    percentage = submission_percentage_expr()
+    
+    def load_buckets():
+        # 以每 1% 為一格分組統計（PostgreSQL 的 CAST 會四捨五入，需先取 floor）
+        if db.engine.dialect.name == 'sqlite':
+            bucket = db.cast(percentage, db.Integer)
+        else:
+            bucket = db.cast(db.func.floor(percentage), db.Integer)
+        return db.session.query(
+            bucket, db.func.count(Submission.id), db.func.sum(percentage), db.func.max(percentage)
+        ).filter(Submission.quiz_bank_id == quiz_bank_id).group_by(bucket).all()
+    
+    stats = submission_stats_cache.get(quiz_bank_id, load_buckets)
+    
+    # 百分位數以視窗函數取出排序後的指定名次，資料變動前沿用上次結果
+    missing = [p for p in percentiles if p not in stats.percentiles]
+    if missing and stats.count:
+        ranks = stats.percentile_ranks(missing)
+        ordered = db.session.query(
+            percentage.label('percentage'),
+            db.func.row_number().over(order_by=percentage).label('position')
+        ).filter(Submission.quiz_bank_id == quiz_bank_id).subquery()
+        values = dict(
+            (position, value) for value, position in db.session.query(
+                ordered.c.percentage, ordered.c.position
+            ).filter(ordered.c.position.in_(set(ranks.values()))).all()
+        )
+        for p, position in ranks.items():
+            stats.percentiles[p] = values.get(position)
+    
+    count = stats.count
+    return jsonify({
+        'count': count,
+        'average_percentage': round(stats.total / count, 2) if count else 0,
+        'highest_percentage': round(stats.highest, 2) if count and stats.highest is not None else 0,
+        'pass_threshold': pass_threshold,
+        'pass_count': stats.pass_count(pass_threshold) if count else 0,
+        'pass_rate': round(stats.pass_count(pass_threshold) / count * 100, 2) if count else 0,
+        'percentiles': {
+            ('%g' % p): (round(stats.percentiles[p], 2) if count and stats.percentiles.get(p) is not None else None)
+            for p in percentiles
+        },
+        'histogram': stats.histogram(bins)
+    })
 
 @app.route('/api/submission/<int:submission_id>', methods=['DELETE'])
 @login_required
@@ -686,13 +1484,364 @@ def delete_submission(submission_id):
         return jsonify({'error': '無權限操作'}), 403
     
     try:
+        percentage = submission_percentage(submission.score, submission.total_points)
         db.session.delete(submission)
         db.session.commit()
+        submission_stats_cache.record_deletion(quiz_bank.id, percentage)
+        submission_events.publish(quiz_bank.id, 'deletion', {
+            'submission_id': submission_id,
+            'stats': submission_stats_cache.summary(quiz_bank.id)
+        })
         return jsonify({'message': '成績已成功刪除'})
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': '刪除失敗，請稍後再試'}), 500
 
+# 重新評分：題目答案或配分修正後，依儲存的作答以目前答案鍵重新計算分數
+# REGRADE_WORKERS 為評分行程數，REGRADE_CHUNK_SIZE 為每個行程一次評分的作答數
+REGRADE_WORKERS = int(os.environ.get('REGRADE_WORKERS', min(4, os.cpu_count() or 1)))
+REGRADE_CHUNK_SIZE = int(os.environ.get('REGRADE_CHUNK_SIZE', 500))
+# 執行中的工作超過此時間沒有進度，視為已中斷（例如 worker 重啟），再次要求時從游標繼續
+REGRADE_STALE_AFTER = timedelta(minutes=5)
+
+def regrade_job_dict(job):
+    return {
+        'id': job.id,
+        'quiz_bank_id': job.quiz_bank_id,
+        'status': job.status,
+        'dry_run': job.dry_run,
+        'total': job.total,
+        'processed': job.processed,
+        'changed': job.changed,
+        'report': json.loads(job.report) if job.report else None,
+        'error': job.error,
+        'created_at': job.created_at.strftime('%Y-%m-%d %H:%M:%S') if job.created_at else None,
+        'finished_at': job.finished_at.strftime('%Y-%m-%d %H:%M:%S') if job.finished_at else None
+    }
+
+def write_regrade_changes(quiz_bank_id, changes, question_types):
+    """以依主鍵的批次 UPDATE 寫回分數與逐題結果，並重建逐題作答資料列與相似作答簽章"""
+    submission_ids = [change['id'] for change in changes]
+    db.session.execute(db.update(Submission), [
+        {'id': change['id'], 'score': change['score'], 'total_points': change['total_points']} for change in changes
+    ])
+    has_result = set(db.session.scalars(
+        db.select(SubmissionResult.submission_id).where(SubmissionResult.submission_id.in_(submission_ids))
+    ))
+    result_updates = [{'submission_id': change['id'], 'results': change['results']}
+                      for change in changes if change['id'] in has_result]
+    result_inserts = [{'submission_id': change['id'], 'results': change['results']}
+                      for change in changes if change['id'] not in has_result]
+    if result_updates:
+        db.session.execute(db.update(SubmissionResult), result_updates)
+    if result_inserts:
+        db.session.execute(db.insert(SubmissionResult), result_inserts)
+    db.session.query(SubmissionAnswer).filter(
+        SubmissionAnswer.submission_id.in_(submission_ids)
+    ).delete(synchronize_session=False)
+    answer_records = [
+        {'submission_id': change['id'], 'question_id': question_id, 'quiz_bank_id': quiz_bank_id,
+         'answer': answer, 'is_correct': is_correct, 'points': points}
+        for change in changes for question_id, answer, is_correct, points in change['answers']
+    ]
+    if answer_records:
+        db.session.execute(db.insert(SubmissionAnswer), answer_records)
+    # 簽章只包含答錯的題目，對錯改變時需重新計算
+    db.session.query(AnswerSignature).filter(
+        AnswerSignature.submission_id.in_(submission_ids)
+    ).delete(synchronize_session=False)
+    db.session.execute(db.insert(AnswerSignature), [
+        {'submission_id': change['id'], 'quiz_bank_id': quiz_bank_id,
+         'signature': answer_signature(question_types, [row[:3] for row in change['answers']])}
+        for change in changes
+    ])
+
+def run_regrade_job(job_id, workers=REGRADE_WORKERS, chunk_size=REGRADE_CHUNK_SIZE, log=None):
+    """執行或繼續重新評分工作
+
+    依作答ID分批讀出，每批分成 chunk_size 筆交給行程池評分，只寫回分數或逐題結果有變動的作答；
+    寫回與進度游標在同一個交易中提交，中斷後重新執行不會重複或遺漏。
+    """
+    job = db.session.get(RegradeJob, job_id)
+    rehydrate_quiz_bank(job.quiz_bank_id)
+    rows = question_rows(
+        Question.query.filter_by(quiz_bank_id=job.quiz_bank_id).order_by(Question.order_index).all()
+    )
+    fingerprint = answer_key_fingerprint(rows)
+    question_types = {question_id: question_type for question_id, question_type, _, _ in rows}
+    if job.answer_key_fingerprint != fingerprint:
+        # 第一次執行，或中斷期間題目又被修改：從頭重新評分
+        job.answer_key_fingerprint = fingerprint
+        job.last_submission_id = job.processed = job.changed = 0
+        job.report = json.dumps(new_report())
+    job.total = Submission.query.filter_by(quiz_bank_id=job.quiz_bank_id).count()
+    job.status = 'running'
+    job.error = None
+    job.updated_at = datetime.utcnow()
+    db.session.commit()
+    
+    report = json.loads(job.report)
+    try:
+        with RegradePool(job.quiz_bank_id, rows, workers) as pool:
+            while True:
+                batch = db.session.query(
+                    Submission.id, Submission.answers, Submission.score, Submission.total_points,
+                    SubmissionResult.results
+                ).outerjoin(SubmissionResult).filter(
+                    Submission.quiz_bank_id == job.quiz_bank_id, Submission.id > job.last_submission_id
+                ).order_by(Submission.id).limit(chunk_size * max(workers, 1)).all()
+                if not batch:
+                    break
+                chunks = [[tuple(row) for row in batch[i:i + chunk_size]] for i in range(0, len(batch), chunk_size)]
+                changes = [change for chunk_changes in pool.map(chunks) for change in chunk_changes]
+                if changes and not job.dry_run:
+                    write_regrade_changes(job.quiz_bank_id, changes, question_types)
+                update_report(report, changes)
+                job.processed += len(batch)
+                job.changed += len(changes)
+                job.last_submission_id = batch[-1][0]
+                job.report = json.dumps(report)
+                job.updated_at = datetime.utcnow()
+                db.session.commit()
+                if log:
+                    log(f'已處理 {job.processed}/{job.total} 筆，分數變動 {job.changed} 筆（最後ID：{job.last_submission_id}）')
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(RegradeJob, job_id)
+        job.status = 'failed'
+        job.error = str(e)
+        job.updated_at = datetime.utcnow()
+        db.session.commit()
+        raise
+    
+    job.status = 'done'
+    job.finished_at = job.updated_at = datetime.utcnow()
+    db.session.commit()
+    if not job.dry_run and job.changed:
+        submission_stats_cache.invalidate(job.quiz_bank_id)
+        item_analysis_cache.invalidate(job.quiz_bank_id)
+        similarity_index_cache.invalidate(job.quiz_bank_id)
+        # 開啟中的成績頁重新載入列表
+        submission_events.publish(job.quiz_bank_id, 'reset', {})
+    return job
+
+def start_regrade_thread(job_id):
+    def run():
+        with app.app_context():
+            try:
+                run_regrade_job(job_id)
+            except Exception:
+                app.logger.exception('重新評分工作 %s 失敗', job_id)
+    threading.Thread(target=run, name=f'regrade-{job_id}', daemon=True).start()
+
+@app.route('/api/quiz-bank/<int:quiz_bank_id>/regrade', methods=['POST'])
+@login_required
+def start_regrade(quiz_bank_id):
+    """建立重新評分工作（dry_run 時只回報分數差異），在背景執行；以 GET .../regrade/<工作ID> 查詢進度"""
+    quiz_bank = QuizBank.query.get_or_404(quiz_bank_id)
+    
+    if quiz_bank.teacher_id != current_user.id:
+        return jsonify({'error': '無權限操作'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    dry_run = bool(data.get('dry_run', False))
+    job = RegradeJob.query.filter(
+        RegradeJob.quiz_bank_id == quiz_bank_id, RegradeJob.dry_run.is_(dry_run),
+        RegradeJob.status.in_(('pending', 'running'))
+    ).order_by(RegradeJob.id.desc()).first()
+    if job is not None and job.updated_at > datetime.utcnow() - REGRADE_STALE_AFTER:
+        # 已有進行中的工作
+        return jsonify(regrade_job_dict(job)), 202
+    if job is None:
+        job = RegradeJob(quiz_bank_id=quiz_bank_id, dry_run=dry_run)
+        db.session.add(job)
+        db.session.commit()
+    start_regrade_thread(job.id)
+    return jsonify(regrade_job_dict(job)), 202
+
+@app.route('/api/quiz-bank/<int:quiz_bank_id>/regrade/<int:job_id>')
+@login_required
+def regrade_status(quiz_bank_id, job_id):
+    quiz_bank = QuizBank.query.get_or_404(quiz_bank_id)
+    
+    if quiz_bank.teacher_id != current_user.id:
+        return jsonify({'error': '無權限操作'}), 403
+    
+    job = RegradeJob.query.filter_by(id=job_id, quiz_bank_id=quiz_bank_id).first_or_404()
+    return jsonify(regrade_job_dict(job))
+
+# 作答封存：已關閉或長期沒有作答的題庫，作答移至封存檔（ARCHIVE_DIR，需為持久保存的磁碟）
+# 成績頁與成績列表讀到已封存的作答時自動讀回資料表；之後仍未使用的題庫由下一次封存再移出
+ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', os.path.join(app.instance_path, 'archive'))
+
+def submission_archive_records(submission_ids):
+    """作答與其逐題結果、逐題作答、簽章、收據 -> 封存紀錄"""
+    results = dict(db.session.query(SubmissionResult.submission_id, SubmissionResult.results).filter(
+        SubmissionResult.submission_id.in_(submission_ids)
+    ))
+    signatures = dict(db.session.query(AnswerSignature.submission_id, AnswerSignature.signature).filter(
+        AnswerSignature.submission_id.in_(submission_ids)
+    ))
+    answer_rows = {}
+    for row in db.session.query(
+        SubmissionAnswer.submission_id, SubmissionAnswer.question_id, SubmissionAnswer.answer,
+        SubmissionAnswer.is_correct, SubmissionAnswer.points
+    ).filter(SubmissionAnswer.submission_id.in_(submission_ids)):
+        answer_rows.setdefault(row[0], []).append(list(row[1:]))
+    receipts = {}
+    for submission_id, key, created_at in db.session.query(
+        SubmissionReceipt.submission_id, SubmissionReceipt.key, SubmissionReceipt.created_at
+    ).filter(SubmissionReceipt.submission_id.in_(submission_ids)):
+        receipts.setdefault(submission_id, []).append([key, created_at.isoformat() if created_at else None])
+    
+    records = []
+    for row in db.session.query(
+        Submission.id, Submission.quiz_bank_id, Submission.student_name, Submission.student_email,
+        Submission.answers, Submission.score, Submission.total_points, Submission.submitted_at
+    ).filter(Submission.id.in_(submission_ids)).order_by(Submission.id):
+        signature = signatures.get(row.id)
+        records.append({
+            'id': row.id,
+            'quiz_bank_id': row.quiz_bank_id,
+            'student_name': row.student_name,
+            'student_email': row.student_email,
+            'answers': row.answers,
+            'score': row.score,
+            'total_points': row.total_points,
+            'submitted_at': row.submitted_at.isoformat() if row.submitted_at else None,
+            'results': results.get(row.id),
+            'answer_rows': answer_rows.get(row.id, []),
+            'signature': base64.b64encode(signature).decode('ascii') if signature else None,
+            'receipts': receipts.get(row.id, [])
+        })
+    return records
+
+def archive_submission_batch(quiz_bank_id, submission_ids):
+    """將一批作答寫入封存檔後從資料表刪除；資料庫交易失敗時刪除已寫入的封存檔"""
+    records = submission_archive_records(submission_ids)
+    submission_ids = [record['id'] for record in records]
+    if not submission_ids:
+        return None
+    path = archive.archive_path(
+        ARCHIVE_DIR, quiz_bank_id, f"{datetime.utcnow():%Y%m%d%H%M%S}_{submission_ids[0]}_{submission_ids[-1]}"
+    )
+    checksum, size_bytes = archive.write_archive(path, records)
+    try:
+        submission_archive = SubmissionArchive(
+            quiz_bank_id=quiz_bank_id, path=path, checksum=checksum, size_bytes=size_bytes,
+            submission_count=len(submission_ids)
+        )
+        db.session.add(submission_archive)
+        db.session.flush()
+        db.session.execute(db.insert(ArchivedSubmission), [
+            {'submission_id': submission_id, 'archive_id': submission_archive.id} for submission_id in submission_ids
+        ])
+        for column in (SubmissionResult.submission_id, SubmissionAnswer.submission_id,
+                       AnswerSignature.submission_id, SubmissionReceipt.submission_id, Submission.id):
+            db.session.execute(db.delete(column.class_).where(column.in_(submission_ids)))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        archive.remove_archive(path)
+        raise
+    return submission_archive
+
+def parse_archived_time(value):
+    return datetime.fromisoformat(value) if value else None
+
+def rehydrate_archive(archive_id):
+    """將封存檔的作答讀回資料表，回傳讀回的作答數（已由其他請求讀回時為 0）"""
+    submission_archive = db.session.get(SubmissionArchive, archive_id)
+    if submission_archive is None or submission_archive.status != 'archived':
+        return 0
+    try:
+        records = archive.read_archive(submission_archive.path, submission_archive.checksum)
+    except archive.ArchiveCorrupted:
+        # 檔案遺失或損毀時保留封存紀錄，其餘作答照常顯示；需由備份還原檔案後再讀回
+        app.logger.exception('無法讀回封存檔 %s', submission_archive.id)
+        return 0
+    try:
+        # 以條件式 UPDATE 取得這個封存檔，同時讀回的其他請求會更新 0 列
+        claimed = db.session.execute(db.update(SubmissionArchive).where(
+            SubmissionArchive.id == archive_id, SubmissionArchive.status == 'archived'
+        ).values(status='rehydrated', rehydrated_at=datetime.utcnow()).execution_options(synchronize_session=False)).rowcount
+        if not claimed:
+            db.session.rollback()
+            return 0
+        if records:
+            db.session.execute(db.insert(Submission), [{
+                'id': record['id'], 'quiz_bank_id': record['quiz_bank_id'], 'student_name': record['student_name'],
+                'student_email': record['student_email'], 'answers': record['answers'], 'score': record['score'],
+                'total_points': record['total_points'], 'submitted_at': parse_archived_time(record['submitted_at'])
+            } for record in records])
+            result_records = [{'submission_id': record['id'], 'results': record['results']}
+                              for record in records if record['results'] is not None]
+            if result_records:
+                db.session.execute(db.insert(SubmissionResult), result_records)
+            answer_records = [
+                {'submission_id': record['id'], 'question_id': question_id, 'quiz_bank_id': record['quiz_bank_id'],
+                 'answer': answer, 'is_correct': is_correct, 'points': points}
+                for record in records for question_id, answer, is_correct, points in record['answer_rows']
+            ]
+            if answer_records:
+                db.session.execute(db.insert(SubmissionAnswer), answer_records)
+            db.session.execute(db.insert(AnswerSignature), [
+                {'submission_id': record['id'], 'quiz_bank_id': record['quiz_bank_id'],
+                 'signature': base64.b64decode(record['signature']) if record['signature'] else None}
+                for record in records
+            ])
+            receipt_records = [
+                {'key': key, 'submission_id': record['id'], 'created_at': parse_archived_time(created_at)}
+                for record in records for key, created_at in record['receipts']
+            ]
+            if receipt_records:
+                db.session.execute(db.insert(SubmissionReceipt), receipt_records)
+        db.session.execute(db.delete(ArchivedSubmission).where(ArchivedSubmission.archive_id == archive_id))
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return 0
+    archive.remove_archive(submission_archive.path)
+    submission_stats_cache.invalidate(submission_archive.quiz_bank_id)
+    item_analysis_cache.invalidate(submission_archive.quiz_bank_id)
+    similarity_index_cache.invalidate(submission_archive.quiz_bank_id)
+    return len(records)
+
+def rehydrate_quiz_bank(quiz_bank_id):
+    """讀回題庫所有已封存的作答（沒有封存檔時只有一次索引查詢）"""
+    archive_ids = [archive_id for archive_id, in db.session.query(SubmissionArchive.id).filter(
+        SubmissionArchive.quiz_bank_id == quiz_bank_id, SubmissionArchive.status == 'archived'
+    ).order_by(SubmissionArchive.id)]
+    if not archive_ids:
+        return 0
+    if has_request_context():
+        # 讀回的作答只在主資料庫
+        g.db_replica = None
+    return sum(rehydrate_archive(archive_id) for archive_id in archive_ids)
+
+def rehydrate_submission(submission_id):
+    """作答已封存時讀回其所在的封存檔，回傳是否找到"""
+    location = db.session.get(ArchivedSubmission, submission_id)
+    if location is None:
+        return False
+    rehydrate_archive(location.archive_id)
+    return True
+
+def archivable_quiz_banks(idle_days, older_than_days):
+    """已關閉且 idle_days 天沒有作答，或 older_than_days 天沒有作答的題庫；最近 idle_days 天內讀回過的題庫除外"""
+    now = datetime.utcnow()
+    last_submitted_at = db.func.max(Submission.submitted_at)
+    recently_rehydrated = db.session.query(SubmissionArchive.quiz_bank_id).filter(
+        SubmissionArchive.rehydrated_at > now - timedelta(days=idle_days)
+    )
+    rows = db.session.query(QuizBank.id, db.func.count(Submission.id)).join(
+        Submission, Submission.quiz_bank_id == QuizBank.id
+    ).filter(~QuizBank.id.in_(recently_rehydrated)).group_by(QuizBank.id, QuizBank.is_active).having(db.or_(
+        db.and_(QuizBank.is_active.is_(False), last_submitted_at < now - timedelta(days=idle_days)),
+        last_submitted_at < now - timedelta(days=older_than_days)
+    )).order_by(QuizBank.id).all()
+    return rows
+
 # 獲取當前環境
 @app.route('/api/environment')
 def get_environment():
@@ -701,9 +1850,257 @@ def get_environment():
         'database_type': 'PostgreSQL' if ENVIRONMENT == 'production' else 'SQLite'
     })
 
+@app.route('/api/database/pool')
+@login_required
+def database_pool_status():
+    """本行程的資料庫連線池狀態（含唯讀副本）"""
+    status = pool_status(db.engine, pool_statistics)
+    if replicas:
+        status['replicas'] = replicas.status()
+    return jsonify(status)
+
+# 作答排隊模式：SUBMISSION_INGEST_MODE=queued 時啟用，佇列存於本機 SQLite 檔案
+SUBMISSION_INGEST_MODE = os.environ.get('SUBMISSION_INGEST_MODE', 'sync')
+submission_queue = None
+ingest_workers = None
+if SUBMISSION_INGEST_MODE == 'queued':
+    submission_queue = SubmissionQueue(
+        os.environ.get('SUBMISSION_QUEUE_PATH', os.path.join(app.instance_path, 'submission_queue.db'))
+    )
+    ingest_workers = IngestWorkerPool(
+        submission_queue,
+        process_submission_batch,
+        workers=int(os.environ.get('INGEST_WORKERS', 2)),
+        batch_size=int(os.environ.get('INGEST_BATCH_SIZE', 50))
+    )
+    # INGEST_EMBEDDED_WORKERS=false 時由獨立的 `flask ingest-worker` 行程處理
+    if os.environ.get('INGEST_EMBEDDED_WORKERS', 'true').lower() == 'true':
+        ingest_workers.start()
+
+@app.cli.command('ingest-worker')
+def ingest_worker():
+    """在前景執行作答佇列 worker（需設定 SUBMISSION_INGEST_MODE=queued）"""
+    if ingest_workers is None:
+        raise click.ClickException('請先設定 SUBMISSION_INGEST_MODE=queued')
+    click.echo(f'處理作答佇列：{submission_queue.path}')
+    ingest_workers.run_forever()
+
+@app.cli.command('backfill-results')
+@click.option('--batch-size', default=500, show_default=True, help='每批處理的作答數')
+@click.option('--quiz-bank-id', type=int, default=None, help='只處理指定題庫')
+def backfill_results(batch_size, quiz_bank_id):
+    """為尚未儲存逐題評分結果、逐題作答資料列或相似作答簽章的舊作答補上資料（可中斷後重新執行，會從未完成處繼續）"""
+    migrations.upgrade(db.engine, log=click.echo)
+    last_id = 0
+    processed = 0
+    mismatched = 0
+    has_answer_rows = db.exists().where(SubmissionAnswer.submission_id == Submission.id)
+    has_signature = db.exists().where(AnswerSignature.submission_id == Submission.id)
+    while True:
+        query = db.session.query(
+            Submission.id, Submission.quiz_bank_id, Submission.answers, Submission.score,
+            SubmissionResult.submission_id
+        ).outerjoin(SubmissionResult).filter(
+            db.or_(SubmissionResult.submission_id.is_(None), ~has_answer_rows, ~has_signature), Submission.id > last_id
+        )
+        if quiz_bank_id is not None:
+            query = query.filter(Submission.quiz_bank_id == quiz_bank_id)
+        rows = query.order_by(Submission.id).limit(batch_size).all()
+        if not rows:
+            break
+        
+        records = []
+        answer_records = []
+        signature_records = []
+        for submission_id, bank_id, answers, score, stored_result in rows:
+            try:
+                answers = json.loads(answers) if answers else {}
+            except ValueError:
+                answers = {}
+            answer_key = get_answer_key(bank_id)
+            grade_result = answer_key.grade(answers)
+            if grade_result.score != score:
+                mismatched += 1
+            if stored_result is None:
+                records.append({'submission_id': submission_id, 'results': serialize_results(grade_result.results)})
+            answer_rows = answer_row_values(bank_id, answer_key, answers, grade_result, submission_id)
+            answer_records.extend(answer_rows)
+            signature_records.append({'submission_id': submission_id, 'quiz_bank_id': bank_id,
+                                      'signature': signature_for(answer_key, answer_rows)})
+        
+        if records:
+            db.session.execute(db.insert(SubmissionResult), records)
+        # 以目前答案鍵重新產生這些作答的逐題資料列
+        db.session.query(SubmissionAnswer).filter(
+            SubmissionAnswer.submission_id.in_([row[0] for row in rows])
+        ).delete(synchronize_session=False)
+        if answer_records:
+            db.session.execute(db.insert(SubmissionAnswer), answer_records)
+        db.session.query(AnswerSignature).filter(
+            AnswerSignature.submission_id.in_([row[0] for row in rows])
+        ).delete(synchronize_session=False)
+        db.session.execute(db.insert(AnswerSignature), signature_records)
+        db.session.commit()
+        last_id = rows[-1][0]
+        processed += len(rows)
+        click.echo(f'已處理 {processed} 筆（最後ID：{last_id}）')
+    
+    click.echo(f'回填完成，共 {processed} 筆；其中 {mismatched} 筆依目前答案鍵計算的分數與原分數不同（原分數未變更）')
+
+@app.cli.command('regrade')
+@click.option('--quiz-bank-id', type=int, default=None, help='重新評分指定題庫的所有作答')
+@click.option('--job-id', type=int, default=None, help='繼續執行中斷的重新評分工作')
+@click.option('--dry-run', is_flag=True, help='只列出分數差異，不寫回')
+@click.option('--workers', default=REGRADE_WORKERS, show_default=True, help='評分行程數')
+@click.option('--chunk-size', default=REGRADE_CHUNK_SIZE, show_default=True, help='每個行程一次評分的作答數')
+def regrade(quiz_bank_id, job_id, dry_run, workers, chunk_size):
+    """以目前答案鍵重新評分題庫的作答（可中斷後以 --job-id 繼續）"""
+    if job_id is not None:
+        job = db.session.get(RegradeJob, job_id)
+        if job is None:
+            raise click.ClickException(f'找不到重新評分工作 {job_id}')
+    elif quiz_bank_id is not None:
+        if db.session.get(QuizBank, quiz_bank_id) is None:
+            raise click.ClickException(f'找不到題庫 {quiz_bank_id}')
+        job = RegradeJob(quiz_bank_id=quiz_bank_id, dry_run=dry_run)
+        db.session.add(job)
+        db.session.commit()
+    else:
+        raise click.ClickException('請指定 --quiz-bank-id 或 --job-id')
+    
+    click.echo(f'重新評分工作 {job.id}（題庫 {job.quiz_bank_id}{"，僅預覽" if job.dry_run else ""}）')
+    job = run_regrade_job(job.id, workers=workers, chunk_size=chunk_size, log=click.echo)
+    report = json.loads(job.report)
+    click.echo(f"完成：{job.processed} 筆中有 {report['changed']} 筆分數變動"
+               f"（提高 {report['increased']}、降低 {report['decreased']}，總分變動 {report['score_delta']:+g}）")
+    for sample in report['samples'][:20]:
+        click.echo(f"  作答 {sample['submission_id']}：{sample['old_score'] or 0:g}/{sample['old_total_points']}"
+                   f" -> {sample['score']:g}/{sample['total_points']}")
+
+@app.cli.command('archive-submissions')
+@click.option('--quiz-bank-id', type=int, default=None, help='只封存指定題庫（不論是否關閉）')
+@click.option('--idle-days', default=30, show_default=True, help='已關閉的題庫超過幾天沒有作答即封存')
+@click.option('--older-than-days', default=365, show_default=True, help='任何題庫超過幾天沒有作答即封存')
+@click.option('--batch-size', default=2000, show_default=True, help='每個封存檔的作答數')
+@click.option('--dry-run', is_flag=True, help='只列出會封存的題庫')
+def archive_submissions(quiz_bank_id, idle_days, older_than_days, batch_size, dry_run):
+    """將已關閉或長期沒有作答的題庫的作答移至封存檔（可中斷後重新執行）"""
+    if quiz_bank_id is not None:
+        count = Submission.query.filter_by(quiz_bank_id=quiz_bank_id).count()
+        banks = [(quiz_bank_id, count)] if count else []
+    else:
+        banks = archivable_quiz_banks(idle_days, older_than_days)
+    total = 0
+    for bank_id, count in banks:
+        click.echo(f'題庫 {bank_id}：{count} 筆作答')
+        if dry_run:
+            continue
+        while True:
+            submission_ids = [submission_id for submission_id, in db.session.query(Submission.id).filter(
+                Submission.quiz_bank_id == bank_id
+            ).order_by(Submission.id).limit(batch_size)]
+            if not submission_ids:
+                break
+            submission_archive = archive_submission_batch(bank_id, submission_ids)
+            total += submission_archive.submission_count
+            click.echo(f'  已封存 {submission_archive.submission_count} 筆 -> {submission_archive.path}'
+                       f'（{submission_archive.size_bytes / 1024:.1f} KB）')
+        submission_stats_cache.invalidate(bank_id)
+    click.echo(f"{'共有' if dry_run else '已封存'} {len(banks)} 個題庫" + ('' if dry_run else f'，{total} 筆作答'))
+
+@app.cli.command('rehydrate-submissions')
+@click.option('--quiz-bank-id', type=int, required=True, help='讀回的題庫')
+def rehydrate_submissions(quiz_bank_id):
+    """將題庫已封存的作答讀回資料表"""
+    click.echo(f'已讀回 {rehydrate_quiz_bank(quiz_bank_id)} 筆作答')
+
+@app.cli.command('purge-drafts')
+@click.option('--days', default=30, show_default=True, help='刪除超過幾天未更新的作答草稿（含已提交的）')
+def purge_drafts(days):
+    """刪除過期的作答草稿"""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    deleted = DraftAttempt.query.filter(DraftAttempt.updated_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    click.echo(f'已刪除 {deleted} 份作答草稿')
+
+@app.cli.command('db-upgrade')
+def db_upgrade():
+    """套用尚未執行的資料庫遷移（部署時執行；可在既有資料庫上重複執行）"""
+    applied = migrations.upgrade(db.engine, log=click.echo)
+    click.echo(f'已套用 {len(applied)} 個遷移' if applied else '資料庫已是最新版本')
+
+@app.cli.command('db-status')
+def db_status():
+    """列出各遷移的套用狀態"""
+    applied = migrations.applied_versions(db.engine)
+    for migration in migrations.MIGRATIONS:
+        click.echo(f"{'[x]' if migration.version in applied else '[ ]'} {migration.version}_{migration.name}")
+
+@app.cli.command('build-assets')
+@click.option('--no-minify', is_flag=True, help='不壓縮（未安裝 rjsmin / rcssmin 時，例如本機除錯）')
+def build_assets_command(no_minify):
+    """合併並壓縮 CSS / JS 為內容雜湊檔名的 bundle（static/dist/，部署時執行）"""
+    missing = [] if no_minify else missing_minifiers()
+    if missing:
+        raise click.ClickException(f"未安裝 {', '.join(missing)}，請先執行 pip install -r requirements.txt（或加上 --no-minify）")
+    if no_minify:
+        click.echo('警告：未壓縮 CSS / JS，bundle 僅合併', err=True)
+    for name, filename, original_size, size, gzip_size in build_assets(app.static_folder, minify=not no_minify):
+        click.echo(f'{name} -> {filename}（{original_size / 1024:.1f} KB -> {size / 1024:.1f} KB，gzip {gzip_size / 1024:.1f} KB）')
+
+@app.cli.command('vendor-assets')
+@click.option('--registry', default='https://registry.npmjs.org', show_default=True, help='npm registry 網址')
+def vendor_assets_command(registry):
+    """下載並自行提供 MathJax 與 Font Awesome（需要網路，部署時執行）"""
+    for name, package in VENDOR_PACKAGES.items():
+        try:
+            count, size = vendor_package(app.static_folder, name, registry=registry)
+        except Exception as e:
+            raise click.ClickException(f"下載 {package['package']}@{package['version']} 失敗：{e}")
+        click.echo(f"{package['package']}@{package['version']}：{count} 個檔案（{size / 1024:.1f} KB）")
+
+def hot_queries():
+    """需要由索引支援的常用查詢（作答頁、提交、成績頁、題庫管理、儀表板）"""
+    return {
+        'take_quiz: 依存取代碼找題庫': db.select(QuizBank).where(QuizBank.access_code == 'ABC123', QuizBank.is_active.is_(True)),
+        'take_quiz/submit_quiz: 題庫題目依順序': db.select(Question).where(Question.quiz_bank_id == 1).order_by(Question.order_index),
+        'teacher_dashboard: 教師的題庫': db.select(QuizBank).where(QuizBank.teacher_id == 1),
+        'teacher_dashboard: 題目數': db.select(db.func.count(Question.id)).where(Question.quiz_bank_id == 1),
+        'teacher_dashboard: 作答數': db.select(db.func.count(Submission.id)).where(Submission.quiz_bank_id == 1),
+        'view_submissions: 依時間排序': db.select(Submission.id).where(Submission.quiz_bank_id == 1).order_by(Submission.submitted_at.desc()),
+        'view_submissions: 依分數排序': db.select(Submission.id).where(Submission.quiz_bank_id == 1).order_by(Submission.score.desc()),
+        'view_submissions: 本頁排名': db.select(db.func.count(Submission.id)).where(Submission.quiz_bank_id == 1, Submission.score > 5),
+        'manage_question: 需重新評分的作答數': db.select(db.func.count(Submission.id)).where(
+            Submission.quiz_bank_id == 1, ~db.exists().where(ArchivedSubmission.submission_id == Submission.id)),
+        'view_result: 作答': db.select(Submission).where(Submission.id == 1),
+        'view_result: 封存作答位置': db.select(ArchivedSubmission).where(ArchivedSubmission.submission_id == 1),
+        'rehydrate_quiz_bank: 題庫的封存檔': db.select(SubmissionArchive.id).where(SubmissionArchive.quiz_bank_id == 1, SubmissionArchive.status == 'archived'),
+        'question_stats: 逐題彙總': db.select(SubmissionAnswer.question_id, db.func.count()).where(SubmissionAnswer.quiz_bank_id == 1).group_by(SubmissionAnswer.question_id),
+        'similar_submissions: 新增的簽章': db.select(AnswerSignature.submission_id, AnswerSignature.signature).where(AnswerSignature.quiz_bank_id == 1, AnswerSignature.submission_id > 0).order_by(AnswerSignature.submission_id),
+    }
+
+@app.cli.command('check-query-plans')
+def check_query_plans():
+    """以 EXPLAIN 確認常用查詢都使用索引；有查詢未使用索引時以非零狀態結束（可用於 CI）"""
+    pending = migrations.pending_migrations(db.engine)
+    if pending:
+        click.echo(f"警告：尚有未套用的遷移（{', '.join(m.version for m in pending)}），請先執行 flask db-upgrade")
+    failures = 0
+    with db.engine.connect() as connection:
+        for name, statement in hot_queries().items():
+            uses_index, plan = migrations.explain(connection, statement)
+            failures += not uses_index
+            click.echo(f"{'OK  ' if uses_index else 'FAIL'} {name}")
+            if not uses_index:
+                for line in plan:
+                    click.echo(f'       {line}')
+    if failures:
+        raise click.ClickException(f'{failures} 個查詢未使用索引，請確認已執行 flask db-upgrade')
+    click.echo('所有常用查詢皆使用索引')
+
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        migrations.upgrade(db.engine)
     
     # 根據環境決定運行方式
     if ENVIRONMENT == 'development':
@@ -714,5 +2111,5 @@ else:
     should_init_db = os.environ.get('INIT_DB', 'false').lower() == 'true'
     if should_init_db:
         with app.app_context():
-            db.create_all()
-            print("數據庫初始化完成")
\ No newline at end of file
+            migrations.upgrade(db.engine)
+            app.logger.info("數據庫初始化完成")
\ No newline at end of file
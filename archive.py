@@ -0,0 +1,58 @@
+# 作答封存
+# 已關閉或長期沒有作答的題庫，其作答連同逐題結果、逐題作答、簽章與收據寫入 JSON Lines + gzip 封存檔，
+# 再從資料表中刪除，讓 submission 資料表只保留仍在使用的題庫。
+# 封存檔以 SHA-256 校驗，讀回（rehydrate）時先確認檔案完整；資料庫操作由 app.py 負責。
+import gzip
+import hashlib
+import json
+import os
+
+FORMAT = 'jsonl.gz/1'
+
+
+def archive_path(base_dir, quiz_bank_id, name):
+    return os.path.join(base_dir, f'quiz_bank_{quiz_bank_id}', f'{name}.jsonl.gz')
+
+
+def write_archive(path, records):
+    """寫入封存檔並回傳 (SHA-256, 檔案大小)；先寫入暫存檔並 fsync，完成後才改名，不會留下不完整的檔案"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6, mtime=0) as compressed:
+            for record in records:
+                compressed.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+                compressed.write(b'\n')
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(temporary, path)
+    return file_checksum(path), os.path.getsize(path)
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ArchiveCorrupted(Exception):
+    pass
+
+
+def read_archive(path, checksum=None):
+    """讀出封存檔中的所有作答紀錄；checksum 不符時引發 ArchiveCorrupted"""
+    if not os.path.exists(path):
+        raise ArchiveCorrupted(f'找不到封存檔：{path}')
+    if checksum is not None and file_checksum(path) != checksum:
+        raise ArchiveCorrupted(f'封存檔校驗失敗：{path}')
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def remove_archive(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,330 @@
+# 靜態資源
+# build_assets 依 BUNDLES 將 static/ 下的 CSS / JS 合併並以 rjsmin / rcssmin 壓縮為以內容雜湊命名的檔案（static/dist/），
+# 並產生預先壓縮的 .gz（安裝 brotli 套件時另有 .br）；StaticAssets 以永久快取標頭提供這些檔案，
+# 檔名隨內容改變，部署新版後瀏覽器自然取得新檔。未建置或 debug 模式時模板直接引用原始檔。
+# vendor_package 由 npm 下載固定版本的 MathJax 與 Font Awesome，只保留網站用到的檔案，自行提供後不再依賴 CDN。
+# StaticAssets 另外壓縮動態產生的 HTML / JSON 回應。
+import base64
+import fnmatch
+import gzip
+import hashlib
+import importlib.util
+import io
+import json
+import mimetypes
+import os
+import shutil
+import tarfile
+import urllib.request
+
+from flask import abort, request, send_file, url_for
+from markupsafe import Markup, escape
+from werkzeug.security import safe_join
+
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+HASH_LENGTH = 8
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# bundle 名稱 -> 依序合併的原始檔（相對於 static/）
+BUNDLES = {
+    'common.css': ['css/style.css'],
+    'common.js': ['js/main.js'],
+    'mathjax_config.js': ['js/mathjax_config.js'],
+    'take_quiz.js': ['js/quiz_storage.js', 'js/pages/take_quiz.js'],
+    'manage_quiz_bank.js': ['js/pages/manage_quiz_bank.js'],
+    'submissions.js': ['js/pages/submissions.js'],
+    'teacher_dashboard.js': ['js/pages/teacher_dashboard.js'],
+    'create_quiz_bank.js': ['js/pages/create_quiz_bank.js'],
+    'login.js': ['js/pages/login.js'],
+    'register.js': ['js/pages/register.js'],
+    'result.css': ['css/pages/result.css'],
+    'result.js': ['js/pages/result.js'],
+}
+
+# 自行提供的第三方套件：files 為保留的檔案（fnmatch 樣式，相對於套件根目錄），未下載時改用 cdn
+VENDOR_PACKAGES = {
+    # 只保留 TeX 輸入 + CommonHTML 輸出元件、按需載入的 TeX 擴充與 woff-v2 字型（不含 MathML 輸入、SVG 輸出與語音模組）
+    'mathjax': {
+        'package': 'mathjax',
+        'version': '3.2.2',
+        'files': ['es5/tex-chtml.js', 'es5/input/tex/extensions/*', 'es5/output/chtml/fonts/woff-v2/*'],
+        'cdn': 'https://cdn.jsdelivr.net/npm/mathjax@3.2.2/',
+    },
+    # 現代瀏覽器只會下載 woff2 / woff，不保留 eot、svg、ttf 字型
+    'fontawesome': {
+        'package': '@fortawesome/fontawesome-free',
+        'version': '5.15.4',
+        'files': ['css/all.min.css', 'webfonts/*.woff2', 'webfonts/*.woff'],
+        'cdn': 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.4/',
+    },
+}
+NPM_REGISTRY = 'https://registry.npmjs.org'
+
+COMPRESSIBLE_EXTENSIONS = ('.js', '.css', '.svg', '.json')
+COMPRESSIBLE_MIMETYPES = {'text/html', 'application/json', 'text/plain', 'text/csv', 'application/x-ndjson'}
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# ---- 壓縮（minify） ----
+
+# 副檔名對應的 minify 套件（見 requirements.txt）
+MINIFIERS = {'.js': 'rjsmin', '.css': 'rcssmin'}
+
+
+def missing_minifiers():
+    """回傳尚未安裝的 minify 套件名稱"""
+    return [name for name in MINIFIERS.values() if importlib.util.find_spec(name) is None]
+
+
+def minify_js(source):
+    import rjsmin
+    return rjsmin.jsmin(source)
+
+
+def minify_css(source):
+    import rcssmin
+    return rcssmin.cssmin(source)
+
+
+# ---- 建置 ----
+
+def _write_file(path, data):
+    """先寫入暫存檔再改名，正在提供檔案的其他行程不會讀到寫到一半的內容"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+def precompress(path, data):
+    """寫入 path 的 .gz（與 .br）版本，回傳 gzip 後的大小"""
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    _write_file(f'{path}.gz', compressed)
+    if brotli is not None:
+        _write_file(f'{path}.br', brotli.compress(data, quality=11))
+    return len(compressed)
+
+
+def build_bundle(static_folder, sources, minify=True):
+    """合併（並壓縮）一個 bundle 的原始檔，回傳內容（bytes）"""
+    parts = []
+    for source in sources:
+        with open(os.path.join(static_folder, source), encoding='utf-8') as f:
+            parts.append(f.read())
+    if sources[0].endswith('.css'):
+        content = '\n'.join(parts)
+        return (minify_css(content) if minify else content).encode('utf-8')
+    # 各檔案以分號隔開，避免前一個檔案結尾沒有分號時與下一個檔案相連
+    content = ';\n'.join(parts)
+    return (minify_js(content) if minify else content).encode('utf-8')
+
+
+def build_assets(static_folder, bundles=BUNDLES, minify=True):
+    """建置所有 bundle 並寫入 manifest，回傳 [(bundle, 檔名, 原始大小, 壓縮後大小, gzip 大小)]
+
+    minify=True 時需要 rjsmin 與 rcssmin（未安裝時 ImportError，建置前可用 missing_minifiers() 檢查）。
+
+    舊版的 bundle 不刪除：仍在快取中的舊頁面（例如測驗頁 HTML 快取）引用的檔名在部署後仍可取得。
+    """
+    dist_folder = os.path.join(static_folder, DIST_DIR)
+    manifest = {}
+    report = []
+    for name, sources in bundles.items():
+        original_size = sum(os.path.getsize(os.path.join(static_folder, source)) for source in sources)
+        data = build_bundle(static_folder, sources, minify=minify)
+        stem, extension = os.path.splitext(name)
+        filename = f'{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{extension}'
+        path = os.path.join(dist_folder, filename)
+        _write_file(path, data)
+        report.append((name, filename, original_size, len(data), precompress(path, data)))
+        manifest[name] = filename
+    _write_file(os.path.join(dist_folder, MANIFEST),
+                json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return report
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def vendor_directory(name):
+    package = VENDOR_PACKAGES[name]
+    return f"vendor/{name}-{package['version']}"
+
+
+def vendor_package(static_folder, name, registry=NPM_REGISTRY):
+    """由 npm 下載套件壓縮檔，以 registry 提供的 integrity（SHA-512）校驗後只解出 files 指定的檔案
+
+    回傳 (檔案數, 總大小)。
+    """
+    package = VENDOR_PACKAGES[name]
+    metadata_url = f"{registry.rstrip('/')}/{package['package'].replace('/', '%2f')}/{package['version']}"
+    with urllib.request.urlopen(metadata_url, timeout=30) as response:
+        dist = json.load(response)['dist']
+    with urllib.request.urlopen(dist['tarball'], timeout=120) as response:
+        tarball = response.read()
+    algorithm, _, expected = dist['integrity'].partition('-')
+    if algorithm != 'sha512' or base64.b64encode(hashlib.sha512(tarball).digest()).decode() != expected:
+        raise ValueError(f"{package['package']}@{package['version']} 校驗失敗")
+
+    target = os.path.join(static_folder, DIST_DIR, vendor_directory(name))
+    temporary = f'{target}.tmp'
+    shutil.rmtree(temporary, ignore_errors=True)
+    count = total = 0
+    with tarfile.open(fileobj=io.BytesIO(tarball), mode='r:gz') as archive:
+        for member in archive.getmembers():
+            # npm 套件的檔案都在 package/ 之下
+            relative = member.name.split('/', 1)[-1]
+            if (not member.isfile() or '..' in relative.split('/')
+                    or not any(fnmatch.fnmatch(relative, pattern) for pattern in package['files'])):
+                continue
+            data = archive.extractfile(member).read()
+            path = os.path.join(temporary, *relative.split('/'))
+            _write_file(path, data)
+            if relative.endswith(COMPRESSIBLE_EXTENSIONS):
+                precompress(path, data)
+            count += 1
+            total += len(data)
+    if not count:
+        raise ValueError(f"{package['package']}@{package['version']} 中沒有符合的檔案")
+    # 整個目錄完成後才換上，vendor_url 不會在下載途中指向不完整的目錄
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(temporary, target)
+    return count, total
+
+
+# ---- 提供 ----
+
+def _accepts(encoding):
+    return request.accept_encodings[encoding] > 0
+
+
+class StaticAssets:
+    """模板中的資源網址、/static/dist/ 的永久快取與動態回應壓縮
+
+    use_bundles：None 時非 debug 模式才使用建置後的 bundle。
+    compress_min_size：動態回應超過此位元組數才壓縮；None 表示不壓縮（例如已由反向代理壓縮）。
+    """
+
+    def __init__(self, app=None, use_bundles=None, compress_min_size=1024, compress_level=6):
+        self.use_bundles = use_bundles
+        self.compress_min_size = compress_min_size
+        self.compress_level = compress_level
+        self.manifest = {}
+        self._vendored = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.dist_folder = os.path.join(app.static_folder, DIST_DIR)
+        self.manifest = load_manifest(app.static_folder)
+        app.add_url_rule(f'{app.static_url_path}/{DIST_DIR}/<path:filename>', 'static_dist', self._dist_view)
+        app.add_template_global(self.asset_tags, 'asset_tags')
+        app.add_template_global(self.vendor_url, 'vendor_url')
+        if self.compress_min_size is not None:
+            app.after_request(self._compress_response)
+
+    def _bundles_enabled(self):
+        if self.use_bundles is not None:
+            return self.use_bundles
+        return not self.app.debug
+
+    def asset_urls(self, bundle):
+        filename = self.manifest.get(bundle) if self._bundles_enabled() else None
+        if filename:
+            return [url_for('static_dist', filename=filename)]
+        return [url_for('static', filename=source) for source in BUNDLES[bundle]]
+
+    def asset_tags(self, bundle):
+        """bundle 的 <link> / <script> 標籤（未建置時為各原始檔）"""
+        template = '<link rel="stylesheet" href="{}">' if bundle.endswith('.css') else '<script src="{}"></script>'
+        return Markup('\n'.join(template.format(escape(url)) for url in self.asset_urls(bundle)))
+
+    def vendor_url(self, name, path):
+        """第三方套件檔案的網址：已執行 flask vendor-assets 時為本站，否則為 CDN"""
+        local = f'{vendor_directory(name)}/{path}'
+        if local not in self._vendored:
+            self._vendored[local] = os.path.isfile(os.path.join(self.dist_folder, *local.split('/')))
+        if self._vendored[local]:
+            return url_for('static_dist', filename=local)
+        return VENDOR_PACKAGES[name]['cdn'] + path
+
+    def _dist_view(self, filename):
+        path = safe_join(self.dist_folder, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        encoding = None
+        for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if os.path.isfile(path + suffix) and _accepts(candidate):
+                encoding, path = candidate, path + suffix
+                break
+        response = send_file(path, mimetype=mimetype, conditional=True, max_age=IMMUTABLE_MAX_AGE)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if filename.endswith(COMPRESSIBLE_EXTENSIONS):
+            response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    def _negotiate(self, available=('br', 'gzip')):
+        for encoding in available:
+            if (encoding != 'br' or brotli is not None) and _accepts(encoding):
+                return encoding
+        return None
+
+    def _compress(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=min(self.compress_level, 11))
+        return gzip.compress(data, compresslevel=self.compress_level, mtime=0)
+
+    def _set_encoded(self, response, encoding, data):
+        response.set_data(data)
+        response.headers['Content-Encoding'] = encoding
+        # 壓縮後的內容與原本不同，ETag 改為弱比對（If-None-Match 本來就以弱比對判斷）
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+
+    def compressed_variants(self, body):
+        """預先壓縮要快取的回應內容，回傳 {編碼: base64}（可 JSON 序列化，與快取的頁面存在一起）"""
+        data = body.encode('utf-8') if isinstance(body, str) else body
+        if self.compress_min_size is None or len(data) < self.compress_min_size:
+            return {}
+        encodings = ('br', 'gzip') if brotli is not None else ('gzip',)
+        return {encoding: base64.b64encode(self._compress(data, encoding)).decode('ascii') for encoding in encodings}
+
+    def use_variant(self, response, variants):
+        """依 Accept-Encoding 改用 compressed_variants() 預先壓縮的內容，不必每個請求重新壓縮"""
+        if response.status_code != 200 or not variants:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = self._negotiate(tuple(variants))
+        if encoding is not None:
+            self._set_encoded(response, encoding, base64.b64decode(variants[encoding]))
+        return response
+
+    def _compress_response(self, response):
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers):
+            return response
+        data = response.get_data()
+        if len(data) < self.compress_min_size:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = self._negotiate()
+        if encoding is not None:
+            self._set_encoded(response, encoding, self._compress(data, encoding))
+        return response
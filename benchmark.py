@@ -0,0 +1,418 @@
+# 效能基準測試
+# 依指定規模建立測試資料（教師、題庫、各題型題目、作答），
+# 量測作答提交、成績頁、成績列表與教師儀表板的吞吐量及 p50/p99 延遲，結果輸出為 JSON 以便比較不同版本。
+#
+# 用法：
+#   python benchmark.py --output before.json
+#   python benchmark.py --mode http --concurrency 16 --output after.json --compare before.json
+#   python benchmark.py --database-url postgresql://localhost/quiz_bench --submissions 2000
+#   python benchmark.py --mode http --url http://127.0.0.1:8000 --skip-seed   # 量測已啟動的 gunicorn（需使用同一個資料庫）
+#   python benchmark.py --mode http --url http://127.0.0.1:8000 --skip-seed --concurrency 16,64,256 --scenario quiz --scenario submit
+#   python benchmark.py --mode http --concurrency 500 --scenario draft   # 草稿儲存（量測已啟動的伺服器時需設定 DRAFT_SAVE_INTERVAL=0）
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http.cookiejar import CookieJar
+
+import click
+
+TEACHER_PREFIX = 'bench-teacher-'
+TEACHER_PASSWORD = 'bench-password'
+SCENARIOS = ('dashboard', 'submissions', 'quiz', 'result', 'submit', 'draft')
+# 學生端情境不需登入
+STUDENT_SCENARIOS = ('quiz', 'result', 'submit', 'draft')
+DRAFTS_PER_BANK = 200
+QUESTION_TYPES = ('single_choice', 'multiple_choice', 'fill_blank', 'dropdown', 'dropdown_fillblank', 'parsons')
+
+
+def build_question_data(question_type, index):
+    """產生各題型的題目資料"""
+    if question_type in ('single_choice', 'dropdown'):
+        options = [f'選項 {index}-{i}' for i in range(4)]
+        return {'options': options, 'correct_answer': options[index % 4]}
+    if question_type == 'multiple_choice':
+        options = [f'選項 {index}-{i}' for i in range(5)]
+        return {'options': options, 'correct_answers': options[:2 + index % 2]}
+    if question_type == 'fill_blank':
+        return {'correct_answer': f'Answer {index}'}
+    if question_type == 'dropdown_fillblank':
+        return {'blanks': [{'options': ['a', 'b', 'c'], 'correct_answer': 'abc'[(index + i) % 3]} for i in range(3)]}
+    # parsons
+    labels = ['A', 'B', 'C', 'D']
+    return {
+        'code_blocks': {label: f'line_{index}_{label}()' for label in labels},
+        'answer_slots': len(labels),
+        'slot_answers': {str(i + 1): label for i, label in enumerate(labels)},
+        'fixed_blocks': {},
+    }
+
+
+def build_answer(question_type, question_data, rng, correct_rate):
+    """依題目資料產生一份作答，約 correct_rate 比例答對"""
+    correct = rng.random() < correct_rate
+    if question_type in ('single_choice', 'dropdown'):
+        return question_data['correct_answer'] if correct else rng.choice(question_data['options'])
+    if question_type == 'multiple_choice':
+        return list(question_data['correct_answers']) if correct else rng.sample(question_data['options'], 2)
+    if question_type == 'fill_blank':
+        return question_data['correct_answer'].lower() if correct else 'wrong'
+    if question_type == 'dropdown_fillblank':
+        return {f'blank_{i}': blank['correct_answer'] if correct else rng.choice(blank['options'])
+                for i, blank in enumerate(question_data['blanks'])}
+    if question_type == 'parsons':
+        slot_answers = dict(question_data['slot_answers'])
+        if not correct:
+            labels = list(slot_answers.values())
+            rng.shuffle(labels)
+            slot_answers = {slot: label for slot, label in zip(slot_answers, labels)}
+        return {'slot_answers': slot_answers}
+    return None
+
+
+def question_specs(questions):
+    """將題目轉為 (題目ID, 題型, 題目資料) 以便在資料庫連線之外產生作答"""
+    return [(q.id, q.question_type, json.loads(q.question_data) if q.question_data else {}) for q in questions]
+
+
+def build_answers(specs, rng, correct_rate=0.6):
+    return {str(question_id): build_answer(question_type, question_data, rng, correct_rate)
+            for question_id, question_type, question_data in specs}
+
+
+def seed(A, teachers, banks, questions, submissions, rng):
+    """建立測試資料（banks、questions、submissions 皆為每位教師 / 每個題庫的數量）"""
+    db = A.db
+    password_hash = A.generate_password_hash(TEACHER_PASSWORD)
+    now = datetime.utcnow()
+    for t in range(teachers):
+        teacher = A.User(username=f'{TEACHER_PREFIX}{t}', email=f'{TEACHER_PREFIX}{t}@example.com',
+                         password_hash=password_hash, is_teacher=True)
+        db.session.add(teacher)
+        db.session.flush()
+        for b in range(banks):
+            quiz_bank = A.QuizBank(title=f'基準測試題庫 {t}-{b}', description='benchmark',
+                                   access_code=f'B{t:03d}{b:03d}', teacher_id=teacher.id)
+            db.session.add(quiz_bank)
+            db.session.flush()
+            db.session.add_all([
+                A.Question(title=f'第 {q + 1} 題', question_text=f'基準測試題目 {q + 1}',
+                           question_type=QUESTION_TYPES[q % len(QUESTION_TYPES)],
+                           question_data=json.dumps(build_question_data(QUESTION_TYPES[q % len(QUESTION_TYPES)], q),
+                                                    ensure_ascii=False),
+                           points=1 + q % 3, order_index=q, quiz_bank_id=quiz_bank.id)
+                for q in range(questions)
+            ])
+            db.session.commit()
+
+            bank_questions = A.Question.query.filter_by(quiz_bank_id=quiz_bank.id).order_by(A.Question.order_index).all()
+            answer_key = A.get_answer_key(quiz_bank.id, bank_questions)
+            specs = question_specs(bank_questions)
+            for start in range(0, submissions, 1000):
+                batch = []
+                for s in range(start, min(start + 1000, submissions)):
+                    answers = build_answers(specs, rng)
+                    grade_result = answer_key.grade(answers)
+                    batch.append(A.Submission(
+                        student_name=f'學生 {s}', student_email=f'student{s}@example.com',
+                        answers=json.dumps(answers, ensure_ascii=False),
+                        score=grade_result.score, total_points=grade_result.total_points,
+                        submitted_at=now - timedelta(seconds=rng.randrange(30 * 86400)),
+                        quiz_bank_id=quiz_bank.id,
+                        result=A.SubmissionResult(results=A.serialize_results(grade_result.results)),
+                    ))
+                db.session.add_all(batch)
+                db.session.commit()
+
+            db.session.add_all([
+                A.DraftAttempt(quiz_bank_id=quiz_bank.id, student_name=f'作答中 {d}') for d in range(DRAFTS_PER_BANK)
+            ])
+            db.session.commit()
+
+
+def load_workload(A):
+    """從資料庫讀取基準測試用的題庫、作答與題目（--skip-seed 時也可使用）"""
+    teacher = A.User.query.filter_by(username=f'{TEACHER_PREFIX}0').first()
+    if teacher is None:
+        raise click.ClickException('資料庫中沒有基準測試資料，請先執行（不加 --skip-seed）')
+    banks = []
+    for quiz_bank in A.QuizBank.query.filter_by(teacher_id=teacher.id).order_by(A.QuizBank.id).all():
+        questions = A.Question.query.filter_by(quiz_bank_id=quiz_bank.id).order_by(A.Question.order_index).all()
+        drafts = [row[0] for row in A.db.session.query(A.DraftAttempt.id).filter(
+            A.DraftAttempt.quiz_bank_id == quiz_bank.id, A.DraftAttempt.submitted_at.is_(None)
+        ).limit(DRAFTS_PER_BANK).all()]
+        banks.append({'id': quiz_bank.id, 'access_code': quiz_bank.access_code, 'questions': question_specs(questions),
+                      'drafts': drafts})
+    submission_ids = [row[0] for row in A.db.session.query(A.Submission.id).filter(
+        A.Submission.quiz_bank_id.in_([bank['id'] for bank in banks])
+    ).limit(1000).all()]
+    return {'username': teacher.username, 'banks': banks, 'submission_ids': submission_ids}
+
+
+def build_request(scenario, workload, rng):
+    """回傳 (method, path, json)"""
+    bank = rng.choice(workload['banks'])
+    if scenario == 'dashboard':
+        return 'GET', '/teacher-dashboard', None
+    if scenario == 'submissions':
+        return 'GET', f"/api/quiz-bank/{bank['id']}/submissions?limit=50", None
+    if scenario == 'quiz':
+        return 'GET', f"/quiz/{bank['access_code']}", None
+    if scenario == 'result':
+        return 'GET', f"/result/{rng.choice(workload['submission_ids'])}", None
+    if scenario == 'draft':
+        # 自動儲存：每次只送出一題的變更
+        spec = rng.choice(bank['questions'])
+        return 'PATCH', f"/api/quiz/{bank['access_code']}/drafts/{rng.choice(bank['drafts'])}", {
+            'changes': build_answers([spec], rng),
+        }
+    return 'POST', f"/api/quiz/{bank['access_code']}/submit", {
+        'student_name': f'壓測學生 {rng.randrange(10 ** 6)}',
+        'student_email': 'load@example.com',
+        'answers': build_answers(bank['questions'], rng),
+    }
+
+
+def summarize(latencies, errors, elapsed):
+    """延遲以毫秒計，百分位數採最近排名法"""
+    latencies = sorted(latencies)
+    count = len(latencies)
+
+    def percentile(p):
+        return round(latencies[max(0, -(-p * count // 100) - 1)] * 1000, 3) if count else None
+
+    return {
+        'requests': count,
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(count / elapsed, 2) if elapsed > 0 else None,
+        'mean_ms': round(sum(latencies) / count * 1000, 3) if count else None,
+        'p50_ms': percentile(50),
+        'p90_ms': percentile(90),
+        'p99_ms': percentile(99),
+        'max_ms': round(latencies[-1] * 1000, 3) if count else None,
+    }
+
+
+def run_test_client(A, workload, scenario, requests, warmup, rng):
+    """以 Flask test client 逐一送出請求（不含網路與序列化成本，適合比較程式本身的差異）"""
+    client = A.app.test_client()
+    if scenario not in STUDENT_SCENARIOS:
+        response = client.post('/login', json={'username': workload['username'], 'password': TEACHER_PASSWORD})
+        if response.status_code != 200:
+            raise click.ClickException('基準測試教師登入失敗')
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for i in range(warmup + requests):
+        method, path, payload = build_request(scenario, workload, rng)
+        if i == warmup:
+            started = time.perf_counter()
+        begin = time.perf_counter()
+        response = client.open(path, method=method, json=payload)
+        response.get_data()
+        if i >= warmup:
+            latencies.append(time.perf_counter() - begin)
+            errors += response.status_code >= 400
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+class _HttpClient:
+    """每個並行工作者各自的 HTTP 連線與登入 cookie"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+
+    def request(self, method, path, payload=None):
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                         headers={'Content-Type': 'application/json'} if data else {})
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+
+def run_http(base_url, workload, scenario, requests, warmup, concurrency, seed_value):
+    """以多個執行緒同時發送 HTTP 請求，量測含網路與伺服器並行處理的整體表現"""
+    per_worker = max(1, requests // concurrency)
+
+    def worker(index):
+        rng = random.Random(seed_value * 1000 + index)
+        client = _HttpClient(base_url)
+        if scenario not in STUDENT_SCENARIOS:
+            client.request('POST', '/login', {'username': workload['username'], 'password': TEACHER_PASSWORD})
+        for _ in range(max(1, warmup // concurrency)):
+            client.request(*build_request(scenario, workload, rng))
+        barrier.wait()
+        latencies = []
+        errors = 0
+        for _ in range(per_worker):
+            method, path, payload = build_request(scenario, workload, rng)
+            begin = time.perf_counter()
+            status = client.request(method, path, payload)
+            latencies.append(time.perf_counter() - begin)
+            errors += status >= 400
+        return latencies, errors
+
+    barrier = threading.Barrier(concurrency + 1)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(worker, i) for i in range(concurrency)]
+        barrier.wait()
+        started = time.perf_counter()
+        outcomes = [future.result() for future in futures]
+        elapsed = time.perf_counter() - started
+    return summarize([l for latencies, _ in outcomes for l in latencies],
+                     sum(errors for _, errors in outcomes), elapsed)
+
+
+def start_local_server(app):
+    """在背景執行緒啟動多執行緒的 werkzeug 伺服器，回傳 (網址, 伺服器)"""
+    import logging
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', server
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_comparison(baseline, report):
+    """以表格列出與基準結果的差異（延遲變化為負代表變快）"""
+    click.echo(f"\n與 {baseline['meta'].get('commit')} 比較：")
+    click.echo('情境 | p50 (ms) | p99 (ms) | 吞吐量 (req/s)')
+    for scenario, current in report['results'].items():
+        previous = baseline['results'].get(scenario)
+        if previous is None:
+            click.echo(f'{scenario} | 基準結果中沒有此情境')
+            continue
+        cells = []
+        for key in ('p50_ms', 'p99_ms', 'throughput_rps'):
+            before, after = previous.get(key), current.get(key)
+            change = f'{(after - before) / before * 100:+.1f}%' if before and after is not None else 'n/a'
+            cells.append(f'{before} -> {after} ({change})')
+        click.echo(f"{scenario} | {' | '.join(cells)}")
+
+
+@click.command()
+@click.option('--database-url', default=None, help='資料庫網址（預設為暫存目錄中的 SQLite 檔案）')
+@click.option('--mode', type=click.Choice(['client', 'http', 'both']), default='client', show_default=True,
+              help='client：Flask test client；http：並行 HTTP 負載')
+@click.option('--url', default=None, help='http 模式的伺服器網址（預設在本行程啟動 werkzeug 伺服器）')
+@click.option('--teachers', default=2, show_default=True, help='教師數')
+@click.option('--banks', default=3, show_default=True, help='每位教師的題庫數')
+@click.option('--questions', default=24, show_default=True, help='每個題庫的題目數（各題型輪流）')
+@click.option('--submissions', default=500, show_default=True, help='每個題庫的作答數')
+@click.option('--requests', 'request_count', default=200, show_default=True, help='每個情境量測的請求數')
+@click.option('--warmup', default=20, show_default=True, help='每個情境的暖身請求數（不計入結果）')
+@click.option('--concurrency', default='8', show_default=True,
+              help='http 模式的並行數；以逗號分隔多個值（如 8,32,128）可量測不同同時連線數下的表現')
+@click.option('--scenario', 'scenarios', multiple=True, type=click.Choice(SCENARIOS),
+              help='只執行指定情境（可重複指定）')
+@click.option('--seed', 'seed_value', default=42, show_default=True, help='亂數種子')
+@click.option('--skip-seed', is_flag=True, help='沿用資料庫中既有的基準測試資料')
+@click.option('--output', type=click.Path(dir_okay=False), default=None, help='將結果寫入 JSON 檔')
+@click.option('--compare', type=click.Path(exists=True, dir_okay=False), default=None, help='與先前的 JSON 結果比較')
+def main(database_url, mode, url, teachers, banks, questions, submissions, request_count, warmup, concurrency,
+         scenarios, seed_value, skip_seed, output, compare):
+    """建立測試資料並量測主要頁面與 API 的效能"""
+    try:
+        concurrency_levels = [int(level) for level in str(concurrency).split(',') if level.strip()]
+    except ValueError:
+        raise click.BadParameter('需為整數或以逗號分隔的整數', param_hint='--concurrency')
+    if database_url is None:
+        database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='quiz-bench-'), 'benchmark.db')
+    # app 在匯入時依環境變數決定資料庫，必須先設定
+    os.environ['FLASK_ENV'] = 'production'
+    os.environ['DATABASE_URL'] = database_url
+    # 同一份草稿會被重複儲存，關閉儲存頻率限制以量測寫入本身
+    os.environ.setdefault('DRAFT_SAVE_INTERVAL', '0')
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as A
+
+    rng = random.Random(seed_value)
+    seed_seconds = None
+    with A.app.app_context():
+        A.db.create_all()
+        if not skip_seed:
+            if A.User.query.filter(A.User.username.like(f'{TEACHER_PREFIX}%')).first() is not None:
+                raise click.ClickException('資料庫中已有基準測試資料，請改用 --skip-seed 或使用新的資料庫')
+            click.echo(f'建立測試資料：{teachers} 位教師 x {banks} 個題庫 x {questions} 題 / {submissions} 份作答')
+            started = time.perf_counter()
+            seed(A, teachers, banks, questions, submissions, rng)
+            seed_seconds = round(time.perf_counter() - started, 2)
+        workload = load_workload(A)
+        dialect = A.db.engine.dialect.name
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': dialect,
+            'mode': mode,
+            'concurrency': concurrency_levels if mode != 'client' else None,
+            'requests': request_count,
+            'warmup': warmup,
+            'seed': {'teachers': teachers, 'banks': banks, 'questions': questions,
+                     'submissions': submissions, 'random_seed': seed_value, 'seconds': seed_seconds},
+        },
+        'results': {},
+    }
+
+    server = None
+    if mode in ('http', 'both') and url is None:
+        url, server = start_local_server(A.app)
+    try:
+        # --requests 0 時只建立測試資料
+        for scenario in (scenarios or SCENARIOS) if request_count > 0 else ():
+            if mode in ('client', 'both'):
+                with A.app.app_context():
+                    result = run_test_client(A, workload, scenario, request_count, warmup, rng)
+                report['results'][scenario if mode == 'client' else f'{scenario}:client'] = result
+                click.echo(f"{scenario:<12} client  p50={result['p50_ms']}ms p99={result['p99_ms']}ms "
+                           f"{result['throughput_rps']} req/s errors={result['errors']}")
+            for level in concurrency_levels if mode in ('http', 'both') else ():
+                result = run_http(url, workload, scenario, max(request_count, level), warmup, level, seed_value)
+                key = scenario if mode == 'http' else f'{scenario}:http'
+                if len(concurrency_levels) > 1:
+                    key = f'{key}@{level}'
+                report['results'][key] = result
+                click.echo(f"{scenario:<12} http x{level:<4} p50={result['p50_ms']}ms p99={result['p99_ms']}ms "
+                           f"{result['throughput_rps']} req/s errors={result['errors']}")
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        click.echo(f'結果已寫入 {output}')
+    if compare:
+        with open(compare, encoding='utf-8') as f:
+            print_comparison(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+# 快取後端
+# 提供行程內 LRU 快取，以及多個 worker 共用的 SQLite / Redis 後端。
+# 失效採「版本號」方式：每個題庫的版本號存在資料庫（quiz_bank.cache_version），題目或狀態變更時遞增，
+# 各 worker 與行程以 (題庫, 版本號) 查詢快取，舊版本的項目自然不再命中；快取本身只存內容，不存版本號。
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryCache:
+    """行程內 LRU 快取"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key, value, ttl):
+        self._entries[key] = (value, time.monotonic() + ttl if ttl else None)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._set(key, value, ttl)
+
+    def add(self, key, value, ttl=None):
+        """鍵不存在時才寫入，回傳目前的值"""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and (item[1] is None or item[1] >= time.monotonic()):
+                return item[0]
+            self._set(key, value, ttl)
+            return value
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SQLiteCache:
+    """以 SQLite 檔案實作的共用快取，適用同一主機上的多個 gunicorn worker"""
+
+    PURGE_EVERY = 500
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)'
+        )
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT value, expires_at FROM cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return None
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        connection = self._connection()
+        connection.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, json.dumps(value), time.time() + ttl if ttl else None)
+        )
+        # 定期清除過期項目，避免舊版本的內容累積
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            connection.execute('DELETE FROM cache WHERE expires_at < ?', (time.time(),))
+
+    def add(self, key, value, ttl=None):
+        connection = self._connection()
+        connection.execute('DELETE FROM cache WHERE key = ? AND expires_at < ?', (key, time.time()))
+        connection.execute(
+            'INSERT OR IGNORE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, json.dumps(value), time.time() + ttl if ttl else None)
+        )
+        return self.get(key)
+
+    def delete(self, key):
+        self._connection().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+
+class RedisCache:
+    """Redis 共用快取，適用多台主機（需另外安裝 redis 套件）"""
+
+    def __init__(self, url, prefix='quiz:'):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self._client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl=None):
+        self._client.set(self.prefix + key, json.dumps(value), ex=ttl)
+
+    def add(self, key, value, ttl=None):
+        self._client.set(self.prefix + key, json.dumps(value), ex=ttl, nx=True)
+        return self.get(key)
+
+    def delete(self, key):
+        self._client.delete(self.prefix + key)
+
+
+def create_cache_backend(url, max_entries=256):
+    """依設定建立快取後端：memory、sqlite:///路徑 或 redis://..."""
+    if not url or url == 'memory':
+        return MemoryCache(max_entries)
+    if url.startswith('sqlite:///'):
+        return SQLiteCache(url[len('sqlite:///'):])
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisCache(url)
+    raise ValueError(f'不支援的快取後端：{url}')
+
+
+class QuizCache:
+    """題庫快取：內容以 (題庫, 版本號) 為鍵存在共用後端，並在本行程保留一份 LRU 副本"""
+
+    def __init__(self, shared, local_max_entries=256, ttl=3600):
+        self.shared = shared
+        self.ttl = ttl
+        # 共用後端本身就是行程內快取時不需要第二層
+        self.local = None if isinstance(shared, MemoryCache) else MemoryCache(local_max_entries)
+
+    def get(self, namespace, quiz_bank_id, version):
+        key = f'bank:{quiz_bank_id}:{namespace}:{version}'
+        if self.local is not None:
+            value = self.local.get(key)
+            if value is not None:
+                return value
+        value = self.shared.get(key)
+        if value is not None and self.local is not None:
+            self.local.set(key, value, self.ttl)
+        return value
+
+    def set(self, namespace, quiz_bank_id, version, value):
+        key = f'bank:{quiz_bank_id}:{namespace}:{version}'
+        self.shared.set(key, value, self.ttl)
+        if self.local is not None:
+            self.local.set(key, value, self.ttl)
@@ -0,0 +1,189 @@
+# 資料庫連線設定
+# 依資料庫種類產生引擎參數：PostgreSQL 使用可設定的連線池（pre-ping、recycle、statement timeout），
+# 也支援交給外部連線池（PgBouncer 交易模式）管理；SQLite 則啟用 WAL 與適合並行寫入的 pragma。
+# 設定唯讀副本時，RoutingSession 將標記為可讀取副本的請求中的查詢交給副本，寫入一律使用主資料庫。
+import itertools
+import os
+import threading
+
+from flask import g, has_app_context, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import NullPool
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_bool(name, default):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes')
+
+
+def external_pooler_enabled():
+    """DB_POOLER=external 時由外部連線池（如 PgBouncer 交易模式）管理連線"""
+    return os.environ.get('DB_POOLER', 'internal').lower() in ('external', 'pgbouncer')
+
+
+def normalize_database_url(database_url):
+    """處理 render.com 等平台提供的 postgres:// 前綴"""
+    if database_url.startswith('postgres://'):
+        return database_url.replace('postgres://', 'postgresql://', 1)
+    return database_url
+
+
+def engine_options(database_url):
+    """依資料庫網址與環境變數產生 SQLALCHEMY_ENGINE_OPTIONS"""
+    if database_url.startswith('sqlite'):
+        # 等待鎖定的秒數；WAL 模式下讀寫可並行，只有寫入彼此排隊
+        return {'connect_args': {'timeout': _env_int('SQLITE_BUSY_TIMEOUT', 30)}}
+
+    options = {}
+    connect_args = {}
+    if database_url.startswith('postgresql'):
+        connect_args['connect_timeout'] = _env_int('DB_CONNECT_TIMEOUT', 10)
+        connect_args['application_name'] = os.environ.get('DB_APPLICATION_NAME', 'quiz-platform')
+    if external_pooler_enabled():
+        # 連線由外部連線池重複使用，應用程式端不再保留連線
+        options['poolclass'] = NullPool
+    else:
+        options.update(
+            # 取出連線前先確認仍可用，閒置後不必等到查詢失敗才重連
+            pool_pre_ping=_env_bool('DB_POOL_PRE_PING', True),
+            pool_size=_env_int('DB_POOL_SIZE', 5),
+            max_overflow=_env_int('DB_MAX_OVERFLOW', 5),
+            pool_timeout=_env_int('DB_POOL_TIMEOUT', 30),
+            # 早於雲端平台或防火牆的閒置斷線時間回收連線，避免拿到已失效的連線
+            pool_recycle=_env_int('DB_POOL_RECYCLE', 1800),
+        )
+        statement_timeout = _env_int('DB_STATEMENT_TIMEOUT_MS', 30000)
+        if database_url.startswith('postgresql') and statement_timeout > 0:
+            connect_args['options'] = f'-c statement_timeout={statement_timeout}'
+    if connect_args:
+        options['connect_args'] = connect_args
+    return options
+
+
+class PoolStatistics:
+    """以連線池事件累計的統計"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidations = 0
+
+    def _increment(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def as_dict(self):
+        return {'connects': self.connects, 'checkouts': self.checkouts, 'invalidations': self.invalidations}
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    # WAL 模式下 NORMAL 在斷電時最多遺失最後的交易，但不會損壞資料庫
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f"PRAGMA busy_timeout={_env_int('SQLITE_BUSY_TIMEOUT', 30) * 1000}")
+    cursor.execute('PRAGMA cache_size=-16000')  # 約 16 MB
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.close()
+
+
+def configure_engine(engine):
+    """註冊連線事件並回傳 PoolStatistics"""
+    statistics = PoolStatistics()
+    event.listen(engine, 'connect', lambda *args: statistics._increment('connects'))
+    event.listen(engine, 'checkout', lambda *args: statistics._increment('checkouts'))
+    event.listen(engine, 'invalidate', lambda *args: statistics._increment('invalidations'))
+
+    if engine.dialect.name == 'sqlite':
+        if engine.url.database not in (None, '', ':memory:'):
+            event.listen(engine, 'connect', _set_sqlite_pragmas)
+    elif engine.dialect.name == 'postgresql' and external_pooler_enabled():
+        # 交易模式的連線池不保留 session 設定，逾時改在每個交易開始時以 SET LOCAL 設定
+        statement_timeout = _env_int('DB_STATEMENT_TIMEOUT_MS', 30000)
+        if statement_timeout > 0:
+            @event.listens_for(engine, 'begin')
+            def _set_statement_timeout(connection):
+                connection.exec_driver_sql(f'SET LOCAL statement_timeout = {statement_timeout}')
+    return statistics
+
+
+def pool_status(engine, statistics=None):
+    """目前連線池狀態"""
+    pool = engine.pool
+    status = {
+        'dialect': engine.dialect.name,
+        'pool_class': type(pool).__name__,
+        'external_pooler': external_pooler_enabled(),
+    }
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        method = getattr(pool, name, None)
+        if callable(method):
+            status[name] = method()
+    if hasattr(pool, '_max_overflow'):
+        status['max_overflow'] = pool._max_overflow
+    if hasattr(pool, '_timeout'):
+        status['timeout'] = pool._timeout
+    if statistics is not None:
+        status.update(statistics.as_dict())
+    return status
+
+
+class ReplicaSet:
+    """唯讀副本的引擎，依序輪流使用"""
+
+    def __init__(self, urls):
+        self.engines = []
+        self.statistics = []
+        for url in urls:
+            url = normalize_database_url(url.strip())
+            engine = create_engine(url, **engine_options(url))
+            self.statistics.append(configure_engine(engine))
+            self.engines.append(engine)
+        self._cycle = itertools.cycle(self.engines)
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return bool(self.engines)
+
+    def choose(self):
+        with self._lock:
+            return next(self._cycle)
+
+    def status(self):
+        return [pool_status(engine, statistics) for engine, statistics in zip(self.engines, self.statistics)]
+
+
+class RoutingSession(Session):
+    """請求設定了 g.db_replica 時，SELECT 由該副本執行；flush、寫入語句，以及同一 session 寫入後的查詢都使用主資料庫"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and not self.info.get('wrote')
+                and clause is not None and clause.is_select and has_app_context()):
+            replica = g.get('db_replica')
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _record_write(session):
+    session.info['wrote'] = True
+    if has_request_context():
+        # 由 app 在回應時記錄寫入時間，之後短時間內的請求改讀主資料庫
+        g.db_wrote = True
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _record_flush(session, flush_context):
+    _record_write(session)
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _record_statement(orm_execute_state):
+    # 以 session.execute 直接執行的 INSERT / UPDATE / DELETE
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _record_write(orm_execute_state.session)
@@ -0,0 +1,192 @@
+# 即時成績推播
+# 新增或刪除作答時發布事件，開啟中的成績頁以 Server-Sent Events 接收，不需重新載入整個列表。
+# 每個題庫一個環狀緩衝區：事件只編碼一次並由所有連線共用，連線以 Condition 等待新事件，不會各自輪詢資料庫。
+# 多個 worker 行程時設定 EVENTS_BACKEND=redis://...，各行程訂閱同一個 Redis 頻道後轉發給本行程的連線；
+# 未設定時每個行程只會收到自己處理的作答。
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+REDIS_CHANNEL = 'quiz:events'
+
+
+class TooManyConnections(Exception):
+    pass
+
+
+def encode_event(event_id, event, data):
+    """編碼為 SSE 格式（data 為單行 JSON）"""
+    return f'id: {event_id}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+
+class _Channel:
+    """單一題庫的事件緩衝區"""
+
+    def __init__(self, buffer_size):
+        self.events = deque(maxlen=buffer_size)  # (事件ID, 編碼後字串)
+        self.last_id = 0
+        self.condition = threading.Condition()
+
+    def since(self, event_id):
+        """event_id 之後的事件；回傳 None 表示緩衝區已不含這段期間的事件"""
+        if event_id > self.last_id:
+            return None
+        if self.events and event_id < self.events[0][0] - 1:
+            return None
+        return [(i, encoded) for i, encoded in self.events if i > event_id]
+
+
+class EventBroker:
+    """行程內的事件分送
+
+    buffer_size：每個題庫保留的最近事件數，斷線重連（Last-Event-ID）時由此補送。
+    max_connections：本行程同時開啟的串流上限，超過時拒絕（用戶端改為定期重新載入）。
+    """
+
+    def __init__(self, buffer_size=200, max_connections=200, heartbeat=15, max_duration=45):
+        self.buffer_size = buffer_size
+        self.max_connections = max_connections
+        self.heartbeat = heartbeat
+        self.max_duration = max_duration
+        self._channels = {}
+        self._lock = threading.Lock()
+        self._connections = 0
+
+    def _channel(self, quiz_bank_id, create=False):
+        channel = self._channels.get(quiz_bank_id)
+        if channel is None and create:
+            with self._lock:
+                channel = self._channels.setdefault(quiz_bank_id, _Channel(self.buffer_size))
+        return channel
+
+    def publish(self, quiz_bank_id, event, data):
+        """發布事件；本行程沒有人訂閱過此題庫時不做任何事"""
+        channel = self._channel(quiz_bank_id)
+        if channel is not None:
+            with channel.condition:
+                self._append(channel, channel.last_id + 1, event, data)
+
+    def deliver(self, quiz_bank_id, event_id, event, data):
+        """加入由其他行程發布、已編號的事件"""
+        channel = self._channel(quiz_bank_id)
+        if channel is not None:
+            with channel.condition:
+                if event_id > channel.last_id:
+                    self._append(channel, event_id, event, data)
+
+    def _append(self, channel, event_id, event, data):
+        channel.events.append((event_id, encode_event(event_id, event, data)))
+        channel.last_id = event_id
+        channel.condition.notify_all()
+
+    def connections(self):
+        return self._connections
+
+    def stream(self, quiz_bank_id, last_event_id=None):
+        """產生 SSE 串流；超過 max_duration 秒後結束，瀏覽器的 EventSource 會帶 Last-Event-ID 自動重連"""
+        if self._connections >= self.max_connections:
+            raise TooManyConnections()
+        channel = self._channel(quiz_bank_id, create=True)
+        # 在收到請求時決定起點，之後到串流開始前發布的事件也會送出
+        with channel.condition:
+            start = channel.last_id if last_event_id is None else last_event_id
+
+        def generate():
+            cursor = start
+            # 計數在串流開始後才增加，連線在開始前就中斷時不會留下計數
+            with self._lock:
+                self._connections += 1
+            try:
+                yield 'retry: 3000\n\n'
+                deadline = time.monotonic() + self.max_duration
+                while time.monotonic() < deadline:
+                    with channel.condition:
+                        pending = channel.since(cursor)
+                        if pending == []:
+                            channel.condition.wait(min(self.heartbeat, max(deadline - time.monotonic(), 0)))
+                            pending = channel.since(cursor)
+                    if pending is None:
+                        # 錯過的事件已不在緩衝區，請用戶端重新載入
+                        cursor = channel.last_id
+                        yield encode_event(cursor, 'reset', {})
+                    elif pending:
+                        cursor = pending[-1][0]
+                        yield ''.join(encoded for _, encoded in pending)
+                    else:
+                        yield ': keepalive\n\n'
+            finally:
+                with self._lock:
+                    self._connections -= 1
+
+        return generate()
+
+
+class RedisEventBridge:
+    """以 Redis 發布 / 訂閱在行程之間轉送事件（需另外安裝 redis 套件）"""
+
+    def __init__(self, url, broker):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self.broker = broker
+        self._thread = None
+
+    def publish(self, quiz_bank_id, event, data):
+        # 事件ID由 Redis 遞增產生，各行程相同，重連到其他行程時也能依 Last-Event-ID 補送
+        event_id = self._client.incr(f'{REDIS_CHANNEL}:{quiz_bank_id}:seq')
+        self._client.publish(REDIS_CHANNEL, json.dumps(
+            {'quiz_bank_id': quiz_bank_id, 'id': event_id, 'event': event, 'data': data}, ensure_ascii=False
+        ))
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(REDIS_CHANNEL)
+                for message in pubsub.listen():
+                    payload = json.loads(message['data'])
+                    self.broker.deliver(payload['quiz_bank_id'], payload['id'], payload['event'], payload['data'])
+            except Exception:
+                logger.exception('Redis 事件訂閱中斷，5 秒後重新連線')
+                time.sleep(5)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._listen, name='redis-events', daemon=True)
+            self._thread.start()
+
+
+class SubmissionEvents:
+    """app 使用的介面：publish 發布事件，stream 開啟串流"""
+
+    def __init__(self, broker, bridge=None):
+        self.broker = broker
+        self.bridge = bridge
+
+    def publish(self, quiz_bank_id, event, data):
+        try:
+            if self.bridge is not None:
+                self.bridge.publish(quiz_bank_id, event, data)
+            else:
+                self.broker.publish(quiz_bank_id, event, data)
+        except Exception:
+            # 推播失敗不影響作答寫入，成績頁重連後會收到 reset
+            logger.exception('發布題庫 %s 的 %s 事件失敗', quiz_bank_id, event)
+
+    def stream(self, quiz_bank_id, last_event_id=None):
+        return self.broker.stream(quiz_bank_id, last_event_id)
+
+
+def create_submission_events(url, **broker_options):
+    """依設定建立事件分送：memory（預設，單一行程）或 redis://..."""
+    broker = EventBroker(**broker_options)
+    if not url or url == 'memory':
+        return SubmissionEvents(broker)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        bridge = RedisEventBridge(url, broker)
+        bridge.start()
+        return SubmissionEvents(broker, bridge)
+    raise ValueError(f'不支援的事件後端：{url}')
@@ -0,0 +1,135 @@
+# 成績匯出
+# 以產生器逐列輸出 CSV / XLSX，資料列由呼叫端分批提供，記憶體用量不隨筆數成長。
+import csv
+import io
+import zipfile
+from xml.sax.saxutils import escape
+
+CSV_MIMETYPE = 'text/csv; charset=utf-8'
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def format_answer(answer):
+    """將學生作答轉為可讀文字"""
+    if answer is None:
+        return ''
+    if isinstance(answer, list):
+        return '; '.join(format_answer(a) for a in answer)
+    if isinstance(answer, dict):
+        # 程式碼排序題：{slot_answers: {...}}
+        if isinstance(answer.get('slot_answers'), dict):
+            answer = answer['slot_answers']
+        elif isinstance(answer.get('order'), list):
+            return format_answer(answer['order'])
+        return '; '.join(f"{key}={format_answer(value)}" for key, value in answer.items())
+    return str(answer)
+
+
+def iter_csv(header, rows):
+    """逐列產生 CSV（含 UTF-8 BOM 以便 Excel 正確辨識）"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= 16384:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+class _ChunkSink:
+    """只能寫入的檔案物件，讓 zipfile 以串流（data descriptor）模式輸出"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+
+_XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{sheet_name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+def _xlsx_cell(value):
+    if isinstance(value, bool) or value is None:
+        value = '' if value is None else str(value)
+    if isinstance(value, (int, float)):
+        return f'<c><v>{value}</v></c>'
+    # 移除 XML 不允許的控制字元
+    text = ''.join(ch for ch in str(value) if ch in '\t\n\r' or ord(ch) >= 0x20)
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+def iter_xlsx(header, rows, sheet_name='Sheet1'):
+    """逐列產生單一工作表的 XLSX（使用 inline string，不需 sharedStrings）"""
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _XLSX_CONTENT_TYPES)
+        archive.writestr('_rels/.rels', _XLSX_ROOT_RELS)
+        # 工作表名稱最多 31 字且不可含 []:*?/\\
+        sheet_name = ''.join('_' if ch in '[]:*?/\\' else ch for ch in sheet_name)[:31] or 'Sheet1'
+        archive.writestr('xl/workbook.xml', _XLSX_WORKBOOK.format(sheet_name=escape(sheet_name, {'"': '&quot;'})))
+        archive.writestr('xl/_rels/workbook.xml.rels', _XLSX_WORKBOOK_RELS)
+        yield sink.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(('<row>' + ''.join(_xlsx_cell(v) for v in header) + '</row>').encode('utf-8'))
+            for row in rows:
+                sheet.write(('<row>' + ''.join(_xlsx_cell(v) for v in row) + '</row>').encode('utf-8'))
+                data = sink.drain()
+                if data:
+                    yield data
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
@@ -0,0 +1,438 @@
+# 評分引擎
+# 將題庫的題目預先編譯成答案鍵(AnswerKey)，並依題庫快取，
+# 讓每次提交只需單次走訪即可完成評分，不再重複解析 JSON 或編譯正規表示式。
+import json
+import logging
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# 預先編譯的正規表示式
+_MULTI_SPACE_RE = re.compile(r' +')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def _normalize_newlines(value):
+    """統一換行符為 \\n 並去除前後空白"""
+    return str(value).replace('\r\n', '\n').replace('\r', '\n').strip() if value else ""
+
+
+def normalize_multiline_code(text):
+    """保持行結構但標準化空白（行首縮排保留、行尾空白去除、內容多餘空白合併）"""
+    if not text:
+        return ""
+    text = str(text).replace('\r\n', '\n').replace('\r', '\n')
+    normalized_lines = []
+    for line in text.split('\n'):
+        if line.rstrip():
+            leading_spaces = len(line) - len(line.lstrip())
+            content = _MULTI_SPACE_RE.sub(' ', line.lstrip().replace('\t', '    '))
+            normalized_lines.append(' ' * leading_spaces + content)
+        else:
+            normalized_lines.append('')
+    return '\n'.join(normalized_lines).strip()
+
+
+def _strip_whitespace(value):
+    """移除所有空白字符"""
+    return _WHITESPACE_RE.sub('', str(value)) if value else ""
+
+
+def _json_decode(value):
+    """嘗試解碼可能的 JSON 轉義字串，失敗時回傳原值"""
+    if isinstance(value, str) and (value.startswith('"') or '\\n' in value):
+        try:
+            return json.loads('"' + value.replace('"', '\\"') + '"')
+        except ValueError:
+            pass
+    return value
+
+
+class ChoiceKey:
+    """單選題/下拉選單的答案鍵，所有比較形式皆預先計算"""
+    __slots__ = ('raw', 'as_string', 'stripped', 'newline_normalized',
+                 'multiline_normalized', 'no_whitespace', 'decoded')
+
+    def __init__(self, correct_answer):
+        self.raw = correct_answer
+        self.as_string = str(correct_answer)
+        self.stripped = self.as_string.strip()
+        self.newline_normalized = _normalize_newlines(correct_answer)
+        self.multiline_normalized = normalize_multiline_code(correct_answer)
+        self.no_whitespace = _strip_whitespace(correct_answer)
+        self.decoded = _json_decode(correct_answer)
+
+
+def grade_choice(key, user_answer):
+    """多行文本比較策略，回傳 (是否正確, 比對方式)；使用者端的標準化只在需要時才計算"""
+    # 1. 直接比較
+    if user_answer == key.raw:
+        return True, 'exact_match'
+    # 2. 字符串化後比較
+    user_string = str(user_answer)
+    if user_string == key.as_string:
+        return True, 'string_match'
+    # 3. 標準化比較（去除前後空白）
+    if user_string.strip() == key.stripped:
+        return True, 'normalized_match'
+    # 4. 換行符標準化比較
+    if _normalize_newlines(user_answer) == key.newline_normalized:
+        return True, 'newline_normalized_match'
+    # 5. 深度清理比較（保持行結構但標準化空白）
+    if normalize_multiline_code(user_answer) == key.multiline_normalized:
+        return True, 'multiline_normalized_match'
+    # 6. 最後的降級比較（完全忽略空白結構）
+    if _strip_whitespace(user_answer) == key.no_whitespace:
+        return True, 'whitespace_ignored_match'
+    # 7. 終極比較：處理可能的JSON轉義問題
+    if _json_decode(user_answer) == key.decoded:
+        return True, 'json_decoded_match'
+    return False, ''
+
+
+def grade_dropdown_fillblank(key, user_answer):
+    """key 為 (blank_id, correct_answer) 的 tuple，所有空格都需正確"""
+    user_answers = user_answer if isinstance(user_answer, dict) else {}
+    for blank_id, correct_answer in key:
+        if user_answers.get(blank_id) != correct_answer:
+            return False, ''
+    if len(user_answers) != len(key):
+        return False, ''
+    return True, 'all_blanks_match'
+
+
+def grade_multiple_choice(key, user_answer):
+    """key 為正確答案的 frozenset"""
+    try:
+        user_answers = set(user_answer if isinstance(user_answer, list) else [])
+    except TypeError:
+        return False, ''
+    if user_answers == key:
+        return True, 'set_match'
+    return False, ''
+
+
+def grade_fill_blank(key, user_answer):
+    """key 為已轉小寫並去除空白的正確答案"""
+    # 填空題比對：LaTeX 語法會被保留並比對，確保數學公式準確性
+    if isinstance(user_answer, str) or not user_answer:
+        if (user_answer or '').lower().strip() == key:
+            return True, 'case_insensitive_match'
+    return False, ''
+
+
+def _extract_parsons_order(user_answer, expected_length):
+    """從各種舊版作答格式中取出排序結果"""
+    # 新的複合格式 {order: [...], slots: {...}}
+    if isinstance(user_answer, dict) and 'order' in user_answer:
+        return user_answer['order'] if isinstance(user_answer['order'], list) else []
+    # 從slot_answers提取順序
+    if isinstance(user_answer, dict) and 'slot_answers' in user_answer:
+        slot_answers = user_answer['slot_answers']
+        return [slot_answers[str(slot)] for slot in sorted(int(k) for k in slot_answers.keys())]
+    # 舊的字典格式 {1: "code1", 2: "code2", ...}
+    if isinstance(user_answer, dict):
+        user_order = []
+        for i in range(1, expected_length + 1):
+            if str(i) in user_answer:
+                user_order.append(user_answer[str(i)])
+            elif i in user_answer:
+                user_order.append(user_answer[i])
+        return user_order
+    # 列表格式 ["code1", "code2", ...]
+    if isinstance(user_answer, list):
+        return user_answer
+    return []
+
+
+def grade_parsons(key, user_answer):
+    """key 為 (已排除固定區塊的 slot 對照表或 None, 舊版 correct_order 或 None)"""
+    slot_map, correct_order = key
+    # 新格式：使用slot_answers比對
+    if slot_map is not None and isinstance(user_answer, dict) and 'slot_answers' in user_answer:
+        user_slot_answers = user_answer.get('slot_answers')
+        if not isinstance(user_slot_answers, dict):
+            return False, ''
+        for slot, correct_label in slot_map:
+            if user_slot_answers.get(slot) != correct_label:
+                return False, ''
+        if len(user_slot_answers) != len(slot_map):
+            return False, ''
+        return True, 'slot_match'
+    # 舊格式兼容：使用correct_order比對
+    if correct_order is not None:
+        try:
+            user_order = _extract_parsons_order(user_answer, len(correct_order))
+        except (KeyError, ValueError, TypeError):
+            return False, ''
+        if list(user_order) == correct_order:
+            return True, 'order_match'
+    return False, ''
+
+
+def _grade_unknown(key, user_answer):
+    return False, ''
+
+
+def _compile_parsons(question_data):
+    slot_map = None
+    if 'slot_answers' in question_data:
+        fixed_blocks = question_data.get('fixed_blocks') or {}
+        # 過濾掉固定區塊位置的正確答案（防止老師誤設定）
+        slot_map = tuple(
+            (str(slot), label) for slot, label in (question_data.get('slot_answers') or {}).items()
+            if slot not in fixed_blocks
+        )
+    correct_order = None
+    if 'correct_order' in question_data:
+        correct_order = list(question_data.get('correct_order') or [])
+    return slot_map, correct_order
+
+
+# 題型 -> (答案鍵編譯函式, 評分函式)
+QUESTION_TYPE_GRADERS = {
+    'single_choice': (lambda data: ChoiceKey(data.get('correct_answer')), grade_choice),
+    'dropdown': (lambda data: ChoiceKey(data.get('correct_answer')), grade_choice),
+    'dropdown_fillblank': (
+        lambda data: tuple((f"blank_{i}", blank.get('correct_answer'))
+                           for i, blank in enumerate(data.get('blanks', []))),
+        grade_dropdown_fillblank,
+    ),
+    'multiple_choice': (lambda data: frozenset(data.get('correct_answers', [])), grade_multiple_choice),
+    'fill_blank': (lambda data: (data.get('correct_answer') or '').lower().strip(), grade_fill_blank),
+    'parsons': (_compile_parsons, grade_parsons),
+}
+
+
+class CompiledQuestion:
+    """單一題目的編譯結果"""
+    __slots__ = ('question_id', 'answer_id', 'question_type', 'points', 'key', 'grade')
+
+    def __init__(self, question_id, question_type, points, key, grade):
+        self.question_id = question_id
+        self.answer_id = str(question_id)
+        self.question_type = question_type
+        self.points = points
+        self.key = key
+        self.grade = grade
+
+
+class QuestionResult:
+    """單一題目的評分結果"""
+    __slots__ = ('question_id', 'is_correct', 'points', 'method')
+
+    def __init__(self, question_id, is_correct, points, method):
+        self.question_id = question_id
+        self.is_correct = is_correct
+        self.points = points
+        self.method = method
+
+
+def serialize_results(results):
+    """將逐題評分結果序列化為精簡 JSON：{題目ID: [是否正確, 得分, 比對方式]}"""
+    return json.dumps(
+        {str(r.question_id): [1 if r.is_correct else 0, r.points, r.method] for r in results},
+        separators=(',', ':')
+    )
+
+
+def deserialize_results(text):
+    """將 serialize_results() 的結果還原為 {題目ID: QuestionResult}"""
+    try:
+        data = json.loads(text) if text else {}
+    except ValueError:
+        return {}
+    return {
+        int(question_id): QuestionResult(int(question_id), bool(values[0]), values[1], values[2])
+        for question_id, values in data.items()
+    }
+
+
+class GradeResult:
+    """一次提交的評分結果"""
+    __slots__ = ('score', 'total_points', 'results')
+
+    def __init__(self, score, total_points, results):
+        self.score = score
+        self.total_points = total_points
+        self.results = results
+
+
+class AnswerKey:
+    """整個題庫的答案鍵"""
+
+    def __init__(self, quiz_bank_id, items, version=None):
+        self.quiz_bank_id = quiz_bank_id
+        self.version = version
+        self.items = tuple(items)
+        self.total_points = sum(item.points for item in self.items)
+
+    def grade(self, answers, trace=None):
+        """單次走訪評分，answers 為 {題目ID字串: 作答} 的字典
+
+        傳入 trace（list）時會逐題記錄比對方式、耗時與首個差異位置；
+        未傳入時走不含任何計時或記錄的快速路徑。
+        """
+        answers = answers if isinstance(answers, dict) else {}
+        if trace is not None:
+            return self._grade_traced(answers, trace)
+        score = 0
+        results = []
+        for item in self.items:
+            is_correct, method = item.grade(item.key, answers.get(item.answer_id))
+            awarded = item.points if is_correct else 0
+            score += awarded
+            results.append(QuestionResult(item.question_id, is_correct, awarded, method))
+        return GradeResult(score, self.total_points, results)
+
+    def _grade_traced(self, answers, trace):
+        score = 0
+        results = []
+        for item in self.items:
+            user_answer = answers.get(item.answer_id)
+            started = time.perf_counter()
+            is_correct, method = item.grade(item.key, user_answer)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            awarded = item.points if is_correct else 0
+            score += awarded
+            results.append(QuestionResult(item.question_id, is_correct, awarded, method))
+            trace.append({
+                'question_id': item.question_id,
+                'question_type': item.question_type,
+                'is_correct': is_correct,
+                'comparison_method': method,
+                'points': awarded,
+                'elapsed_ms': round(elapsed_ms, 4),
+                'first_diff': None if is_correct else first_difference(item.key, user_answer),
+            })
+        return GradeResult(score, self.total_points, results)
+
+
+def first_difference(key, user_answer, max_check=50):
+    """找出單選題/下拉選單作答與正確答案的首個差異位置（只檢查前 max_check 個字元）"""
+    if not isinstance(key, ChoiceKey) or not user_answer or not key.raw:
+        return None
+    user_str = str(user_answer)
+    correct_str = key.as_string
+    for i in range(min(max_check, max(len(user_str), len(correct_str)))):
+        u_char = user_str[i] if i < len(user_str) else None
+        c_char = correct_str[i] if i < len(correct_str) else None
+        if u_char != c_char:
+            return {
+                'position': i,
+                'user_char': u_char,
+                'correct_char': c_char,
+                'user_length': len(user_str),
+                'correct_length': len(correct_str),
+            }
+    return None
+
+
+def compile_question(question):
+    """將 Question 物件編譯成 CompiledQuestion"""
+    try:
+        question_data = json.loads(question.question_data) if question.question_data else {}
+    except ValueError:
+        question_data = {}
+    if not isinstance(question_data, dict):
+        question_data = {}
+    compile_key, grade = QUESTION_TYPE_GRADERS.get(question.question_type, (lambda data: None, _grade_unknown))
+    return CompiledQuestion(question.id, question.question_type, question.points or 0,
+                            compile_key(question_data), grade)
+
+
+def compile_answer_key(quiz_bank_id, questions, version=None):
+    """將題庫的所有題目編譯成 AnswerKey"""
+    return AnswerKey(quiz_bank_id, [compile_question(q) for q in questions], version)
+
+
+class AnswerKeyCache:
+    """以題庫ID為鍵的答案鍵快取，題目異動時需呼叫 invalidate()
+
+    傳入 version 時，快取的答案鍵版本不同也會重新編譯（供多個 worker 間失效使用）。
+    """
+
+    def __init__(self):
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def get(self, quiz_bank_id, load_questions, version=None):
+        """取得答案鍵，未快取時以 load_questions() 載入題目並編譯"""
+        answer_key = self._keys.get(quiz_bank_id)
+        if answer_key is None or (version is not None and answer_key.version != version):
+            answer_key = compile_answer_key(quiz_bank_id, load_questions(), version)
+            with self._lock:
+                self._keys[quiz_bank_id] = answer_key
+        return answer_key
+
+    def invalidate(self, quiz_bank_id):
+        with self._lock:
+            self._keys.pop(quiz_bank_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+
+
+answer_key_cache = AnswerKeyCache()
+
+
+class GradingTraceStore:
+    """評分追蹤紀錄
+
+    只在單次請求要求（X-Grading-Trace 標頭）、題庫開啟追蹤，
+    或 grader logger 設為 DEBUG 時才會記錄；每個題庫只保留最近 max_entries 筆。
+    """
+
+    def __init__(self, max_entries=100, enabled_quiz_banks=()):
+        self.max_entries = max_entries
+        self._enabled = set(enabled_quiz_banks)
+        self._traces = {}
+        self._lock = threading.Lock()
+
+    def is_enabled(self, quiz_bank_id, requested=False):
+        return requested or quiz_bank_id in self._enabled or logger.isEnabledFor(logging.DEBUG)
+
+    def is_quiz_bank_enabled(self, quiz_bank_id):
+        return quiz_bank_id in self._enabled
+
+    def set_enabled(self, quiz_bank_id, enabled):
+        with self._lock:
+            if enabled:
+                self._enabled.add(quiz_bank_id)
+            else:
+                self._enabled.discard(quiz_bank_id)
+
+    def record(self, quiz_bank_id, submission_id, grade_result, questions, elapsed_ms):
+        entry = {
+            'submission_id': submission_id,
+            'recorded_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+            'score': grade_result.score,
+            'total_points': grade_result.total_points,
+            'elapsed_ms': round(elapsed_ms, 4),
+            'questions': questions,
+        }
+        with self._lock:
+            traces = self._traces.get(quiz_bank_id)
+            if traces is None:
+                traces = self._traces[quiz_bank_id] = deque(maxlen=self.max_entries)
+            traces.append(entry)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('grading trace quiz_bank=%s submission=%s: %s',
+                         quiz_bank_id, submission_id, json.dumps(entry, ensure_ascii=False))
+        return entry
+
+    def get(self, quiz_bank_id, limit=None):
+        """取得題庫的追蹤紀錄，由新到舊"""
+        with self._lock:
+            traces = list(self._traces.get(quiz_bank_id, ()))
+        traces.reverse()
+        return traces[:limit] if limit else traces
+
+    def clear(self, quiz_bank_id):
+        with self._lock:
+            self._traces.pop(quiz_bank_id, None)
@@ -0,0 +1,53 @@
+# Gunicorn 設定
+# 學生端（作答頁、提交、成績頁）大多在等待資料庫與網路，同步 worker 的並行數只等於 worker 數。
+# 以 GUNICORN_PROFILE 選擇 worker 模式：
+#   sync    ：預設，每個 worker 一次處理一個請求
+#   gthread ：每個 worker 多個執行緒，不需額外套件
+#   gevent  ：協程，適合大量同時連線（需 pip install gevent psycogreen）
+# 教師端路由不需任何修改，三種模式皆可使用。
+import os
+
+profile = os.environ.get('GUNICORN_PROFILE', 'sync')
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+# 預設 1 個 worker（與原本相同）；題庫快取的版本號存在資料庫，多個 worker 使用各自的記憶體快取也會同步失效，
+# 共用的 CACHE_BACKEND 只是省下各 worker 重複渲染與重複保存的記憶體
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+# 成績頁即時推播的串流在 timeout 之前結束，由瀏覽器重連
+os.environ.setdefault('EVENTS_MAX_DURATION', str(max(timeout - 15, 10)))
+# 串流會一直占用處理中的請求，只有能同時處理多個請求的 worker 才開啟（sync 時成績頁改為定期檢查）
+os.environ.setdefault('SSE_ENABLED', 'true' if profile in ('gthread', 'gevent') else 'false')
+graceful_timeout = 30
+keepalive = 5
+# 定期重啟 worker，避免長時間執行後記憶體持續成長
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = 200
+
+if profile == 'gthread':
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', 8))
+    # 每個執行緒最多同時使用一條連線，連線池需容納所有執行緒
+    os.environ.setdefault('DB_POOL_SIZE', str(threads))
+    os.environ.setdefault('DB_MAX_OVERFLOW', '2')
+elif profile == 'gevent':
+    worker_class = 'gevent'
+    worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 200))
+    # 同時連線可遠多於資料庫連線；超出連線池的請求會等待 DB_POOL_TIMEOUT 秒
+    os.environ.setdefault('DB_POOL_SIZE', '10')
+    os.environ.setdefault('DB_MAX_OVERFLOW', '10')
+    # 背景佇列 worker 的 SQLite 呼叫會阻塞協程，gevent 模式下改由獨立的 `flask ingest-worker` 行程處理
+    os.environ.setdefault('INGEST_EMBEDDED_WORKERS', 'false')
+elif profile != 'sync':
+    raise RuntimeError(f'不支援的 GUNICORN_PROFILE：{profile}')
+
+
+def post_fork(server, worker):
+    if profile == 'gevent':
+        # 讓 psycopg2 的等待交給 gevent 排程，否則查詢期間整個 worker 會被阻塞
+        try:
+            from psycogreen.gevent import patch_psycopg
+        except ImportError:
+            server.log.warning('未安裝 psycogreen，PostgreSQL 查詢會阻塞 gevent worker')
+        else:
+            patch_psycopg()
@@ -0,0 +1,202 @@
+# 作答排隊處理
+# 提交時只將作答寫入本機 SQLite 佇列並立即回傳收據，
+# 由背景 worker 成批取出、評分並一次寫入主資料庫，避免考試結束時大量同步提交塞住 worker。
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+PROCESSING = 'processing'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class SubmissionQueue:
+    """以 SQLite 檔案實作的持久化佇列（WAL 模式，可供同一主機上的多個 worker 行程共用）"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._connection()
+        connection.executescript('''
+            CREATE TABLE IF NOT EXISTS submission_queue (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                receipt TEXT NOT NULL UNIQUE,
+                quiz_bank_id INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                claimed_at REAL,
+                finished_at REAL,
+                result TEXT,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS ix_submission_queue_status ON submission_queue (status, id);
+        ''')
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=FULL')
+            self._local.connection = connection
+        return connection
+
+    def enqueue(self, quiz_bank_id, payload, receipt=None):
+        """寫入佇列並回傳收據編號；指定的收據已在佇列中時不重複寫入（用於重送的冪等鍵）"""
+        receipt = receipt or uuid.uuid4().hex
+        self._connection().execute(
+            'INSERT OR IGNORE INTO submission_queue (receipt, quiz_bank_id, payload, created_at) VALUES (?, ?, ?, ?)',
+            (receipt, quiz_bank_id, json.dumps(payload), time.time())
+        )
+        return receipt
+
+    def claim(self, batch_size, stale_after=300):
+        """取出一批待處理項目；處理中超過 stale_after 秒的項目視為 worker 已中斷，會重新取出"""
+        connection = self._connection()
+        now = time.time()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            rows = connection.execute(
+                'SELECT id, receipt, quiz_bank_id, payload FROM submission_queue '
+                'WHERE status = ? OR (status = ? AND claimed_at < ?) ORDER BY id LIMIT ?',
+                (PENDING, PROCESSING, now - stale_after, batch_size)
+            ).fetchall()
+            if rows:
+                connection.executemany(
+                    'UPDATE submission_queue SET status = ?, claimed_at = ?, attempts = attempts + 1 WHERE id = ?',
+                    [(PROCESSING, now, row[0]) for row in rows]
+                )
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return [
+            {'receipt': receipt, 'quiz_bank_id': quiz_bank_id, 'payload': json.loads(payload)}
+            for _, receipt, quiz_bank_id, payload in rows
+        ]
+
+    def complete(self, results):
+        """results 為 {收據: 結果字典}"""
+        now = time.time()
+        self._connection().executemany(
+            'UPDATE submission_queue SET status = ?, finished_at = ?, result = ?, error = NULL WHERE receipt = ?',
+            [(DONE, now, json.dumps(result), receipt) for receipt, result in results.items()]
+        )
+
+    def fail(self, receipt, error, max_attempts=3):
+        """標記失敗；未超過重試次數時放回佇列"""
+        self._connection().execute(
+            'UPDATE submission_queue SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, '
+            'finished_at = ?, error = ? WHERE receipt = ?',
+            (max_attempts, FAILED, PENDING, time.time(), str(error)[:500], receipt)
+        )
+
+    def status(self, receipt):
+        row = self._connection().execute(
+            'SELECT quiz_bank_id, status, result, error FROM submission_queue WHERE receipt = ?', (receipt,)
+        ).fetchone()
+        if row is None:
+            return None
+        quiz_bank_id, status, result, error = row
+        return {
+            'quiz_bank_id': quiz_bank_id,
+            'status': status,
+            'result': json.loads(result) if result else None,
+            'error': error if status == FAILED else None,
+        }
+
+    def pending_count(self):
+        return self._connection().execute(
+            'SELECT COUNT(*) FROM submission_queue WHERE status IN (?, ?)', (PENDING, PROCESSING)
+        ).fetchone()[0]
+
+    def purge(self, older_than):
+        """刪除 older_than 秒前已完成的項目"""
+        self._connection().execute(
+            'DELETE FROM submission_queue WHERE status = ? AND finished_at < ?', (DONE, time.time() - older_than)
+        )
+
+
+class IngestWorkerPool:
+    """背景 worker：成批取出佇列項目交給 process_batch 處理
+
+    process_batch(entries) 需回傳 {收據: 結果字典}，並保證同一收據重複處理時不會重複寫入。
+    整批失敗時會逐筆重試，以找出有問題的項目。
+    """
+
+    def __init__(self, queue, process_batch, workers=2, batch_size=50, poll_interval=0.5,
+                 max_attempts=3, retention=86400):
+        self.queue = queue
+        self.process_batch = process_batch
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retention = retention
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._last_purge = 0
+
+    def notify(self):
+        """有新項目時喚醒 worker，不必等到下一次輪詢"""
+        self._wakeup.set()
+
+    def run_once(self):
+        """處理一批，回傳處理筆數"""
+        entries = self.queue.claim(self.batch_size)
+        if not entries:
+            return 0
+        try:
+            self.queue.complete(self.process_batch(entries))
+        except Exception:
+            logger.exception('批次處理失敗，改為逐筆處理')
+            for entry in entries:
+                try:
+                    self.queue.complete(self.process_batch([entry]))
+                except Exception as e:
+                    logger.exception('作答 %s 處理失敗', entry['receipt'])
+                    self.queue.fail(entry['receipt'], e, self.max_attempts)
+        return len(entries)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                processed = self.run_once()
+                if time.time() - self._last_purge > 3600:
+                    self._last_purge = time.time()
+                    self.queue.purge(self.retention)
+            except Exception:
+                logger.exception('佇列處理發生錯誤')
+                processed = 0
+            if not processed:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'ingest-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=5):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def run_forever(self):
+        """在前景執行（供獨立的 worker 行程使用）"""
+        self._run()
@@ -0,0 +1,182 @@
+# 試題分析
+# 將題庫所有作答一次載入為欄式矩陣（列：作答、欄：題目），
+# 以向量化運算計算答對率、點二系列相關（鑑別度）與選項分布。
+# 對錯判定一律使用 grader 的答案鍵，評分規則只有一個來源。
+import json
+import threading
+
+import numpy as np
+
+from grader import ChoiceKey, grade_choice, deserialize_results
+
+CHOICE_TYPES = ('single_choice', 'dropdown', 'multiple_choice')
+
+
+class _OptionEncoder:
+    """將作答對應到選項索引；先做完全比對，失敗時套用單選題的比較規則"""
+
+    def __init__(self, options):
+        self.options = options
+        self._exact = {}
+        for index, option in enumerate(options):
+            self._exact.setdefault(option, index)
+        self._keys = [ChoiceKey(option) for option in options]
+
+    def encode(self, answer):
+        if answer is None or answer == '':
+            return -1
+        try:
+            return self._exact[answer]
+        except (KeyError, TypeError):
+            pass
+        for index, key in enumerate(self._keys):
+            if grade_choice(key, answer)[0]:
+                return index
+        return -1
+
+
+def _load_options(question):
+    try:
+        question_data = json.loads(question.question_data) if question.question_data else {}
+    except ValueError:
+        question_data = {}
+    options = question_data.get('options') if isinstance(question_data, dict) else None
+    if not isinstance(options, list):
+        return [], frozenset()
+    if question.question_type == 'multiple_choice':
+        correct = frozenset(question_data.get('correct_answers') or [])
+    else:
+        correct = frozenset([question_data.get('correct_answer')])
+    return options, correct
+
+
+def _columnwise_correlation(x, y):
+    """逐欄計算 x 與 y 的皮爾森相關係數，變異為 0 的欄位回傳 nan"""
+    xc = x - x.mean(axis=0)
+    yc = y - y.mean(axis=0)
+    denominator = np.sqrt((xc ** 2).sum(axis=0) * (yc ** 2).sum(axis=0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(denominator > 0, (xc * yc).sum(axis=0) / denominator, np.nan)
+
+
+def _rounded(value, digits=4):
+    return None if value is None or np.isnan(value) else round(float(value), digits)
+
+
+def analyze(answer_key, questions, answer_rows):
+    """計算試題分析
+
+    answer_key 為 grader.AnswerKey；questions 需與 answer_key.items 同序；
+    answer_rows 為 (answers JSON 字串, 儲存的逐題結果 JSON 或 None) 的可迭代物件（可為分批讀取的查詢結果）；
+    有儲存結果時直接使用，沒有時才以答案鍵評分。
+    """
+    items = answer_key.items
+    question_count = len(items)
+    points = np.array([item.points for item in items], dtype=float)
+
+    encoders = {}
+    for column, question in enumerate(questions):
+        if question.question_type in CHOICE_TYPES:
+            options, correct = _load_options(question)
+            encoders[column] = (_OptionEncoder(options), correct, question.question_type == 'multiple_choice')
+
+    correct_rows = []
+    choice_columns = {column: [] for column in encoders}
+    for raw, stored_results in answer_rows:
+        try:
+            answers = json.loads(raw) if raw else {}
+        except ValueError:
+            answers = {}
+        if not isinstance(answers, dict):
+            answers = {}
+        if stored_results is not None:
+            stored = deserialize_results(stored_results)
+            correct_rows.append([stored[item.question_id].is_correct if item.question_id in stored else False
+                                 for item in items])
+        else:
+            correct_rows.append([r.is_correct for r in answer_key.grade(answers).results])
+        for column, (encoder, _, is_multiple) in encoders.items():
+            answer = answers.get(items[column].answer_id)
+            if is_multiple:
+                picked = answer if isinstance(answer, list) else []
+                choice_columns[column].append([encoder.encode(a) for a in picked])
+            else:
+                choice_columns[column].append(encoder.encode(answer))
+
+    response_count = len(correct_rows)
+    correct = np.array(correct_rows, dtype=float).reshape(response_count, question_count)
+    totals = correct @ points
+    max_total = points.sum()
+    total_percentages = totals / max_total * 100 if max_total > 0 else np.zeros(response_count)
+
+    p_values = correct.mean(axis=0) if response_count else np.full(question_count, np.nan)
+    # 校正後的點二系列相關：與「扣除該題後的總分」的相關，避免題目自身灌水
+    rest_scores = totals[:, None] - correct * points[None, :]
+    discrimination = _columnwise_correlation(correct, rest_scores) if response_count > 1 \
+        else np.full(question_count, np.nan)
+
+    results = []
+    for column, (item, question) in enumerate(zip(items, questions)):
+        entry = {
+            'question_id': item.question_id,
+            'title': question.title,
+            'question_type': item.question_type,
+            'points': item.points,
+            'responses': response_count,
+            'difficulty': _rounded(p_values[column]),
+            'discrimination': _rounded(discrimination[column]),
+        }
+        if column in encoders:
+            encoder, correct_options, is_multiple = encoders[column]
+            option_count = len(encoder.options)
+            if is_multiple:
+                picks = np.zeros((response_count, option_count + 1))
+                for row, indices in enumerate(choice_columns[column]):
+                    picks[row, [i if i >= 0 else option_count for i in indices]] = 1
+                counts = picks.sum(axis=0)
+                score_sums = picks.T @ total_percentages
+                omitted = int((picks[:, :option_count].sum(axis=1) == 0).sum())
+            else:
+                encoded = np.array(choice_columns[column], dtype=int)
+                encoded[encoded < 0] = option_count
+                counts = np.bincount(encoded, minlength=option_count + 1).astype(float)
+                score_sums = np.bincount(encoded, weights=total_percentages, minlength=option_count + 1)
+                omitted = int(counts[option_count])
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean_scores = np.where(counts > 0, score_sums / np.maximum(counts, 1), np.nan)
+            entry['options'] = [{
+                'option': option,
+                'is_correct': option in correct_options,
+                'count': int(counts[i]),
+                'proportion': _rounded(counts[i] / response_count) if response_count else None,
+                'mean_total_percentage': _rounded(mean_scores[i], 2),
+            } for i, option in enumerate(encoder.options)]
+            entry['omitted_or_other'] = omitted
+        results.append(entry)
+
+    return {
+        'responses': response_count,
+        'mean_total_percentage': _rounded(total_percentages.mean(), 2) if response_count else None,
+        'questions': results,
+    }
+
+
+class ItemAnalysisCache:
+    """以題庫ID為鍵的分析結果快取；指紋（作答數、最大ID、答案鍵）改變時重新計算"""
+
+    def __init__(self):
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def get(self, quiz_bank_id, fingerprint, compute):
+        cached = self._results.get(quiz_bank_id)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+        result = compute()
+        with self._lock:
+            self._results[quiz_bank_id] = (fingerprint, result)
+        return result
+
+    def invalidate(self, quiz_bank_id):
+        with self._lock:
+            self._results.pop(quiz_bank_id, None)
@@ -0,0 +1,330 @@
+# 資料庫結構遷移
+# 依序套用編號的遷移並記錄於 schema_migrations 資料表；每個遷移都可在「已由 db.create_all() 建立」的資料庫上安全執行，
+# 因此舊的部署只要執行一次 `flask db-upgrade` 即可納入管理。
+# PostgreSQL 上的索引以 CREATE INDEX CONCURRENTLY 建立，建立期間不會鎖住寫入。
+# 修改 app.py 的模型（新增資料表、欄位或索引）時，需在 MIGRATIONS 末端加上對應的遷移。
+import json
+import logging
+from datetime import datetime
+
+from sqlalchemy import (JSON, Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, LargeBinary, MetaData,
+                        String, Table, Text, inspect, text)
+from sqlalchemy.dialects.postgresql import JSONB
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = 'schema_migrations'
+# PostgreSQL advisory lock 編號，避免多個行程同時執行遷移
+_LOCK_ID = 720_431_016
+
+
+class Migration:
+    """transactional=False 的遷移在 autocommit 連線上執行（PostgreSQL 的 CONCURRENTLY 不能在交易中執行）"""
+
+    def __init__(self, version, name, upgrade, transactional=True):
+        self.version = version
+        self.name = name
+        self.upgrade = upgrade
+        self.transactional = transactional
+
+
+def create_index(connection, name, table, columns, unique=False):
+    """建立索引（已存在則略過）"""
+    concurrently = 'CONCURRENTLY ' if connection.dialect.name == 'postgresql' else ''
+    column_list = ', '.join(columns)
+    connection.execute(text(
+        f'CREATE {"UNIQUE " if unique else ""}INDEX {concurrently}IF NOT EXISTS {name} ON "{table}" ({column_list})'
+    ))
+
+
+def _baseline(connection):
+    """初始結構：原本由 db.create_all() 建立的四個資料表"""
+    metadata = MetaData()
+    Table('user', metadata,
+          Column('id', Integer, primary_key=True),
+          Column('username', String(80), unique=True, nullable=False),
+          Column('email', String(120), unique=True, nullable=False),
+          Column('password_hash', String(120), nullable=False),
+          Column('is_teacher', Boolean),
+          Column('created_at', DateTime))
+    Table('quiz_bank', metadata,
+          Column('id', Integer, primary_key=True),
+          Column('title', String(200), nullable=False),
+          Column('description', Text),
+          Column('access_code', String(10), unique=True, nullable=False),
+          Column('is_active', Boolean),
+          Column('created_at', DateTime),
+          Column('teacher_id', Integer, ForeignKey('user.id'), nullable=False))
+    Table('question', metadata,
+          Column('id', Integer, primary_key=True),
+          Column('title', String(200), nullable=False),
+          Column('question_text', Text, nullable=False),
+          Column('question_type', String(50), nullable=False),
+          Column('question_data', Text),
+          Column('points', Integer),
+          Column('order_index', Integer),
+          Column('quiz_bank_id', Integer, ForeignKey('quiz_bank.id'), nullable=False),
+          Column('created_at', DateTime))
+    Table('submission', metadata,
+          Column('id', Integer, primary_key=True),
+          Column('student_name', String(100), nullable=False),
+          Column('student_email', String(120)),
+          Column('answers', Text),
+          Column('score', Float),
+          Column('total_points', Integer),
+          Column('submitted_at', DateTime),
+          Column('quiz_bank_id', Integer, ForeignKey('quiz_bank.id'), nullable=False))
+    metadata.create_all(connection, checkfirst=True)
+
+
+def _submission_side_tables(connection):
+    """逐題評分結果與排隊收據"""
+    metadata = MetaData()
+    Table('submission', metadata, Column('id', Integer, primary_key=True))
+    Table('submission_result', metadata,
+          Column('submission_id', Integer, ForeignKey('submission.id'), primary_key=True),
+          Column('results', Text, nullable=False))
+    Table('submission_receipt', metadata,
+          Column('key', String(64), primary_key=True),
+          Column('submission_id', Integer, ForeignKey('submission.id'), nullable=False, index=True),
+          Column('created_at', DateTime))
+    metadata.create_all(connection, tables=[metadata.tables['submission_result'],
+                                            metadata.tables['submission_receipt']], checkfirst=True)
+
+
+def _hot_lookup_indexes(connection):
+    """作答頁、提交、成績頁、題庫管理與儀表板常用的查詢路徑"""
+    create_index(connection, 'ix_question_quiz_bank_order', 'question', ['quiz_bank_id', 'order_index'])
+    create_index(connection, 'ix_quiz_bank_teacher_id', 'quiz_bank', ['teacher_id'])
+    create_index(connection, 'ix_submission_quiz_bank_submitted_at', 'submission', ['quiz_bank_id', 'submitted_at'])
+    create_index(connection, 'ix_submission_quiz_bank_score', 'submission', ['quiz_bank_id', 'score'])
+
+
+# 作答內容：PostgreSQL 為 JSONB（可在資料庫中查詢），其他資料庫為 JSON 文字；None 存為 SQL NULL
+ANSWER_JSON = JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), 'postgresql')
+
+
+def _submission_answers(connection):
+    """逐題作答正規化資料表，並由既有的作答與逐題評分結果轉入"""
+    metadata = MetaData()
+    Table('submission', metadata, Column('id', Integer, primary_key=True))
+    submission_answer = Table(
+        'submission_answer', metadata,
+        Column('submission_id', Integer, ForeignKey('submission.id'), primary_key=True),
+        Column('question_id', Integer, primary_key=True, autoincrement=False),
+        Column('quiz_bank_id', Integer, nullable=False),
+        Column('answer', ANSWER_JSON),
+        Column('is_correct', Boolean, nullable=False),
+        Column('points', Float, nullable=False),
+        Index('ix_submission_answer_bank_question', 'quiz_bank_id', 'question_id', 'is_correct'),
+    )
+    metadata.create_all(connection, tables=[submission_answer], checkfirst=True)
+
+    # 只轉入已有逐題評分結果的作答；其餘由 `flask backfill-results` 評分後補上
+    last_id = 0
+    while True:
+        rows = connection.execute(text(
+            'SELECT s.id, s.quiz_bank_id, s.answers, r.results FROM submission s '
+            'JOIN submission_result r ON r.submission_id = s.id '
+            'WHERE s.id > :last_id AND NOT EXISTS (SELECT 1 FROM submission_answer a WHERE a.submission_id = s.id) '
+            'ORDER BY s.id LIMIT 1000'
+        ), {'last_id': last_id}).fetchall()
+        if not rows:
+            break
+        records = []
+        for submission_id, quiz_bank_id, answers, results in rows:
+            try:
+                answers = json.loads(answers) if answers else {}
+            except ValueError:
+                answers = {}
+            if not isinstance(answers, dict):
+                answers = {}
+            for question_id, (is_correct, points, _) in json.loads(results).items():
+                records.append({'submission_id': submission_id, 'question_id': int(question_id),
+                                'quiz_bank_id': quiz_bank_id, 'answer': answers.get(question_id),
+                                'is_correct': bool(is_correct), 'points': points})
+        if records:
+            connection.execute(submission_answer.insert(), records)
+        last_id = rows[-1][0]
+
+
+def _draft_attempts(connection):
+    """作答草稿"""
+    metadata = MetaData()
+    Table('quiz_bank', metadata, Column('id', Integer, primary_key=True))
+    draft_attempt = Table(
+        'draft_attempt', metadata,
+        Column('id', String(32), primary_key=True),
+        Column('quiz_bank_id', Integer, ForeignKey('quiz_bank.id'), nullable=False, index=True),
+        Column('student_name', String(100), nullable=False),
+        Column('student_email', String(120)),
+        Column('answers', Text),
+        Column('revision', Integer, nullable=False),
+        Column('created_at', DateTime),
+        Column('updated_at', DateTime),
+        Column('submitted_at', DateTime),
+    )
+    metadata.create_all(connection, tables=[draft_attempt], checkfirst=True)
+
+
+def _regrade_jobs(connection):
+    """重新評分工作"""
+    metadata = MetaData()
+    Table('quiz_bank', metadata, Column('id', Integer, primary_key=True))
+    regrade_job = Table(
+        'regrade_job', metadata,
+        Column('id', Integer, primary_key=True),
+        Column('quiz_bank_id', Integer, ForeignKey('quiz_bank.id'), nullable=False, index=True),
+        Column('status', String(20), nullable=False),
+        Column('dry_run', Boolean, nullable=False),
+        Column('answer_key_fingerprint', String(40)),
+        Column('total', Integer, nullable=False),
+        Column('processed', Integer, nullable=False),
+        Column('changed', Integer, nullable=False),
+        Column('last_submission_id', Integer, nullable=False),
+        Column('report', Text),
+        Column('error', Text),
+        Column('created_at', DateTime),
+        Column('updated_at', DateTime),
+        Column('finished_at', DateTime),
+    )
+    metadata.create_all(connection, tables=[regrade_job], checkfirst=True)
+
+
+def _answer_signatures(connection):
+    """相似作答偵測的 MinHash 簽章；既有作答由 `flask backfill-results` 補上"""
+    metadata = MetaData()
+    Table('submission', metadata, Column('id', Integer, primary_key=True))
+    answer_signature = Table(
+        'answer_signature', metadata,
+        Column('submission_id', Integer, ForeignKey('submission.id'), primary_key=True, autoincrement=False),
+        Column('quiz_bank_id', Integer, nullable=False),
+        Column('signature', LargeBinary),
+        Index('ix_answer_signature_bank_submission', 'quiz_bank_id', 'submission_id'),
+    )
+    metadata.create_all(connection, tables=[answer_signature], checkfirst=True)
+
+
+def _submission_archives(connection):
+    """作答封存檔與封存作答的位置"""
+    metadata = MetaData()
+    Table('quiz_bank', metadata, Column('id', Integer, primary_key=True))
+    submission_archive = Table(
+        'submission_archive', metadata,
+        Column('id', Integer, primary_key=True),
+        Column('quiz_bank_id', Integer, ForeignKey('quiz_bank.id'), nullable=False),
+        Column('status', String(20), nullable=False),
+        Column('path', String(500), nullable=False),
+        Column('format', String(20), nullable=False),
+        Column('checksum', String(64), nullable=False),
+        Column('size_bytes', Integer, nullable=False),
+        Column('submission_count', Integer, nullable=False),
+        Column('created_at', DateTime),
+        Column('rehydrated_at', DateTime),
+        Index('ix_submission_archive_bank_status', 'quiz_bank_id', 'status'),
+    )
+    archived_submission = Table(
+        'archived_submission', metadata,
+        Column('submission_id', Integer, primary_key=True, autoincrement=False),
+        Column('archive_id', Integer, ForeignKey('submission_archive.id'), nullable=False, index=True),
+    )
+    metadata.create_all(connection, tables=[submission_archive, archived_submission], checkfirst=True)
+
+
+def _quiz_bank_cache_version(connection):
+    """題庫快取版本號（題目或狀態變更時遞增，所有 worker 以此判斷快取是否失效）"""
+    columns = {column['name'] for column in inspect(connection).get_columns('quiz_bank')}
+    if 'cache_version' not in columns:
+        connection.execute(text('ALTER TABLE quiz_bank ADD COLUMN cache_version INTEGER NOT NULL DEFAULT 0'))
+
+
+MIGRATIONS = [
+    Migration('0001', 'baseline', _baseline),
+    Migration('0002', 'submission_side_tables', _submission_side_tables),
+    Migration('0003', 'hot_lookup_indexes', _hot_lookup_indexes, transactional=False),
+    Migration('0004', 'submission_answers', _submission_answers),
+    Migration('0005', 'draft_attempts', _draft_attempts),
+    Migration('0006', 'regrade_jobs', _regrade_jobs),
+    Migration('0007', 'answer_signatures', _answer_signatures),
+    Migration('0008', 'submission_archives', _submission_archives),
+    Migration('0009', 'quiz_bank_cache_version', _quiz_bank_cache_version),
+]
+
+
+def _ensure_migrations_table(engine):
+    metadata = MetaData()
+    Table(MIGRATIONS_TABLE, metadata,
+          Column('version', String(32), primary_key=True),
+          Column('name', String(200), nullable=False),
+          Column('applied_at', DateTime, nullable=False))
+    metadata.create_all(engine, checkfirst=True)
+
+
+def applied_versions(engine):
+    if not inspect(engine).has_table(MIGRATIONS_TABLE):
+        return set()
+    with engine.connect() as connection:
+        return {row[0] for row in connection.execute(text(f'SELECT version FROM {MIGRATIONS_TABLE}'))}
+
+
+def pending_migrations(engine, migrations=MIGRATIONS):
+    applied = applied_versions(engine)
+    return [migration for migration in migrations if migration.version not in applied]
+
+
+def upgrade(engine, migrations=MIGRATIONS, log=None):
+    """套用所有尚未執行的遷移，回傳套用的版本列表；log 預設寫入 logging（CLI 命令改傳 click.echo）"""
+    log = log or logger.info
+    _ensure_migrations_table(engine)
+    lock_connection = None
+    if engine.dialect.name == 'postgresql':
+        lock_connection = engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+        lock_connection.execute(text('SELECT pg_advisory_lock(:id)'), {'id': _LOCK_ID})
+    try:
+        applied = []
+        for migration in pending_migrations(engine, migrations):
+            log(f'套用遷移 {migration.version}_{migration.name}')
+            record = text(f'INSERT INTO {MIGRATIONS_TABLE} (version, name, applied_at) VALUES (:version, :name, :at)')
+            values = {'version': migration.version, 'name': migration.name, 'at': datetime.utcnow()}
+            if migration.transactional:
+                with engine.begin() as connection:
+                    migration.upgrade(connection)
+                    connection.execute(record, values)
+            else:
+                with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+                    migration.upgrade(connection)
+                with engine.begin() as connection:
+                    connection.execute(record, values)
+            applied.append(migration.version)
+        return applied
+    finally:
+        if lock_connection is not None:
+            lock_connection.execute(text('SELECT pg_advisory_unlock(:id)'), {'id': _LOCK_ID})
+            lock_connection.close()
+
+
+def explain(connection, statement):
+    """回傳 (是否使用索引, 執行計畫說明列表)；只支援 SQLite 與 PostgreSQL"""
+    compiled = statement.compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True})
+    if connection.dialect.name == 'sqlite':
+        details = [row[-1] for row in connection.execute(text(f'EXPLAIN QUERY PLAN {compiled}'))]
+        # 全表掃描為 "SCAN 資料表"（沒有 USING INDEX），排序未由索引提供時會出現 TEMP B-TREE
+        problems = [d for d in details
+                    if (d.startswith('SCAN ') and ' USING ' not in d) or 'TEMP B-TREE' in d]
+        return not problems, details
+    if connection.dialect.name == 'postgresql':
+        # 測試資料量小時規劃器偏好循序掃描，這裡只確認「可以」使用索引
+        transaction = connection.begin_nested() if connection.in_transaction() else connection.begin()
+        try:
+            connection.execute(text('SET LOCAL enable_seqscan = off'))
+            plan = connection.execute(text(f'EXPLAIN (FORMAT JSON) {compiled}')).scalar()
+        finally:
+            transaction.rollback()
+        nodes = []
+        stack = [plan[0]['Plan']]
+        while stack:
+            node = stack.pop()
+            nodes.append(f"{node['Node Type']} {node.get('Relation Name', '')} {node.get('Index Name', '')}".strip())
+            stack.extend(node.get('Plans', []))
+        return not any(n.startswith('Seq Scan') for n in nodes), nodes
+    raise ValueError(f'不支援的資料庫：{connection.dialect.name}')
@@ -0,0 +1,215 @@
+# 請求效能分析
+# 啟用後記錄每個請求的 SQL 查詢數與時間、重複查詢（N+1）、模板渲染與評分等區段時間，
+# 以 Server-Timing 標頭回傳，並在 /metrics 提供 Prometheus 格式的各路由延遲直方圖。
+# 指標只統計本行程；多個 gunicorn worker 時 Prometheus 需分別抓取或改用彙整方式。
+import hmac
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from flask import Response, g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# 延遲直方圖的區間上限（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+# IN (?, ?, ?) 的參數個數不同仍視為同一查詢
+_IN_LIST_RE = re.compile(r'\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))*\s*\)')
+
+
+def normalize_statement(statement):
+    return _IN_LIST_RE.sub('(?)', _WHITESPACE_RE.sub(' ', statement).strip())
+
+
+class RequestProfile:
+    """單一請求的量測資料"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+        self.timings = defaultdict(float)  # 區段名稱 -> 秒
+        self._template_started = []
+
+
+def current_profile():
+    if has_request_context():
+        return g.get('_request_profile')
+    return None
+
+
+@contextmanager
+def timed(name):
+    """量測一段程式碼的時間並計入目前請求（未啟用或不在請求中時不做任何事）"""
+    profile = current_profile()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.timings[name] += time.perf_counter() - started
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RequestMetrics:
+    """依 (路由, 方法) 彙整的 Prometheus 指標"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._latency = {}  # key -> [各區間筆數..., 總和, 筆數]
+        self._queries = Counter()
+        self._db_seconds = Counter()
+        self._sections = Counter()
+        self._duplicate_queries = Counter()
+        self._responses = Counter()
+
+    def observe(self, endpoint, method, status, elapsed, profile, duplicates):
+        key = (endpoint, method)
+        with self._lock:
+            histogram = self._latency.get(key)
+            if histogram is None:
+                histogram = self._latency[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if elapsed <= bound:
+                    histogram[i] += 1
+            histogram[-2] += elapsed
+            histogram[-1] += 1
+            self._responses[(endpoint, method, str(status))] += 1
+            self._queries[key] += profile.query_count
+            self._db_seconds[key] += profile.db_time
+            for name, seconds in profile.timings.items():
+                self._sections[(endpoint, method, name)] += seconds
+            if duplicates:
+                self._duplicate_queries[key] += len(duplicates)
+
+    def render(self):
+        """輸出 Prometheus 文字格式"""
+        lines = []
+        with self._lock:
+            lines.append('# HELP quiz_http_request_duration_seconds 請求處理時間')
+            lines.append('# TYPE quiz_http_request_duration_seconds histogram')
+            for (endpoint, method), histogram in sorted(self._latency.items()):
+                labels = f'endpoint="{_escape_label(endpoint)}",method="{method}"'
+                for bound, count in zip(self.buckets, histogram):
+                    lines.append(f'quiz_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'quiz_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram[-1]}')
+                lines.append(f'quiz_http_request_duration_seconds_sum{{{labels}}} {histogram[-2]:.6f}')
+                lines.append(f'quiz_http_request_duration_seconds_count{{{labels}}} {histogram[-1]}')
+
+            lines.append('# HELP quiz_http_responses_total 回應數（依狀態碼）')
+            lines.append('# TYPE quiz_http_responses_total counter')
+            for (endpoint, method, status), count in sorted(self._responses.items()):
+                lines.append(f'quiz_http_responses_total{{endpoint="{_escape_label(endpoint)}",method="{method}",'
+                             f'status="{status}"}} {count}')
+
+            for name, help_text, values, fmt in (
+                ('quiz_sql_queries_total', 'SQL 查詢數', self._queries, '{}'),
+                ('quiz_sql_duration_seconds_total', 'SQL 查詢總時間', self._db_seconds, '{:.6f}'),
+                ('quiz_duplicate_queries_total', '疑似 N+1 的重複查詢數', self._duplicate_queries, '{}'),
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for (endpoint, method), value in sorted(values.items()):
+                    lines.append(f'{name}{{endpoint="{_escape_label(endpoint)}",method="{method}"}} '
+                                 + fmt.format(value))
+
+            lines.append('# HELP quiz_section_duration_seconds_total 各區段（模板渲染、評分等）總時間')
+            lines.append('# TYPE quiz_section_duration_seconds_total counter')
+            for (endpoint, method, name), seconds in sorted(self._sections.items()):
+                lines.append(f'quiz_section_duration_seconds_total{{endpoint="{_escape_label(endpoint)}",'
+                             f'method="{method}",section="{name}"}} {seconds:.6f}')
+        return '\n'.join(lines) + '\n'
+
+
+class RequestProfiler:
+    """掛在 Flask app 上的效能分析中介層
+
+    duplicate_threshold：同一請求中相同查詢（參數不同）執行達此次數即視為疑似 N+1 並記錄警告。
+    metrics_token：/metrics 需帶 Authorization: Bearer <token>；未設定時不提供 /metrics（回傳 404）。
+    """
+
+    def __init__(self, app=None, duplicate_threshold=5, metrics_token=None, server_timing=True):
+        self.duplicate_threshold = duplicate_threshold
+        self.metrics_token = metrics_token
+        self.server_timing = server_timing
+        self.metrics = RequestMetrics()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        if self.metrics_token:
+            app.add_url_rule('/metrics', 'metrics', self._metrics_view)
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+
+    def _before_request(self):
+        g._request_profile = RequestProfile()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        profile = current_profile()
+        if profile is not None:
+            conn.info.setdefault('_profile_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        profile = current_profile()
+        started = conn.info.get('_profile_started')
+        if profile is None or not started:
+            return
+        profile.db_time += time.perf_counter() - started.pop()
+        profile.query_count += 1
+        profile.statements[normalize_statement(statement)] += 1
+
+    def _before_render(self, sender, template, context, **extra):
+        profile = current_profile()
+        if profile is not None:
+            profile._template_started.append(time.perf_counter())
+
+    def _after_render(self, sender, template, context, **extra):
+        profile = current_profile()
+        if profile is not None and profile._template_started:
+            profile.timings['template'] += time.perf_counter() - profile._template_started.pop()
+
+    def _after_request(self, response):
+        profile = current_profile()
+        if profile is None or request.endpoint == 'metrics':
+            return response
+        elapsed = time.perf_counter() - profile.started
+        endpoint = request.endpoint or 'unmatched'
+
+        duplicates = {statement: count for statement, count in profile.statements.items()
+                      if count >= self.duplicate_threshold}
+        for statement, count in duplicates.items():
+            logger.warning('可能的 N+1 查詢：%s %s 中同一查詢執行了 %d 次：%s',
+                           request.method, request.path, count, statement[:200])
+
+        self.metrics.observe(endpoint, request.method, response.status_code, elapsed, profile, duplicates)
+
+        if self.server_timing:
+            entries = [f'db;dur={profile.db_time * 1000:.2f};desc="{profile.query_count} queries"']
+            entries.extend(f'{name};dur={seconds * 1000:.2f}' for name, seconds in profile.timings.items())
+            entries.append(f'app;dur={elapsed * 1000:.2f}')
+            response.headers.add('Server-Timing', ', '.join(entries))
+        return response
+
+    def _metrics_view(self):
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {self.metrics_token}'):
+            return Response('unauthorized\n', status=401, mimetype='text/plain')
+        return Response(self.metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,186 @@
+# 題目批次匯入 / 匯出
+# 匯入檔案（JSON Lines 或 CSV）逐行讀取並依題型檢查 question_data，
+# 匯出則逐題串流輸出相同格式，可用於在教師或伺服器之間複製題庫。
+import csv
+import json
+
+from export import iter_csv
+
+QUESTION_TYPES = ('single_choice', 'multiple_choice', 'fill_blank', 'dropdown', 'dropdown_fillblank', 'parsons')
+CSV_COLUMNS = ('title', 'question_text', 'question_type', 'points', 'question_data')
+JSONL_MIMETYPE = 'application/x-ndjson; charset=utf-8'
+
+
+def _is_text(value):
+    return isinstance(value, str) and value.strip() != ''
+
+
+def _check_options(data, errors, label='選項'):
+    options = data.get('options')
+    if not isinstance(options, list) or len(options) < 2:
+        errors.append(f'{label}至少需要2個')
+
+
+def _validate_choice(data, errors):
+    _check_options(data, errors)
+    if not _is_text(data.get('correct_answer')):
+        errors.append('缺少正確答案 correct_answer')
+
+
+def _validate_multiple_choice(data, errors):
+    _check_options(data, errors)
+    correct_answers = data.get('correct_answers')
+    if not isinstance(correct_answers, list) or not correct_answers:
+        errors.append('至少需要一個正確答案 correct_answers')
+
+
+def _validate_fill_blank(data, errors):
+    if not _is_text(data.get('correct_answer')):
+        errors.append('缺少正確答案 correct_answer')
+
+
+def _validate_dropdown_fillblank(data, errors):
+    if not _is_text(data.get('fillblank_text')):
+        errors.append('缺少填空題目文字 fillblank_text')
+    blanks = data.get('blanks')
+    if not isinstance(blanks, list) or not blanks:
+        errors.append('至少需要一個空格 blanks')
+        return
+    for i, blank in enumerate(blanks):
+        if not isinstance(blank, dict):
+            errors.append(f'空格 {i + 1} 格式錯誤')
+            continue
+        _check_options(blank, errors, f'空格 {i + 1} 的選項')
+        if not _is_text(blank.get('correct_answer')):
+            errors.append(f'空格 {i + 1} 缺少正確答案')
+
+
+def _validate_parsons(data, errors):
+    code_blocks = data.get('code_blocks')
+    if not isinstance(code_blocks, dict) or len(code_blocks) < 2:
+        errors.append('至少需要2個程式碼塊 code_blocks')
+    # 舊版只有 correct_order 的題目仍可匯入
+    if 'slot_answers' not in data and isinstance(data.get('correct_order'), list):
+        return
+    answer_slots = data.get('answer_slots')
+    slot_answers = data.get('slot_answers') or {}
+    fixed_blocks = data.get('fixed_blocks') or {}
+    if not isinstance(answer_slots, int) or isinstance(answer_slots, bool) or answer_slots < 1:
+        errors.append('answer_slots 需為正整數')
+        return
+    if not isinstance(slot_answers, dict) or not isinstance(fixed_blocks, dict):
+        errors.append('slot_answers 與 fixed_blocks 需為物件')
+        return
+    missing = [str(i) for i in range(1, answer_slots + 1) if str(i) not in slot_answers and str(i) not in fixed_blocks]
+    if missing:
+        errors.append(f"以下空格尚未設定：{'、'.join(missing)}")
+    empty = [slot for slot, fixed in fixed_blocks.items()
+             if not isinstance(fixed, dict) or not _is_text(fixed.get('content'))]
+    if empty:
+        errors.append(f"以下固定程式碼塊沒有內容：{'、'.join(empty)}")
+
+
+# 與題目編輯畫面的前端檢查規則一致
+QUESTION_DATA_VALIDATORS = {
+    'single_choice': _validate_choice,
+    'dropdown': _validate_choice,
+    'multiple_choice': _validate_multiple_choice,
+    'fill_blank': _validate_fill_blank,
+    'dropdown_fillblank': _validate_dropdown_fillblank,
+    'parsons': _validate_parsons,
+}
+
+
+def validate_question(record):
+    """檢查一筆匯入的題目，回傳 (整理後的欄位, 錯誤訊息列表)"""
+    if not isinstance(record, dict):
+        return None, ['每一筆資料需為物件']
+    errors = []
+    title = record.get('title')
+    question_text = record.get('question_text')
+    question_type = record.get('question_type')
+    points = record.get('points', 1)
+    question_data = record.get('question_data', {})
+
+    if not _is_text(title):
+        errors.append('缺少標題 title')
+    elif len(title) > 200:
+        errors.append('標題不可超過200字')
+    if not _is_text(question_text):
+        errors.append('缺少題目內容 question_text')
+    if question_type not in QUESTION_TYPES:
+        errors.append(f'不支援的題型：{question_type}')
+    if points in (None, ''):
+        points = 1
+    try:
+        points = int(points)
+        if points < 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        errors.append('分數 points 需為非負整數')
+    if isinstance(question_data, str):
+        try:
+            question_data = json.loads(question_data) if question_data.strip() else {}
+        except ValueError:
+            errors.append('question_data 不是有效的 JSON')
+            question_data = None
+    if question_data is not None and not isinstance(question_data, dict):
+        errors.append('question_data 需為物件')
+    elif question_data is not None and question_type in QUESTION_DATA_VALIDATORS:
+        QUESTION_DATA_VALIDATORS[question_type](question_data, errors)
+
+    if errors:
+        return None, errors
+    return {
+        'title': title.strip(),
+        'question_text': question_text,
+        'question_type': question_type,
+        'points': points,
+        'question_data': json.dumps(question_data, ensure_ascii=False),
+    }, []
+
+
+def iter_records(lines, file_format):
+    """逐筆讀取匯入檔，產生 (行號, 資料或 None, 解析錯誤)；lines 為位元組行的可迭代物件"""
+    text_lines = (line.decode('utf-8-sig') for line in lines)
+    if file_format == 'csv':
+        reader = csv.DictReader(text_lines)
+        missing = [column for column in ('title', 'question_text', 'question_type')
+                   if column not in (reader.fieldnames or [])]
+        if missing:
+            yield 1, None, f"CSV 缺少欄位：{', '.join(missing)}"
+            return
+        for record in reader:
+            yield reader.line_num, record, None
+        return
+    for line_number, line in enumerate(text_lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line), None
+        except ValueError:
+            yield line_number, None, '不是有效的 JSON'
+
+
+def export_record(question):
+    return {
+        'title': question.title,
+        'question_text': question.question_text,
+        'question_type': question.question_type,
+        'points': question.points,
+        'question_data': json.loads(question.question_data) if question.question_data else {},
+    }
+
+
+def iter_jsonl_export(questions):
+    for question in questions:
+        yield json.dumps(export_record(question), ensure_ascii=False) + '\n'
+
+
+def iter_csv_export(questions):
+    rows = (
+        [question.title, question.question_text, question.question_type, question.points,
+         question.question_data or '{}']
+        for question in questions
+    )
+    return iter_csv(list(CSV_COLUMNS), rows)
@@ -0,0 +1,129 @@
+# 答案鍵修正後的批次重新評分
+# 作答依 id 游標分批讀出，在行程池中以與提交時相同的 AnswerKey 規則重新評分，
+# 只將分數或逐題結果有變動的作答交回主行程以批次 UPDATE 寫回。
+# 子行程只做評分（不連資料庫），題目以 tuple 傳入後在各子行程編譯一次答案鍵。
+import hashlib
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from types import SimpleNamespace
+
+from grader import compile_answer_key, serialize_results
+
+# 差異報告中保留的作答範例筆數
+SAMPLE_LIMIT = 100
+
+_answer_key = None
+
+
+def question_rows(questions):
+    """題目 -> 可在行程間傳遞的 (題目ID, 題型, 配分, 題目資料) tuple"""
+    return [(q.id, q.question_type, q.points, q.question_data) for q in questions]
+
+
+def answer_key_fingerprint(rows):
+    """答案鍵指紋；繼續中斷的工作前用來確認題目沒有再次變更"""
+    return hashlib.sha1(json.dumps(rows, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def compile_rows(quiz_bank_id, rows):
+    return compile_answer_key(quiz_bank_id, [
+        SimpleNamespace(id=question_id, question_type=question_type, points=points, question_data=question_data)
+        for question_id, question_type, points, question_data in rows
+    ])
+
+
+def _init_worker(quiz_bank_id, rows):
+    global _answer_key
+    _answer_key = compile_rows(quiz_bank_id, rows)
+
+
+def grade_chunk(rows, answer_key=None):
+    """重新評分一批作答，回傳有變動的作答
+
+    rows 為 [(作答ID, 作答JSON, 原分數, 原總分, 原逐題結果JSON)]。
+    """
+    answer_key = answer_key or _answer_key
+    changes = []
+    for submission_id, answers_text, old_score, old_total_points, old_results in rows:
+        try:
+            answers = json.loads(answers_text) if answers_text else {}
+        except ValueError:
+            answers = {}
+        if not isinstance(answers, dict):
+            answers = {}
+        grade_result = answer_key.grade(answers)
+        results = serialize_results(grade_result.results)
+        if (grade_result.score == old_score and grade_result.total_points == old_total_points
+                and results == old_results):
+            continue
+        changes.append({
+            'id': submission_id,
+            'old_score': old_score,
+            'old_total_points': old_total_points,
+            'score': grade_result.score,
+            'total_points': grade_result.total_points,
+            'results': results,
+            'answers': [
+                (item.question_id, answers.get(item.answer_id), result.is_correct, result.points)
+                for item, result in zip(answer_key.items, grade_result.results)
+            ],
+        })
+    return changes
+
+
+class RegradePool:
+    """評分行程池；workers <= 1 時在目前行程中評分"""
+
+    def __init__(self, quiz_bank_id, rows, workers):
+        if workers > 1:
+            # spawn：不複製網頁行程的資料庫連線與執行緒狀態
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker, initargs=(quiz_bank_id, rows)
+            )
+            self._grade = grade_chunk
+        else:
+            self._executor = None
+            self._grade = partial(grade_chunk, answer_key=compile_rows(quiz_bank_id, rows))
+
+    def map(self, chunks):
+        if self._executor is None:
+            return map(self._grade, chunks)
+        return self._executor.map(self._grade, chunks)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def new_report():
+    return {'changed': 0, 'increased': 0, 'decreased': 0, 'total_points_changed': 0, 'score_delta': 0,
+            'samples': []}
+
+
+def update_report(report, changes):
+    """將一批變動累計到差異報告"""
+    for change in changes:
+        delta = change['score'] - (change['old_score'] or 0)
+        report['changed'] += 1
+        report['increased'] += delta > 0
+        report['decreased'] += delta < 0
+        report['total_points_changed'] += change['total_points'] != change['old_total_points']
+        report['score_delta'] += delta
+        if len(report['samples']) < SAMPLE_LIMIT:
+            report['samples'].append({
+                'submission_id': change['id'],
+                'old_score': change['old_score'],
+                'score': change['score'],
+                'old_total_points': change['old_total_points'],
+                'total_points': change['total_points'],
+            })
+    return report
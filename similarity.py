@@ -0,0 +1,181 @@
+# 相似作答偵測
+# 將每份作答中答錯的填空題文字與程式碼排序題排列轉為 token 集合，以 MinHash 簽章表示（提交時計算並儲存），
+# 再以 LSH 分段（band）分桶：只有落在同一桶的作答才比對簽章，找出作答內容幾乎相同的群組，
+# 不需要兩兩比較所有作答。答對的作答彼此相同是正常的，因此只比對答錯的題目。
+import hashlib
+import threading
+
+import numpy as np
+
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+# 同一桶超過此數量時，只與桶內第一份作答比對，避免大量相同作答造成平方級比較
+MAX_BUCKET_PAIRWISE = 32
+
+# 雜湊函式 (a * h + b) mod p；a、b 固定種子產生，簽章在各行程與重新啟動後都相同
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_permutations = np.random.RandomState(20240601)
+_PERM_A = _permutations.randint(1, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _permutations.randint(0, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+
+
+def _normalize_text(value):
+    return ' '.join(str(value).lower().split())
+
+
+def _parsons_sequence(answer):
+    """程式碼排序題作答 -> [(位置, 區塊)]"""
+    if isinstance(answer, dict) and isinstance(answer.get('slot_answers'), dict):
+        slots = answer['slot_answers']
+        return sorted((str(slot), str(label)) for slot, label in slots.items())
+    if isinstance(answer, dict) and isinstance(answer.get('order'), list):
+        answer = answer['order']
+    if isinstance(answer, list):
+        return [(str(i), str(label)) for i, label in enumerate(answer, 1)]
+    if isinstance(answer, dict):
+        return sorted((str(slot), str(label)) for slot, label in answer.items())
+    return []
+
+
+def answer_tokens(question_types, answer_rows):
+    """答錯的填空題與程式碼排序題作答 -> token 集合
+
+    question_types 為 {題目ID: 題型}，answer_rows 為 [(題目ID, 作答, 是否正確)]。
+    """
+    tokens = set()
+    for question_id, answer, is_correct in answer_rows:
+        if is_correct or answer is None or answer == '':
+            continue
+        question_type = question_types.get(question_id)
+        if question_type == 'fill_blank':
+            text = _normalize_text(answer)
+            if not text:
+                continue
+            tokens.add(f'{question_id}={text}')
+            padded = f' {text} '
+            for i in range(max(len(padded) - SHINGLE_SIZE + 1, 1)):
+                tokens.add(f'{question_id}:{padded[i:i + SHINGLE_SIZE]}')
+        elif question_type == 'parsons':
+            sequence = _parsons_sequence(answer)
+            for slot, label in sequence:
+                tokens.add(f'{question_id}@{slot}={label}')
+            # 相鄰區塊的先後關係，位置整體偏移時仍視為相似
+            for (_, first), (_, second) in zip(sequence, sequence[1:]):
+                tokens.add(f'{question_id}:{first}>{second}')
+    return tokens
+
+
+def minhash(tokens):
+    """token 集合 -> MinHash 簽章（NUM_PERM 個 uint32）；沒有 token 時回傳 None"""
+    if not tokens:
+        return None
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=4).digest(), 'little') for token in tokens),
+        dtype=np.uint64, count=len(tokens)
+    )
+    permuted = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % _MERSENNE_PRIME
+    return (permuted.min(axis=1) & 0xFFFFFFFF).astype(np.uint32)
+
+
+def answer_signature(question_types, answer_rows):
+    """作答的 MinHash 簽章（bytes，供資料庫儲存）；沒有可比對的作答時回傳 None"""
+    signature = minhash(answer_tokens(question_types, answer_rows))
+    return signature.tobytes() if signature is not None else None
+
+
+class SimilarityIndex:
+    """單一題庫的 LSH 索引，可逐筆加入作答"""
+
+    def __init__(self):
+        self.submission_ids = []
+        self.signatures = []
+        self.buckets = [{} for _ in range(BANDS)]
+        self.last_id = 0
+
+    def __len__(self):
+        return len(self.submission_ids)
+
+    def add(self, submission_id, signature):
+        signature = np.frombuffer(signature, dtype=np.uint32)
+        position = len(self.submission_ids)
+        self.submission_ids.append(submission_id)
+        self.signatures.append(signature)
+        for band, buckets in enumerate(self.buckets):
+            key = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes()
+            buckets.setdefault(key, []).append(position)
+        self.last_id = max(self.last_id, submission_id)
+
+    def _candidate_pairs(self):
+        for buckets in self.buckets:
+            for positions in buckets.values():
+                if len(positions) < 2:
+                    continue
+                if len(positions) <= MAX_BUCKET_PAIRWISE:
+                    for i, first in enumerate(positions):
+                        for second in positions[i + 1:]:
+                            yield first, second
+                else:
+                    for second in positions[1:]:
+                        yield positions[0], second
+
+    def clusters(self, threshold=0.7, min_size=2):
+        """估計相似度（相同簽章值的比例）達 threshold 的作答群組，由大到小排序"""
+        parent = list(range(len(self.submission_ids)))
+        similarity = {}
+
+        def find(position):
+            while parent[position] != position:
+                parent[position] = parent[parent[position]]
+                position = parent[position]
+            return position
+
+        for first, second in self._candidate_pairs():
+            root_first, root_second = find(first), find(second)
+            if root_first == root_second:
+                continue
+            estimate = float(np.count_nonzero(self.signatures[first] == self.signatures[second])) / NUM_PERM
+            if estimate < threshold:
+                continue
+            parent[root_second] = root_first
+            similarity[root_first] = min(estimate, similarity.get(root_first, 1.0), similarity.get(root_second, 1.0))
+
+        groups = {}
+        for position in range(len(parent)):
+            groups.setdefault(find(position), []).append(self.submission_ids[position])
+        result = [
+            {'submission_ids': sorted(members), 'size': len(members), 'min_similarity': round(similarity[root], 4)}
+            for root, members in groups.items() if len(members) >= min_size
+        ]
+        result.sort(key=lambda cluster: (-cluster['size'], -cluster['min_similarity'], cluster['submission_ids'][0]))
+        return result
+
+
+class SimilarityIndexCache:
+    """以題庫ID為鍵的 LSH 索引；每次查詢只載入上次之後新增的簽章，數量不符（有作答刪除或補寫）時重建"""
+
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def clusters(self, quiz_bank_id, load_signatures, count, threshold=0.7, min_size=2):
+        """回傳 (索引中的作答數, 相似作答群組)
+
+        load_signatures(after_id) 回傳依作答ID排序的 [(作答ID, 簽章)]；count 為資料庫中的簽章數。
+        """
+        with self._lock:
+            index = self._indexes.get(quiz_bank_id)
+            if index is not None:
+                for submission_id, signature in load_signatures(index.last_id):
+                    index.add(submission_id, signature)
+            if index is None or len(index) != count:
+                index = SimilarityIndex()
+                for submission_id, signature in load_signatures(0):
+                    index.add(submission_id, signature)
+                self._indexes[quiz_bank_id] = index
+            return len(index), index.clusters(threshold=threshold, min_size=min_size)
+
+    def invalidate(self, quiz_bank_id):
+        with self._lock:
+            self._indexes.pop(quiz_bank_id, None)
@@ -0,0 +1,70 @@
+document.getElementById('create-quiz-form').addEventListener('submit', async function(e) {
+    e.preventDefault();
+    
+    const title = document.getElementById('title').value.trim();
+    const description = document.getElementById('description').value.trim();
+    
+    // 清除之前的錯誤訊息
+    clearAlert();
+    
+    if (!title) {
+        showAlert('請輸入題庫標題', 'error');
+        return;
+    }
+    
+    // 顯示載入狀態
+    setLoading(true);
+    
+    try {
+        const response = await fetch('/create-quiz-bank', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                title: title,
+                description: description
+            })
+        });
+        
+        const data = await response.json();
+        
+        if (response.ok) {
+            showAlert(`題庫建立成功！題庫代碼：${data.access_code}`, 'success');
+            setTimeout(() => {
+                window.location.href = `/quiz-bank/${data.quiz_bank_id}`;
+            }, 2000);
+        } else {
+            showAlert(data.error || '建立題庫失敗，請稍後再試', 'error');
+        }
+    } catch (error) {
+        showAlert('網路錯誤，請檢查連線', 'error');
+    } finally {
+        setLoading(false);
+    }
+});
+
+function showAlert(message, type) {
+    const alertContainer = document.getElementById('alert-container');
+    alertContainer.innerHTML = `<div class="alert alert-${type}">${message}</div>`;
+}
+
+function clearAlert() {
+    document.getElementById('alert-container').innerHTML = '';
+}
+
+function setLoading(loading) {
+    const text = document.getElementById('create-text');
+    const spinner = document.getElementById('create-loading');
+    const button = document.querySelector('#create-quiz-form button[type="submit"]');
+    
+    if (loading) {
+        text.style.display = 'none';
+        spinner.style.display = 'inline-block';
+        button.disabled = true;
+    } else {
+        text.style.display = 'inline';
+        spinner.style.display = 'none';
+        button.disabled = false;
+    }
+}
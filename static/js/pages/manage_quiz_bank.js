@@ -0,0 +1,1284 @@
+// 頁面資料由模板以 JSON 寫入 #page-data
+const PAGE_DATA = JSON.parse(document.getElementById('page-data').textContent);
+
+let currentQuestionId = null;
+
+function showAddQuestionModal() {
+    currentQuestionId = null;
+    document.getElementById('modal-title').textContent = '新增題目';
+    document.getElementById('question-form').reset();
+    document.getElementById('question-specific-content').innerHTML = '';
+    document.getElementById('question-modal').style.display = 'block';
+}
+
+function hideQuestionModal() {
+    document.getElementById('question-modal').style.display = 'none';
+}
+
+function handleQuestionTypeChange() {
+    const type = document.getElementById('question-type').value;
+    const container = document.getElementById('question-specific-content');
+    
+    switch (type) {
+        case 'single_choice':
+        case 'multiple_choice':
+            container.innerHTML = `
+                <div class="form-group">
+                    <label>選項 * <span style="color: #667eea; font-size: 0.9rem;">(支援 LaTeX 數學公式)</span></label>
+                    <div id="options-container">
+                        <div class="option-row" style="display: flex; gap: 0.5rem; margin-bottom: 0.5rem;">
+                            <textarea class="option-input" placeholder="選項內容 (支援多行和LaTeX公式，例如：$\\\\frac{1}{2}$)" style="flex: 1; min-height: 60px;"></textarea>
+                            <label style="margin: 0; display: flex; align-items: center;">
+                                <input type="${type === 'single_choice' ? 'radio' : 'checkbox'}" name="correct-option" style="margin-right: 0.5rem;">
+                                正確
+                            </label>
+                            <button type="button" onclick="removeOption(this)" class="btn btn-danger" style="padding: 4px 8px;">刪除</button>
+                        </div>
+                    </div>
+                    <button type="button" onclick="addOption()" class="btn btn-secondary" style="margin-top: 0.5rem;">新增選項</button>
+                </div>
+            `;
+            break;
+            
+        case 'fill_blank':
+            container.innerHTML = `
+                <div class="form-group">
+                    <label for="correct-answer">正確答案 *</label>
+                    <input type="text" id="correct-answer" required placeholder="輸入正確答案">
+                </div>
+            `;
+            break;
+            
+        case 'dropdown':
+            container.innerHTML = `
+                <div class="form-group">
+                    <label>下拉選項 *</label>
+                    <div id="dropdown-options-container">
+                        <div class="dropdown-option-row" style="display: flex; gap: 0.5rem; margin-bottom: 0.5rem;">
+                            <textarea class="dropdown-option-input" placeholder="選項內容 (支援多行)" style="flex: 1; min-height: 60px;"></textarea>
+                            <label style="margin: 0; display: flex; align-items: center;">
+                                <input type="radio" name="correct-dropdown" style="margin-right: 0.5rem;">
+                                正確
+                            </label>
+                            <button type="button" onclick="removeDropdownOption(this)" class="btn btn-danger" style="padding: 4px 8px;">刪除</button>
+                        </div>
+                    </div>
+                    <button type="button" onclick="addDropdownOption()" class="btn btn-secondary" style="margin-top: 0.5rem;">新增選項</button>
+                </div>
+            `;
+            break;
+            
+        case 'dropdown_fillblank':
+            container.innerHTML = `
+                <div class="form-group">
+                    <label>填空題目文字 *</label>
+                    <textarea id="fillblank-text" rows="3" placeholder="請輸入題目文字，使用 {{}} 標記需要填空的位置。例如：程式設計中，{{}} 是一種控制結構，用來執行 {{}} 操作。" style="width: 100%; padding: 0.5rem; border: 1px solid #ddd; border-radius: 4px;"></textarea>
+                    <p style="color: #666; font-size: 0.9rem; margin-top: 0.5rem;">使用 {{}} 標記填空位置，系統會自動為每個 {{}} 生成對應的下拉選單</p>
+                </div>
+                
+                <div class="form-group">
+                    <label>空格選項設定</label>
+                    <div id="blanks-container" style="background: #f8f9fa; padding: 1rem; border-radius: 8px;">
+                        <p style="color: #666; margin-bottom: 1rem;">請先在上方文字中使用 {{}} 標記填空位置，然後點擊下方按鈕解析空格</p>
+                        <button type="button" onclick="parseBlanks()" class="btn btn-primary" style="margin-bottom: 1rem;">解析空格</button>
+                        <div id="blanks-options-container"></div>
+                    </div>
+                </div>
+            `;
+            break;
+            
+        case 'parsons':
+            container.innerHTML = `
+                <div class="form-group">
+                    <label>可供選擇的程式碼塊 *</label>
+                    <div id="code-blocks-container" style="background: #e8f5e8; padding: 1rem; border-radius: 8px; margin-bottom: 1rem;">
+                        <div class="code-block-row" style="display: flex; gap: 0.5rem; margin-bottom: 0.5rem; align-items: center;">
+                            <span style="min-width: 30px; color: #666;">A</span>
+                            <textarea class="code-block-input" placeholder="程式碼塊內容 (支援多行)" style="flex: 1; min-height: 60px; font-family: Consolas, monospace;" oninput="updateAnswerSlots(); updateParsonsPreview();"></textarea>
+                            <button type="button" onclick="removeCodeBlock(this)" class="btn btn-danger" style="padding: 4px 8px;">刪除</button>
+                        </div>
+                    </div>
+                    <button type="button" onclick="addCodeBlock()" class="btn btn-success" style="margin-bottom: 1.5rem;">新增程式碼塊</button>
+                    
+                    <label>答案區空格設定 *</label>
+                    <div style="background: #f0f7ff; padding: 1rem; border-radius: 8px; margin-bottom: 1rem;">
+                        <div style="display: flex; gap: 1rem; align-items: center; margin-bottom: 1rem;">
+                            <label style="margin: 0;">答案區空格數量：</label>
+                            <input type="number" id="answer-slots-count" min="1" value="3" style="width: 80px;" onchange="updateAnswerSlots(); updateParsonsPreview();">
+                            <span style="color: #666; font-size: 0.9rem;">（自動更新）</span>
+                            <span id="parsons-completion-status" style="margin-left: auto; padding: 0.3rem 0.8rem; border-radius: 4px; font-size: 0.9rem; font-weight: 500;"></span>
+                        </div>
+                        <div id="answer-slots-container"></div>
+                    </div>
+                    
+                    <label>即時預覽</label>
+                    <div id="parsons-preview-container" style="background: #f8f9fa; padding: 1rem; border-radius: 8px; margin-bottom: 1rem; border: 1px solid #ddd; min-height: 200px;">
+                        <p style="color: #999; text-align: center; margin: 2rem 0;">請先設定程式碼塊和答案區空格</p>
+                    </div>
+                    
+                    <p style="color: #666; font-size: 0.9rem; margin-top: 1rem; padding: 1rem; background: #f8f9fa; border-radius: 8px;">
+                        <strong>📝 說明：</strong><br>
+                        • 先設定所有可供選擇的程式碼塊（標記為A、B、C...）<br>
+                        • 設定答案區有多少個空格<br>
+                        • 為每個空格選擇類型：<strong>普通答案</strong>（從程式碼塊中選擇）或<strong>固定程式碼塊</strong>（直接輸入程式碼）<br>
+                        • 固定程式碼塊會在答題區固定顯示，學生無法修改<br>
+                        • 學生需要從程式碼塊中選擇並按順序拖拉到答案區對應的空格
+                    </p>
+                </div>
+            `;
+            // 初始化预览和完成度检查
+            setTimeout(() => {
+                updateAnswerSlots();
+            }, 100);
+            break;
+            
+        default:
+            container.innerHTML = '';
+    }
+}
+
+function addOption() {
+    const container = document.getElementById('options-container');
+    const isMultiple = document.getElementById('question-type').value === 'multiple_choice';
+    const optionRow = document.createElement('div');
+    optionRow.className = 'option-row';
+    optionRow.style.cssText = 'display: flex; gap: 0.5rem; margin-bottom: 0.5rem;';
+    optionRow.innerHTML = `
+        <textarea class="option-input" placeholder="選項內容 (支援多行和LaTeX公式，例如：$\\\\frac{1}{2}$)" style="flex: 1; min-height: 60px;"></textarea>
+        <label style="margin: 0; display: flex; align-items: center;">
+            <input type="${isMultiple ? 'checkbox' : 'radio'}" name="correct-option" style="margin-right: 0.5rem;">
+            正確
+        </label>
+        <button type="button" onclick="removeOption(this)" class="btn btn-danger" style="padding: 4px 8px;">刪除</button>
+    `;
+    container.appendChild(optionRow);
+}
+
+function removeOption(button) {
+    button.parentNode.remove();
+}
+
+function addDropdownOption() {
+    const container = document.getElementById('dropdown-options-container');
+    const optionRow = document.createElement('div');
+    optionRow.className = 'dropdown-option-row';
+    optionRow.style.cssText = 'display: flex; gap: 0.5rem; margin-bottom: 0.5rem;';
+    optionRow.innerHTML = `
+        <textarea class="dropdown-option-input" placeholder="選項內容 (支援多行)" style="flex: 1; min-height: 60px;"></textarea>
+        <label style="margin: 0; display: flex; align-items: center;">
+            <input type="radio" name="correct-dropdown" style="margin-right: 0.5rem;">
+            正確
+        </label>
+        <button type="button" onclick="removeDropdownOption(this)" class="btn btn-danger" style="padding: 4px 8px;">刪除</button>
+    `;
+    container.appendChild(optionRow);
+}
+
+function removeDropdownOption(button) {
+    button.parentNode.remove();
+}
+
+function addCodeBlock() {
+    const container = document.getElementById('code-blocks-container');
+    const blockCount = container.children.length;
+    const blockLabel = String.fromCharCode(65 + blockCount); // A, B, C...
+    const blockRow = document.createElement('div');
+    blockRow.className = 'code-block-row';
+    blockRow.style.cssText = 'display: flex; gap: 0.5rem; margin-bottom: 0.5rem; align-items: center;';
+    blockRow.innerHTML = `
+        <span style="min-width: 30px; color: #667eea; font-weight: bold;">${blockLabel}</span>
+        <textarea class="code-block-input" placeholder="程式碼塊內容 (支援多行)" style="flex: 1; min-height: 60px; font-family: Consolas, monospace;" oninput="updateAnswerSlots(); updateParsonsPreview();"></textarea>
+        <button type="button" onclick="removeCodeBlock(this)" class="btn btn-danger" style="padding: 4px 8px;">刪除</button>
+    `;
+    container.appendChild(blockRow);
+    updateAnswerSlots();
+    updateParsonsPreview();
+}
+
+function removeCodeBlock(button) {
+    button.parentNode.remove();
+    // 重新編號
+    const container = document.getElementById('code-blocks-container');
+    Array.from(container.children).forEach((row, index) => {
+        const labelSpan = row.querySelector('span');
+        if (labelSpan) labelSpan.textContent = String.fromCharCode(65 + index);
+        // 更新textarea的oninput事件
+        const textarea = row.querySelector('.code-block-input');
+        if (textarea) {
+            textarea.setAttribute('oninput', 'updateAnswerSlots(); updateParsonsPreview();');
+        }
+    });
+    updateAnswerSlots();
+    updateParsonsPreview();
+}
+
+function updateAnswerSlots() {
+    const slotsCount = parseInt(document.getElementById('answer-slots-count').value) || 1;
+    const container = document.getElementById('answer-slots-container');
+    
+    // 獲取所有可用的程式碼塊
+    const codeBlockInputs = document.querySelectorAll('.code-block-input');
+    const codeBlocks = Array.from(codeBlockInputs).map((input, index) => {
+        return {
+            label: String.fromCharCode(65 + index),
+            preview: input.value.substring(0, 30) + (input.value.length > 30 ? '...' : '')
+        };
+    });
+    
+    if (codeBlocks.length === 0) {
+        container.innerHTML = '<p style="color: #e74c3c; margin: 0;">請先添加程式碼塊</p>';
+        return;
+    }
+    
+    // 保存現有的選擇、縮排和類型
+    const currentSelections = {};
+    const currentIndents = {};
+    const currentTypes = {};
+    const currentFixedContents = {};
+    
+    container.querySelectorAll('.slot-answer-select').forEach((select) => {
+        const slotNum = select.dataset.slot;
+        currentSelections[slotNum] = select.value;
+    });
+    container.querySelectorAll('.slot-indent-input').forEach((input) => {
+        const slotNum = input.dataset.slot;
+        currentIndents[slotNum] = input.value || '0';
+    });
+    container.querySelectorAll('input[name^="slot-type-"]:checked').forEach((radio) => {
+        const slotNum = radio.name.replace('slot-type-', '');
+        currentTypes[slotNum] = radio.value;
+    });
+    container.querySelectorAll('.slot-fixed-content').forEach((textarea) => {
+        const slotNum = textarea.dataset.slot;
+        currentFixedContents[slotNum] = textarea.value;
+    });
+    
+    container.innerHTML = '';
+    
+    for (let i = 1; i <= slotsCount; i++) {
+        const slotNum = i.toString();
+        const slotType = currentTypes[slotNum] || 'answer';
+        const slotDiv = document.createElement('div');
+        slotDiv.className = 'slot-config-item';
+        slotDiv.style.cssText = 'margin-bottom: 1rem; padding: 1rem; background: white; border-radius: 8px; border: 1px solid #ddd;';
+        
+        let slotHTML = `
+            <div style="display: flex; align-items: center; margin-bottom: 0.8rem;">
+            <label style="min-width: 80px; margin: 0; font-weight: bold; color: #333;">空格 ${i}：</label>
+                <div style="display: flex; gap: 1rem; align-items: center;">
+                    <label style="display: flex; align-items: center; cursor: pointer;">
+                        <input type="radio" name="slot-type-${i}" value="answer" ${slotType === 'answer' ? 'checked' : ''} onchange="toggleSlotType('${i}'); updateParsonsPreview(); checkParsonsCompletion();" style="margin-right: 0.3rem;">
+                        <span style="font-size: 0.9rem;">普通答案</span>
+                    </label>
+                    <label style="display: flex; align-items: center; cursor: pointer;">
+                        <input type="radio" name="slot-type-${i}" value="fixed" ${slotType === 'fixed' ? 'checked' : ''} onchange="toggleSlotType('${i}'); updateParsonsPreview(); checkParsonsCompletion();" style="margin-right: 0.3rem;">
+                        <span style="font-size: 0.9rem; color: #667eea;">固定程式碼塊</span>
+                    </label>
+                </div>
+            </div>
+        `;
+        
+        // 根據類型顯示不同的輸入控件
+        if (slotType === 'fixed') {
+            // 固定程式碼塊：顯示程式碼輸入框
+            slotHTML += `
+                <div class="slot-fixed-container" data-slot="${i}">
+                    <label style="display: block; margin-bottom: 0.5rem; color: #666; font-size: 0.9rem;">程式碼內容：</label>
+                    <textarea class="slot-fixed-content" data-slot="${i}" rows="3" placeholder="輸入固定顯示的程式碼..." style="width: 100%; font-family: Consolas, monospace; padding: 0.5rem; border: 1px solid #ddd; border-radius: 4px;" oninput="updateParsonsPreview();">${currentFixedContents[i] || ''}</textarea>
+                </div>
+            `;
+        } else {
+            // 普通答案：顯示下拉選擇
+            slotHTML += `
+                <div class="slot-answer-container" data-slot="${i}">
+                    <label style="display: block; margin-bottom: 0.5rem; color: #666; font-size: 0.9rem;">選擇程式碼塊：</label>
+                    <select class="slot-answer-select" data-slot="${i}" style="width: 100%; padding: 0.5rem; border: 1px solid #ddd; border-radius: 4px; font-family: Consolas, monospace;">
+                <option value="">請選擇正確答案...</option>
+        `;
+        
+        codeBlocks.forEach(block => {
+            const selected = currentSelections[i] === block.label ? 'selected' : '';
+                slotHTML += `<option value="${block.label}" ${selected}>${block.label} - ${block.preview || '(空白)'}</option>`;
+            });
+            
+            slotHTML += '</select></div>';
+        }
+        
+        // 縮排設置（兩種類型都有）
+        slotHTML += `
+            <div style="display: flex; align-items: center; margin-top: 0.8rem;">
+                <label style="min-width: 60px; margin: 0; color: #666; font-size: 0.9rem;">縮排：</label>
+                <input type="number" class="slot-indent-input" data-slot="${i}" min="0" max="10" value="${currentIndents[i] || '0'}" style="width: 80px; padding: 0.5rem; border: 1px solid #ddd; border-radius: 4px;" title="縮排級別（0-10，每個級別約20px）" onchange="updateParsonsPreview();">
+            </div>
+        `;
+        
+        slotDiv.innerHTML = slotHTML;
+        
+        // 為select添加change事件監聽
+        const selectElement = slotDiv.querySelector('.slot-answer-select');
+        if (selectElement) {
+            selectElement.addEventListener('change', function() {
+                updateParsonsPreview();
+                checkParsonsCompletion();
+            });
+        }
+        
+        container.appendChild(slotDiv);
+    }
+    
+    // 初始化预览和完成度检查
+    updateParsonsPreview();
+    checkParsonsCompletion();
+}
+
+// 切換槽位類型
+function toggleSlotType(slotNum) {
+    // 通過縮排輸入框找到對應的配置項
+    const indentInput = document.querySelector(`.slot-indent-input[data-slot="${slotNum}"]`);
+    if (!indentInput) return;
+    
+    const slotDiv = indentInput.closest('.slot-config-item');
+    if (!slotDiv) return;
+    
+    const typeRadio = slotDiv.querySelector(`input[name="slot-type-${slotNum}"]:checked`);
+    if (!typeRadio) return;
+    
+    const selectedType = typeRadio.value;
+    const answerContainer = slotDiv.querySelector('.slot-answer-container');
+    const fixedContainer = slotDiv.querySelector('.slot-fixed-container');
+    
+    if (selectedType === 'fixed') {
+        // 切換到固定程式碼塊
+        if (answerContainer) {
+            answerContainer.style.display = 'none';
+        }
+        if (!fixedContainer) {
+            // 創建固定程式碼塊輸入框
+            const codeBlockInputs = document.querySelectorAll('.code-block-input');
+            const codeBlocks = Array.from(codeBlockInputs).map((input, index) => {
+                return {
+                    label: String.fromCharCode(65 + index),
+                    preview: input.value.substring(0, 30) + (input.value.length > 30 ? '...' : '')
+                };
+            });
+            
+            const indentInput = slotDiv.querySelector('.slot-indent-input');
+            const indentDiv = indentInput.parentElement;
+            
+            const fixedHTML = `
+                <div class="slot-fixed-container" data-slot="${slotNum}" style="margin-top: 0.8rem;">
+                    <label style="display: block; margin-bottom: 0.5rem; color: #666; font-size: 0.9rem;">程式碼內容：</label>
+                    <textarea class="slot-fixed-content" data-slot="${slotNum}" rows="3" placeholder="輸入固定顯示的程式碼..." style="width: 100%; font-family: Consolas, monospace; padding: 0.5rem; border: 1px solid #ddd; border-radius: 4px;" oninput="updateParsonsPreview();"></textarea>
+        </div>
+    `;
+            indentDiv.insertAdjacentHTML('beforebegin', fixedHTML);
+        } else {
+            fixedContainer.style.display = 'block';
+        }
+    } else {
+        // 切換到普通答案
+        if (fixedContainer) {
+            fixedContainer.style.display = 'none';
+        }
+        if (!answerContainer) {
+            // 創建下拉選擇框
+            const codeBlockInputs = document.querySelectorAll('.code-block-input');
+            const codeBlocks = Array.from(codeBlockInputs).map((input, index) => {
+                return {
+                    label: String.fromCharCode(65 + index),
+                    preview: input.value.substring(0, 30) + (input.value.length > 30 ? '...' : '')
+                };
+            });
+            
+            const indentInput = slotDiv.querySelector('.slot-indent-input');
+            const indentDiv = indentInput.parentElement;
+            
+            let selectHTML = `
+                <div class="slot-answer-container" data-slot="${slotNum}" style="margin-top: 0.8rem;">
+                    <label style="display: block; margin-bottom: 0.5rem; color: #666; font-size: 0.9rem;">選擇程式碼塊：</label>
+                    <select class="slot-answer-select" data-slot="${slotNum}" style="width: 100%; padding: 0.5rem; border: 1px solid #ddd; border-radius: 4px; font-family: Consolas, monospace;">
+                        <option value="">請選擇正確答案...</option>
+            `;
+            
+            codeBlocks.forEach(block => {
+                selectHTML += `<option value="${block.label}">${block.label} - ${block.preview || '(空白)'}</option>`;
+            });
+            
+            selectHTML += '</select></div>';
+            indentDiv.insertAdjacentHTML('beforebegin', selectHTML);
+            
+            // 添加事件監聽
+            const selectElement = slotDiv.querySelector('.slot-answer-select');
+            if (selectElement) {
+                selectElement.addEventListener('change', function() {
+                    updateParsonsPreview();
+                    checkParsonsCompletion();
+                });
+            }
+        } else {
+            answerContainer.style.display = 'block';
+        }
+    }
+}
+
+// 注意：addFixedBlock 和 removeFixedBlock 函數已移除
+// 固定程式碼塊現在直接在答案槽位設置中管理
+
+// 實時預覽答案區效果
+function updateParsonsPreview() {
+    const previewContainer = document.getElementById('parsons-preview-container');
+    if (!previewContainer) return;
+    
+    const codeBlockInputs = document.querySelectorAll('.code-block-input');
+    const slotConfigItems = document.querySelectorAll('.slot-config-item');
+    
+    // 收集程式碼塊
+    const codeBlocks = {};
+    Array.from(codeBlockInputs).forEach((input, index) => {
+        const label = String.fromCharCode(65 + index);
+        const content = input.value.trim();
+        if (content) {
+            codeBlocks[label] = content;
+        }
+    });
+    
+    if (Object.keys(codeBlocks).length === 0 || slotConfigItems.length === 0) {
+        previewContainer.innerHTML = '<p style="color: #999; text-align: center; margin: 2rem 0;">請先設定程式碼塊和答案區空格</p>';
+        return;
+    }
+    
+    // 生成預覽HTML
+    let previewHTML = '<div style="display: flex; gap: 1rem; flex-direction: column;">';
+    previewHTML += '<h4 style="margin: 0 0 0.5rem 0; color: #667eea; font-size: 0.9rem;">答題區預覽</h4>';
+    
+    Array.from(slotConfigItems).forEach((item) => {
+        const indentInput = item.querySelector('.slot-indent-input');
+        const slotNum = indentInput ? indentInput.dataset.slot : '';
+        if (!slotNum) return;
+        
+        const indentLevel = indentInput ? (parseInt(indentInput.value) || 0) : 0;
+        const indentPx = indentLevel * 20;
+        
+        // 獲取類型
+        const typeRadio = item.querySelector(`input[name="slot-type-${slotNum}"]:checked`);
+        const slotType = typeRadio ? typeRadio.value : 'answer';
+        
+        previewHTML += '<div style="display: flex; align-items: center; margin-bottom: 0.5rem;">';
+        previewHTML += `<span style="min-width: 60px; color: #666; font-size: 0.85rem;">空格 ${slotNum}：</span>`;
+        previewHTML += `<div style="flex: 1; margin-left: ${indentPx}px; border: 2px dashed #bbb; border-radius: 6px; padding: 0.5rem; background: white; min-height: 40px; display: flex; align-items: center;">`;
+        
+        if (slotType === 'fixed') {
+            const fixedContent = item.querySelector('.slot-fixed-content')?.value.trim() || '';
+            if (fixedContent) {
+                const preview = fixedContent.substring(0, 50) + (fixedContent.length > 50 ? '...' : '');
+                previewHTML += `<span style="font-family: Consolas, monospace; font-size: 0.85rem; color: #2d3748; background: #f0f0f0; padding: 0.3rem 0.6rem; border-radius: 4px;">${preview}</span>`;
+                previewHTML += '<span style="margin-left: 0.5rem; color: #667eea; font-size: 0.75rem;">[固定]</span>';
+            } else {
+                previewHTML += '<span style="color: #999; font-style: italic; font-size: 0.85rem;">未輸入程式碼</span>';
+            }
+        } else {
+            const answerSelect = item.querySelector('.slot-answer-select');
+            const selectedAnswer = answerSelect ? answerSelect.value : '';
+            if (selectedAnswer && codeBlocks[selectedAnswer]) {
+                const preview = codeBlocks[selectedAnswer].substring(0, 50) + (codeBlocks[selectedAnswer].length > 50 ? '...' : '');
+                previewHTML += `<span style="font-family: Consolas, monospace; font-size: 0.85rem; color: #27ae60;">${preview}</span>`;
+                previewHTML += `<span style="margin-left: 0.5rem; color: #27ae60; font-size: 0.75rem; font-weight: bold;">[${selectedAnswer}]</span>`;
+            } else {
+                previewHTML += '<span style="color: #999; font-style: italic; font-size: 0.85rem;">未設定</span>';
+            }
+        }
+        
+        previewHTML += '</div>';
+        previewHTML += '</div>';
+    });
+    
+    previewHTML += '</div>';
+    previewContainer.innerHTML = previewHTML;
+}
+
+// 檢查完成度
+function checkParsonsCompletion() {
+    const statusElement = document.getElementById('parsons-completion-status');
+    if (!statusElement) return;
+    
+    const codeBlockInputs = document.querySelectorAll('.code-block-input');
+    const slotConfigItems = document.querySelectorAll('.slot-config-item');
+    
+    // 計算已設定的答案和固定區塊數量
+    let answeredCount = 0;
+    let fixedCount = 0;
+    const missingSlots = [];
+    
+    Array.from(slotConfigItems).forEach((item) => {
+        const indentInput = item.querySelector('.slot-indent-input');
+        const slotNum = indentInput ? indentInput.dataset.slot : '';
+        if (!slotNum) return;
+        
+        const typeRadio = item.querySelector(`input[name="slot-type-${slotNum}"]:checked`);
+        const slotType = typeRadio ? typeRadio.value : 'answer';
+        
+        if (slotType === 'fixed') {
+            const fixedContent = item.querySelector('.slot-fixed-content')?.value.trim();
+            if (fixedContent) {
+                fixedCount++;
+            } else {
+                missingSlots.push(slotNum);
+            }
+        } else {
+            const answerSelect = item.querySelector('.slot-answer-select');
+            const answer = answerSelect ? answerSelect.value : '';
+            if (answer) {
+                answeredCount++;
+            } else {
+                missingSlots.push(slotNum);
+            }
+        }
+    });
+    
+    const totalSlots = slotConfigItems.length;
+    const codeBlocksCount = Array.from(codeBlockInputs).filter(input => input.value.trim()).length;
+    const completedSlots = answeredCount + fixedCount;
+    
+    // 更新狀態顯示
+    if (codeBlocksCount < 2) {
+        statusElement.textContent = '⚠️ 至少需要2個程式碼塊';
+        statusElement.style.background = '#fff3cd';
+        statusElement.style.color = '#856404';
+    } else if (completedSlots < totalSlots) {
+        statusElement.textContent = `⚠️ 還有 ${totalSlots - completedSlots} 個空格未設定（空格：${missingSlots.join(', ')}）`;
+        statusElement.style.background = '#fff3cd';
+        statusElement.style.color = '#856404';
+    } else {
+        statusElement.textContent = '✓ 所有空格已設定完成';
+        statusElement.style.background = '#d4edda';
+        statusElement.style.color = '#155724';
+    }
+}
+
+// 下拉選單填空題型函數
+function parseBlanks() {
+    const fillblankText = document.getElementById('fillblank-text').value;
+    const container = document.getElementById('blanks-options-container');
+    
+    // 找出所有 {{}} 標記
+    const blanks = fillblankText.match(/\{\{[^}]*\}\}/g) || [];
+    
+    if (blanks.length === 0) {
+        alert('請先在題目文字中使用 {{}} 標記填空位置');
+        return;
+    }
+    
+    container.innerHTML = '';
+    
+    blanks.forEach((blank, index) => {
+        const blankDiv = document.createElement('div');
+        blankDiv.style.cssText = 'border: 1px solid #ddd; border-radius: 6px; padding: 1rem; margin-bottom: 1rem; background: white;';
+        
+        blankDiv.innerHTML = `
+            <h4 style="margin: 0 0 1rem 0; color: #333;">空格 ${index + 1}: ${blank}</h4>
+            <div class="blank-options" data-blank-index="${index}">
+                <div class="blank-option-row" style="display: flex; gap: 0.5rem; margin-bottom: 0.5rem; align-items: center;">
+                    <textarea class="blank-option-input" placeholder="選項內容 (支援多行)" style="flex: 1; min-height: 60px;"></textarea>
+                    <label style="margin: 0; display: flex; align-items: center;">
+                        <input type="radio" name="correct-blank-${index}" style="margin-right: 0.5rem;">
+                        正確答案
+                    </label>
+                    <button type="button" onclick="removeBlankOption(this)" class="btn btn-danger" style="padding: 4px 8px;">刪除</button>
+                </div>
+            </div>
+            <button type="button" onclick="addBlankOption(${index})" class="btn btn-secondary" style="margin-top: 0.5rem;">新增選項</button>
+        `;
+        
+        container.appendChild(blankDiv);
+    });
+}
+
+function addBlankOption(blankIndex) {
+    const container = document.querySelector(`[data-blank-index="${blankIndex}"]`);
+    const optionRow = document.createElement('div');
+    optionRow.className = 'blank-option-row';
+    optionRow.style.cssText = 'display: flex; gap: 0.5rem; margin-bottom: 0.5rem; align-items: center;';
+    optionRow.innerHTML = `
+        <textarea class="blank-option-input" placeholder="選項內容 (支援多行)" style="flex: 1; min-height: 60px;"></textarea>
+        <label style="margin: 0; display: flex; align-items: center;">
+            <input type="radio" name="correct-blank-${blankIndex}" style="margin-right: 0.5rem;">
+            正確答案
+        </label>
+        <button type="button" onclick="removeBlankOption(this)" class="btn btn-danger" style="padding: 4px 8px;">刪除</button>
+    `;
+    container.appendChild(optionRow);
+}
+
+function removeBlankOption(button) {
+    button.parentNode.remove();
+}
+
+// 表單提交
+document.getElementById('question-form').addEventListener('submit', async function(e) {
+    e.preventDefault();
+    
+    const formData = collectFormData();
+    if (!validateFormData(formData)) return;
+    
+    try {
+        const url = currentQuestionId ? 
+            `/api/question/${currentQuestionId}` : 
+            `/api/quiz-bank/${PAGE_DATA.quizBankId}/questions`;
+        const method = currentQuestionId ? 'PUT' : 'POST';
+        
+        const response = await fetch(url, {
+            method: method,
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(formData)
+        });
+        
+        const result = await response.json();
+        
+        if (response.ok) {
+            alert(result.message);
+            hideQuestionModal();
+            if (result.affected_submissions > 0) await offerRegrade(result.affected_submissions);
+            location.reload();
+        } else {
+            alert(result.error || '操作失敗');
+        }
+    } catch (error) {
+        alert('網路錯誤，請稍後再試');
+    }
+});
+
+function collectFormData() {
+    const title = document.getElementById('question-title').value;
+    const text = document.getElementById('question-text').value;
+    const type = document.getElementById('question-type').value;
+    const points = parseInt(document.getElementById('question-points').value);
+    
+    const questionData = {};
+    
+    switch (type) {
+        case 'single_choice':
+        case 'multiple_choice':
+            const optionInputs = document.querySelectorAll('.option-input');
+            const correctInputs = document.querySelectorAll('input[name="correct-option"]:checked');
+            
+            questionData.options = Array.from(optionInputs).map(input => input.value);
+            
+            if (type === 'single_choice') {
+                const correctIndex = Array.from(document.querySelectorAll('input[name="correct-option"]')).findIndex(input => input.checked);
+                questionData.correct_answer = correctIndex >= 0 ? questionData.options[correctIndex] : '';
+            } else {
+                const correctIndices = Array.from(correctInputs).map(input => {
+                    return Array.from(document.querySelectorAll('input[name="correct-option"]')).indexOf(input);
+                });
+                questionData.correct_answers = correctIndices.map(index => questionData.options[index]);
+            }
+            break;
+            
+        case 'fill_blank':
+            questionData.correct_answer = document.getElementById('correct-answer').value;
+            break;
+            
+        case 'dropdown':
+            const dropdownInputs = document.querySelectorAll('.dropdown-option-input');
+            const correctDropdown = document.querySelector('input[name="correct-dropdown"]:checked');
+            
+            questionData.options = Array.from(dropdownInputs).map(input => input.value);
+            
+            if (correctDropdown) {
+                const correctIndex = Array.from(document.querySelectorAll('input[name="correct-dropdown"]')).indexOf(correctDropdown);
+                questionData.correct_answer = questionData.options[correctIndex];
+            }
+            break;
+            
+        case 'dropdown_fillblank':
+            const fillblankText = document.getElementById('fillblank-text').value;
+            questionData.fillblank_text = fillblankText;
+            
+            // 收集每個空格的選項和正確答案
+            const blanksData = [];
+            const blankContainers = document.querySelectorAll('[data-blank-index]');
+            
+            blankContainers.forEach((container, index) => {
+                const blankIndex = container.getAttribute('data-blank-index');
+                const optionInputs = container.querySelectorAll('.blank-option-input');
+                const correctInput = container.querySelector(`input[name="correct-blank-${blankIndex}"]:checked`);
+                
+                const options = Array.from(optionInputs).map(input => input.value.trim()).filter(v => v);
+                let correctAnswer = '';
+                
+                if (correctInput) {
+                    const correctIndex = Array.from(container.querySelectorAll(`input[name="correct-blank-${blankIndex}"]`)).indexOf(correctInput);
+                    correctAnswer = options[correctIndex] || '';
+                }
+                
+                blanksData.push({
+                    options: options,
+                    correct_answer: correctAnswer
+                });
+            });
+            
+            questionData.blanks = blanksData;
+            break;
+            
+        case 'parsons':
+            const codeBlockInputs = document.querySelectorAll('.code-block-input');
+            const slotConfigItems = document.querySelectorAll('.slot-config-item');
+            
+            // 收集所有程式碼塊，使用標籤(A, B, C...)作為key
+            const codeBlocks = {};
+            Array.from(codeBlockInputs).forEach((input, index) => {
+                const label = String.fromCharCode(65 + index);
+                const content = input.value.trim();
+                if (content) {
+                    codeBlocks[label] = content;
+                }
+            });
+            
+            // 收集答案區空格的正確答案、縮排和固定區塊
+            const slotAnswers = {};
+            const slotIndents = {};
+            const fixedBlocks = {};
+            
+            // 遍歷每個槽位配置
+            Array.from(slotConfigItems).forEach((item) => {
+                const slotNumber = item.querySelector('.slot-indent-input')?.dataset.slot;
+                if (!slotNumber) return;
+                
+                // 獲取類型
+                const typeRadio = item.querySelector(`input[name="slot-type-${slotNumber}"]:checked`);
+                const slotType = typeRadio ? typeRadio.value : 'answer';
+                
+                // 獲取縮排
+                const indentInput = item.querySelector('.slot-indent-input');
+                const indentLevel = indentInput ? (parseInt(indentInput.value) || 0) : 0;
+                slotIndents[slotNumber] = indentLevel;
+                
+                if (slotType === 'fixed') {
+                    // 固定程式碼塊
+                    const fixedContent = item.querySelector('.slot-fixed-content')?.value.trim();
+                    if (fixedContent) {
+                        fixedBlocks[slotNumber] = {
+                            content: fixedContent,
+                            display_label: false,
+                            indent: indentLevel
+                        };
+                    }
+                } else {
+                    // 普通答案
+                    const answerSelect = item.querySelector('.slot-answer-select');
+                    const answer = answerSelect ? answerSelect.value : '';
+                    if (answer) {
+                        slotAnswers[slotNumber] = answer;
+                    }
+                }
+            });
+            
+            questionData.code_blocks = codeBlocks; // {A: "code1", B: "code2", C: "code3"}
+            questionData.answer_slots = slotConfigItems.length; // 答案區空格數量
+            questionData.slot_answers = slotAnswers; // {1: "A", 3: "B"} - 不包含固定區塊的位置
+            questionData.slot_indents = slotIndents; // {1: 0, 2: 1, 3: 2} 縮排級別（包含所有槽位）
+            questionData.fixed_blocks = fixedBlocks; // {2: {content: "...", display_label: false, indent: 1}}
+            break;
+    }
+    
+    return {
+        title,
+        question_text: text,
+        question_type: type,
+        points,
+        question_data: questionData
+    };
+}
+
+function validateFormData(data) {
+    if (!data.title || !data.question_text || !data.question_type) {
+        alert('請填寫所有必填欄位');
+        return false;
+    }
+    
+    switch (data.question_type) {
+        case 'single_choice':
+        case 'multiple_choice':
+            if (!data.question_data.options || data.question_data.options.length < 2) {
+                alert('至少需要2個選項');
+                return false;
+            }
+            if (data.question_type === 'single_choice' && !data.question_data.correct_answer) {
+                alert('請選擇正確答案');
+                return false;
+            }
+            if (data.question_type === 'multiple_choice' && (!data.question_data.correct_answers || data.question_data.correct_answers.length === 0)) {
+                alert('請選擇至少一個正確答案');
+                return false;
+            }
+            break;
+            
+        case 'fill_blank':
+            if (!data.question_data.correct_answer) {
+                alert('請輸入正確答案');
+                return false;
+            }
+            break;
+            
+        case 'dropdown':
+            if (!data.question_data.options || data.question_data.options.length < 2) {
+                alert('至少需要2個選項');
+                return false;
+            }
+            if (!data.question_data.correct_answer) {
+                alert('請選擇正確答案');
+                return false;
+            }
+            break;
+            
+        case 'dropdown_fillblank':
+            if (!data.question_data.fillblank_text) {
+                alert('請輸入填空題目文字');
+                return false;
+            }
+            if (!data.question_data.blanks || data.question_data.blanks.length === 0) {
+                alert('請先解析空格並設定選項');
+                return false;
+            }
+            
+            // 檢查每個空格是否都有選項和正確答案
+            for (let i = 0; i < data.question_data.blanks.length; i++) {
+                const blank = data.question_data.blanks[i];
+                if (!blank.options || blank.options.length < 2) {
+                    alert(`空格 ${i + 1} 至少需要2個選項`);
+                    return false;
+                }
+                if (!blank.correct_answer) {
+                    alert(`空格 ${i + 1} 請選擇正確答案`);
+                    return false;
+                }
+            }
+            break;
+            
+        case 'parsons':
+            if (!data.question_data.code_blocks || Object.keys(data.question_data.code_blocks).length < 2) {
+                alert('❌ 至少需要2個程式碼塊才能建立程式碼排序題');
+                return false;
+            }
+            
+            // 檢查是否所有空格都有設定（普通答案或固定程式碼塊）
+            const totalSlots = data.question_data.answer_slots;
+            const answeredSlots = data.question_data.slot_answers || {};
+            const fixedBlocks = data.question_data.fixed_blocks || {};
+            
+            // 找出缺少設定的空格
+            const missingSlots = [];
+            for (let i = 1; i <= totalSlots; i++) {
+                const slotNum = i.toString();
+                if (!answeredSlots[slotNum] && !fixedBlocks[slotNum]) {
+                    missingSlots.push(slotNum);
+                }
+            }
+            
+            if (missingSlots.length > 0) {
+                const missingList = missingSlots.join('、');
+                alert(`❌ 以下空格尚未設定：空格 ${missingList}\n\n請為每個空格選擇「普通答案」或「固定程式碼塊」。`);
+                // 高亮顯示缺少設定的空格
+                setTimeout(() => {
+                    missingSlots.forEach(slotNum => {
+                        const indentInput = document.querySelector(`.slot-indent-input[data-slot="${slotNum}"]`);
+                        if (indentInput) {
+                            const slotItem = indentInput.closest('.slot-config-item');
+                            if (slotItem) {
+                                slotItem.style.borderColor = '#e74c3c';
+                                slotItem.style.borderWidth = '2px';
+                                slotItem.scrollIntoView({ behavior: 'smooth', block: 'center' });
+                                setTimeout(() => {
+                                    slotItem.style.borderColor = '';
+                                    slotItem.style.borderWidth = '';
+                                }, 3000);
+                            }
+                        }
+                    });
+                }, 100);
+                return false;
+            }
+            
+            // 檢查固定程式碼塊是否有內容
+            const emptyFixedBlocks = [];
+            Object.keys(fixedBlocks).forEach(slotNum => {
+                const fixed = fixedBlocks[slotNum];
+                if (!fixed.content || !fixed.content.trim()) {
+                    emptyFixedBlocks.push(slotNum);
+                }
+            });
+            
+            if (emptyFixedBlocks.length > 0) {
+                alert(`❌ 以下固定程式碼塊未輸入內容：空格 ${emptyFixedBlocks.join('、')}\n\n請輸入固定程式碼塊的內容。`);
+                return false;
+            }
+            
+            break;
+    }
+    
+    return true;
+}
+
+async function editQuestion(questionId) {
+    currentQuestionId = questionId;
+    document.getElementById('modal-title').textContent = '編輯題目';
+    
+    try {
+        // 從API獲取題目數據
+        const response = await fetch(`/api/quiz-bank/${PAGE_DATA.quizBankId}/questions`);
+        const questions = await response.json();
+        
+        // 找到要編輯的題目
+        const question = questions.find(q => q.id === questionId);
+        if (!question) {
+            alert('找不到題目數據');
+            return;
+        }
+        
+        // 填充基本信息
+        document.getElementById('question-title').value = question.title;
+        document.getElementById('question-text').value = question.question_text;
+        document.getElementById('question-type').value = question.question_type;
+        document.getElementById('question-points').value = question.points;
+        
+        // 觸發類型變更事件以生成對應的表單
+        handleQuestionTypeChange();
+        
+        // 根據題目類型填充特定內容
+        if (question.question_data) {
+            const data = question.question_data;
+            
+            switch (question.question_type) {
+                case 'single_choice':
+                case 'multiple_choice':
+                    // 清空現有選項
+                    document.getElementById('options-container').innerHTML = '';
+                    
+                    // 添加選項
+                    if (data.options && data.options.length > 0) {
+                        data.options.forEach(option => {
+                            const optionRow = document.createElement('div');
+                            optionRow.className = 'option-row';
+                            optionRow.style.cssText = 'display: flex; gap: 0.5rem; margin-bottom: 0.5rem;';
+                            
+                            const isCorrect = question.question_type === 'single_choice' 
+                                ? option === data.correct_answer
+                                : (data.correct_answers && data.correct_answers.includes(option));
+                            
+                            optionRow.innerHTML = `
+                                <textarea class="option-input" placeholder="選項內容 (支援多行)" style="flex: 1; min-height: 60px;">${option}</textarea>
+                                <label style="margin: 0; display: flex; align-items: center;">
+                                    <input type="${question.question_type === 'single_choice' ? 'radio' : 'checkbox'}" 
+                                           name="correct-option" style="margin-right: 0.5rem;" ${isCorrect ? 'checked' : ''}>
+                                    正確
+                                </label>
+                                <button type="button" onclick="removeOption(this)" class="btn btn-danger" style="padding: 4px 8px;">刪除</button>
+                            `;
+                            
+                            document.getElementById('options-container').appendChild(optionRow);
+                        });
+                    }
+                    break;
+                    
+                case 'fill_blank':
+                    if (data.correct_answer) {
+                        document.getElementById('correct-answer').value = data.correct_answer;
+                    }
+                    break;
+                    
+                case 'dropdown':
+                    // 清空現有選項
+                    document.getElementById('dropdown-options-container').innerHTML = '';
+                    
+                    // 添加選項
+                    if (data.options && data.options.length > 0) {
+                        data.options.forEach(option => {
+                            const optionRow = document.createElement('div');
+                            optionRow.className = 'dropdown-option-row';
+                            optionRow.style.cssText = 'display: flex; gap: 0.5rem; margin-bottom: 0.5rem;';
+                            
+                            const isCorrect = option === data.correct_answer;
+                            
+                            optionRow.innerHTML = `
+                                <textarea class="dropdown-option-input" placeholder="選項內容 (支援多行)" style="flex: 1; min-height: 60px;">${option}</textarea>
+                                <label style="margin: 0; display: flex; align-items: center;">
+                                    <input type="radio" name="correct-dropdown" style="margin-right: 0.5rem;" ${isCorrect ? 'checked' : ''}>
+                                    正確
+                                </label>
+                                <button type="button" onclick="removeDropdownOption(this)" class="btn btn-danger" style="padding: 4px 8px;">刪除</button>
+                            `;
+                            
+                            document.getElementById('dropdown-options-container').appendChild(optionRow);
+                        });
+                    }
+                    break;
+                    
+                case 'dropdown_fillblank':
+                    // 填充題目文字
+                    if (data.fillblank_text) {
+                        document.getElementById('fillblank-text').value = data.fillblank_text;
+                    }
+                    
+                    // 解析空格
+                    parseBlanks();
+                    
+                    // 填充空格選項
+                    if (data.blanks && data.blanks.length > 0) {
+                        setTimeout(() => {
+                            data.blanks.forEach((blank, index) => {
+                                const blankContainer = document.querySelector(`[data-blank-index="${index}"]`);
+                                if (!blankContainer) return;
+                                
+                                // 清空現有選項
+                                blankContainer.innerHTML = '';
+                                
+                                // 添加選項
+                                if (blank.options && blank.options.length > 0) {
+                                    blank.options.forEach(option => {
+                                        const optionRow = document.createElement('div');
+                                        optionRow.className = 'blank-option-row';
+                                        optionRow.style.cssText = 'display: flex; gap: 0.5rem; margin-bottom: 0.5rem; align-items: center;';
+                                        
+                                        const isCorrect = option === blank.correct_answer;
+                                        
+                                        optionRow.innerHTML = `
+                                            <textarea class="blank-option-input" placeholder="選項內容 (支援多行)" style="flex: 1; min-height: 60px;">${option}</textarea>
+                                            <label style="margin: 0; display: flex; align-items: center;">
+                                                <input type="radio" name="correct-blank-${index}" style="margin-right: 0.5rem;" ${isCorrect ? 'checked' : ''}>
+                                                正確答案
+                                            </label>
+                                            <button type="button" onclick="removeBlankOption(this)" class="btn btn-danger" style="padding: 4px 8px;">刪除</button>
+                                        `;
+                                        
+                                        blankContainer.appendChild(optionRow);
+                                    });
+                                }
+                            });
+                        }, 100); // 延遲一下以確保空格容器已經生成
+                    }
+                    break;
+                    
+                case 'parsons':
+                    // 清空現有程式碼塊
+                    const codeBlocksContainer = document.getElementById('code-blocks-container');
+                    codeBlocksContainer.innerHTML = '';
+                    
+                    let codeBlocks = data.code_blocks || {};
+                    let answerSlots = data.answer_slots || Object.keys(data.code_blocks).length;
+                    let slotAnswers = data.slot_answers || {};
+                    let slotIndents = data.slot_indents || {};
+                    let fixedBlocks = data.fixed_blocks || {};
+                    
+                    // 添加程式碼塊
+                    const labels = Object.keys(codeBlocks).sort();
+                    labels.forEach((label, index) => {
+                        const blockRow = document.createElement('div');
+                        blockRow.className = 'code-block-row';
+                        blockRow.style.cssText = 'display: flex; gap: 0.5rem; margin-bottom: 0.5rem; align-items: center;';
+                        blockRow.innerHTML = `
+                            <span style="min-width: 30px; color: #667eea; font-weight: bold;">${label}</span>
+                            <textarea class="code-block-input" placeholder="程式碼塊內容 (支援多行)" style="flex: 1; min-height: 60px; font-family: Consolas, monospace;" oninput="updateAnswerSlots(); updateParsonsPreview();">${codeBlocks[label]}</textarea>
+                            <button type="button" onclick="removeCodeBlock(this)" class="btn btn-danger" style="padding: 4px 8px;">刪除</button>
+                        `;
+                        codeBlocksContainer.appendChild(blockRow);
+                    });
+                    
+                    // 設定答案區空格數量
+                    document.getElementById('answer-slots-count').value = answerSlots;
+                    
+                    // 更新答案區空格（會自動使用slotAnswers填充）
+                    setTimeout(() => {
+                        updateAnswerSlots();
+                        
+                        // 設定每個空格的類型和內容
+                        setTimeout(() => {
+                            // 先設定固定區塊
+                            Object.keys(fixedBlocks).forEach(slotNum => {
+                                const fixed = fixedBlocks[slotNum];
+                                const typeRadio = document.querySelector(`input[name="slot-type-${slotNum}"][value="fixed"]`);
+                                if (typeRadio) {
+                                    typeRadio.checked = true;
+                                    toggleSlotType(slotNum);
+                                    
+                                    // 設定固定程式碼內容
+                                    setTimeout(() => {
+                                        const fixedContent = document.querySelector(`.slot-fixed-content[data-slot="${slotNum}"]`);
+                                        if (fixedContent) {
+                                            fixedContent.value = fixed.content || '';
+                                        }
+                                        
+                                        // 設定縮排
+                                        const indentInput = document.querySelector(`.slot-indent-input[data-slot="${slotNum}"]`);
+                                        if (indentInput && fixed.indent !== undefined) {
+                                            indentInput.value = fixed.indent;
+                                        }
+                                        
+                                        updateParsonsPreview();
+                                        checkParsonsCompletion();
+                                    }, 50);
+                                }
+                            });
+                            
+                            // 設定普通答案
+                        Object.keys(slotAnswers).forEach(slotNum => {
+                                // 確保類型是普通答案
+                                const typeRadio = document.querySelector(`input[name="slot-type-${slotNum}"][value="answer"]`);
+                                if (typeRadio) {
+                                    typeRadio.checked = true;
+                                    toggleSlotType(slotNum);
+                                    
+                                    setTimeout(() => {
+                            const select = document.querySelector(`.slot-answer-select[data-slot="${slotNum}"]`);
+                            if (select) {
+                                select.value = slotAnswers[slotNum];
+                            }
+                                        
+                                        // 設定縮排
+                                        const indentInput = document.querySelector(`.slot-indent-input[data-slot="${slotNum}"]`);
+                                        if (indentInput && slotIndents[slotNum] !== undefined) {
+                                            indentInput.value = slotIndents[slotNum];
+                                        }
+                                        
+                                        updateParsonsPreview();
+                                        checkParsonsCompletion();
+                                    }, 50);
+                                }
+                            });
+                            
+                            // 設定其他空格的縮排（如果沒有設定答案或固定區塊）
+                            Object.keys(slotIndents).forEach(slotNum => {
+                                if (!fixedBlocks[slotNum] && !slotAnswers[slotNum]) {
+                                    const indentInput = document.querySelector(`.slot-indent-input[data-slot="${slotNum}"]`);
+                                    if (indentInput) {
+                                        indentInput.value = slotIndents[slotNum];
+                                    }
+                                }
+                            });
+                            
+                            updateParsonsPreview();
+                            checkParsonsCompletion();
+                        }, 100);
+                    }, 100);
+                    
+                    break;
+            }
+        }
+        
+        // 顯示模態框
+        document.getElementById('question-modal').style.display = 'block';
+        
+    } catch (error) {
+        console.error('獲取題目數據失敗', error);
+        alert('獲取題目數據失敗，請稍後再試');
+    }
+}
+
+async function deleteQuestion(questionId) {
+    if (!confirm('確定要刪除這個題目嗎？')) return;
+    
+    try {
+        const response = await fetch(`/api/question/${questionId}`, {
+            method: 'DELETE'
+        });
+        
+        const result = await response.json();
+        
+        if (response.ok) {
+            alert(result.message);
+            if (result.affected_submissions > 0) await offerRegrade(result.affected_submissions);
+            location.reload();
+        } else {
+            alert(result.error || '刪除失敗');
+        }
+    } catch (error) {
+        alert('網路錯誤，請稍後再試');
+    }
+}
+
+// 重新評分：題目答案或配分變更後，先預覽分數變化，確認後寫回
+async function runRegradeJob(dryRun) {
+    const response = await fetch(`/api/quiz-bank/${PAGE_DATA.quizBankId}/regrade`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ dry_run: dryRun })
+    });
+    let job = await response.json();
+    if (!response.ok) throw new Error(job.error || '重新評分失敗');
+    
+    while (job.status === 'pending' || job.status === 'running') {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const poll = await fetch(`/api/quiz-bank/${PAGE_DATA.quizBankId}/regrade/${job.id}`);
+        job = await poll.json();
+        if (!poll.ok) throw new Error(job.error || '重新評分失敗');
+        console.log(`重新評分進度：${job.processed}/${job.total}`);
+    }
+    if (job.status === 'failed') throw new Error(job.error || '重新評分失敗');
+    return job;
+}
+
+async function offerRegrade(affectedSubmissions) {
+    if (!confirm(`此題庫已有 ${affectedSubmissions} 份作答，分數依修改前的答案計算。\n是否預覽依新答案重新評分後的分數變化？`)) return;
+    
+    try {
+        const preview = await runRegradeJob(true);
+        const report = preview.report;
+        if (report.changed === 0) {
+            alert('重新評分後沒有作答的分數改變');
+            return;
+        }
+        const samples = report.samples.slice(0, 10).map(s =>
+            `作答 #${s.submission_id}：${s.old_score}/${s.old_total_points} → ${s.score}/${s.total_points}`
+        ).join('\n');
+        if (!confirm(`${report.changed} 份作答的分數會改變（提高 ${report.increased} 份、降低 ${report.decreased} 份）\n\n${samples}\n\n確定要更新這些分數嗎？`)) return;
+        
+        const job = await runRegradeJob(false);
+        alert(`重新評分完成，已更新 ${job.changed} 份作答的分數`);
+    } catch (error) {
+        alert(`${error.message || '重新評分失敗'}，可稍後再試`);
+    }
+}
+
+async function importQuestions(input) {
+    const file = input.files[0];
+    input.value = '';
+    if (!file) return;
+    
+    const format = file.name.toLowerCase().endsWith('.csv') ? 'csv' : 'jsonl';
+    try {
+        const response = await fetch(`/api/quiz-bank/${PAGE_DATA.quizBankId}/questions/import?format=${format}`, {
+            method: 'POST',
+            headers: { 'Content-Type': format === 'csv' ? 'text/csv' : 'application/x-ndjson' },
+            body: file
+        });
+        
+        const result = await response.json();
+        
+        if (response.ok) {
+            let message = `${result.message}：新增 ${result.imported} 題`;
+            if (result.error_count > 0) {
+                message += `，${result.error_count} 筆有錯誤已略過\n\n` +
+                    result.errors.slice(0, 10).map(e => `第 ${e.line} 行：${e.errors.join('、')}`).join('\n');
+            }
+            alert(message);
+            if (result.imported > 0) location.reload();
+        } else {
+            alert(result.error || '匯入失敗');
+        }
+    } catch (error) {
+        alert('網路錯誤，請稍後再試');
+    }
+}
+
+function exportQuestions() {
+    window.location.href = `/api/quiz-bank/${PAGE_DATA.quizBankId}/questions/export?format=jsonl`;
+}
+
+// 重新渲染 MathJax，當頁面載入時
+document.addEventListener('DOMContentLoaded', function() {
+    if (typeof MathJax !== 'undefined') {
+        MathJax.typesetPromise().catch((err) => console.log('MathJax typeset error:', err));
+    }
+});
+
@@ -0,0 +1,6 @@
+// 頁面載入時渲染 MathJax
+document.addEventListener('DOMContentLoaded', function() {
+    if (typeof MathJax !== 'undefined') {
+        MathJax.typesetPromise().catch((err) => console.log('MathJax typeset error:', err));
+    }
+});
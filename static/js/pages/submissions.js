@@ -0,0 +1,353 @@
+// 頁面資料由模板以 JSON 寫入 #page-data
+const PAGE_DATA = JSON.parse(document.getElementById('page-data').textContent);
+
+const SUBMISSIONS_URL = `/api/quiz-bank/${PAGE_DATA.quizBankId}/submissions`;
+const PAGE_SIZE = 50;
+let submissionsData = [];
+let nextCursor = null;
+let totalSubmissions = 0;
+let pendingNewSubmissions = 0;
+let statisticsTimer = null;
+
+// 目前的排序與篩選條件
+function currentQuery() {
+    const [sort, order] = document.getElementById('sort-select').value.split(':');
+    const params = new URLSearchParams({ sort: sort, order: order, limit: PAGE_SIZE });
+    const name = document.getElementById('filter-name').value.trim();
+    const email = document.getElementById('filter-email').value.trim();
+    if (name) params.set('name', name);
+    if (email) params.set('email', email);
+    return params;
+}
+
+async function fetchSubmissionsPage(params, cursor) {
+    if (cursor) params.set('cursor', cursor);
+    const response = await fetch(`${SUBMISSIONS_URL}?${params.toString()}`);
+    if (!response.ok) {
+        throw new Error('載入失敗');
+    }
+    return response.json();
+}
+
+// 載入成績資料（第一頁）
+async function loadSubmissions() {
+    try {
+        const page = await fetchSubmissionsPage(currentQuery());
+        submissionsData = page.submissions;
+        nextCursor = page.next_cursor;
+        totalSubmissions = page.total;
+        pendingNewSubmissions = 0;
+        document.getElementById('new-submissions-notice').style.display = 'none';
+        displaySubmissions(page);
+        loadStatistics();
+    } catch (error) {
+        document.getElementById('submissions-container').style.display = 'block';
+        document.getElementById('submissions-container').innerHTML = `
+            <div style="text-align: center; padding: 2rem; color: #e74c3c;">
+                <h3>載入失敗</h3>
+                <p>無法載入成績資料，請稍後再試</p>
+                <button onclick="loadSubmissions()" class="btn">重新載入</button>
+            </div>
+        `;
+    }
+}
+
+async function loadMoreSubmissions() {
+    if (!nextCursor) return;
+    try {
+        const page = await fetchSubmissionsPage(currentQuery(), nextCursor);
+        submissionsData = submissionsData.concat(page.submissions);
+        nextCursor = page.next_cursor;
+        appendSubmissionRows(page.submissions);
+        updateLoadMore();
+    } catch (error) {
+        alert('載入失敗，請稍後再試');
+    }
+}
+
+function applyFilters() {
+    loadSubmissions();
+}
+
+function displaySubmissions(page) {
+    document.getElementById('submissions-container').style.display = 'none';
+    
+    if (page.total === 0 && !currentQuery().has('name') && !currentQuery().has('email')) {
+        document.getElementById('statistics-summary').style.display = 'none';
+        document.getElementById('submissions-table').style.display = 'none';
+        document.getElementById('no-submissions').style.display = 'block';
+        return;
+    }
+    document.getElementById('no-submissions').style.display = 'none';
+    
+    // 顯示成績表格
+    document.getElementById('filtered-count').textContent = `（共 ${page.total} 筆）`;
+    document.getElementById('submissions-tbody').innerHTML = '';
+    appendSubmissionRows(page.submissions);
+    updateLoadMore();
+    document.getElementById('submissions-table').style.display = 'block';
+}
+
+// 統計摘要由伺服器端彙總計算
+async function loadStatistics() {
+    try {
+        const response = await fetch(`/api/quiz-bank/${PAGE_DATA.quizBankId}/stats?pass_threshold=60`);
+        if (response.ok) {
+            displayStatistics(await response.json());
+        }
+    } catch (error) {
+        console.log('載入統計資料失敗:', error);
+    }
+}
+
+function displayStatistics(stats) {
+    if (stats.count === 0) {
+        document.getElementById('statistics-summary').style.display = 'none';
+        return;
+    }
+    document.getElementById('total-submissions').textContent = stats.count;
+    document.getElementById('average-score').textContent = stats.average_percentage.toFixed(1) + '%';
+    document.getElementById('highest-score').textContent = stats.highest_percentage.toFixed(1) + '%';
+    document.getElementById('pass-rate').textContent = stats.pass_rate.toFixed(1) + '%';
+    
+    document.getElementById('statistics-summary').style.display = 'block';
+}
+
+function updateLoadMore() {
+    document.getElementById('load-more').style.display = nextCursor ? 'block' : 'none';
+}
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text == null ? '' : String(text);
+    return div.innerHTML;
+}
+
+function appendSubmissionRows(submissions) {
+    const tbody = document.getElementById('submissions-tbody');
+    submissions.forEach((submission) => {
+        tbody.appendChild(buildSubmissionRow(submission));
+    });
+}
+
+function buildSubmissionRow(submission) {
+    const row = document.createElement('tr');
+    row.style.borderBottom = '1px solid #e9ecef';
+    row.dataset.submissionId = submission.id;
+    const rank = submission.rank;
+    
+    // 設定排名顏色
+    let rankColor = '#666';
+    if (rank === 1) rankColor = '#f39c12'; // 金色
+    else if (rank === 2) rankColor = '#95a5a6'; // 銀色
+    else if (rank === 3) rankColor = '#e67e22'; // 銅色
+    
+    // 設定分數顏色
+    let scoreColor = '#e74c3c';
+    if (submission.percentage >= 80) scoreColor = '#27ae60';
+    else if (submission.percentage >= 60) scoreColor = '#f39c12';
+    
+    row.innerHTML = `
+        <td style="padding: 1rem; color: ${rankColor}; font-weight: bold;">
+            ${rank === null ? '-' : rank}
+            ${rank === 1 ? '🥇' : rank === 2 ? '🥈' : rank === 3 ? '🥉' : ''}
+        </td>
+        <td style="padding: 1rem; font-weight: bold;">
+            ${escapeHtml(submission.student_name)}
+        </td>
+        <td style="padding: 1rem; color: #666;">
+            ${escapeHtml(submission.student_email || '-')}
+        </td>
+        <td style="padding: 1rem; text-align: center;">
+            ${submission.score} / ${submission.total_points}
+        </td>
+        <td style="padding: 1rem; text-align: center; font-weight: bold; color: ${scoreColor};">
+            ${submission.percentage.toFixed(1)}%
+        </td>
+        <td style="padding: 1rem; color: #666;">
+            ${submission.submitted_at}
+        </td>
+        <td style="padding: 1rem; text-align: center;">
+            <div style="display: flex; gap: 0.5rem; justify-content: center;">
+                <a href="/result/${submission.id}" target="_blank" class="btn btn-secondary" style="padding: 6px 12px; font-size: 0.9rem;">
+                    查看詳情
+                </a>
+                <button class="btn btn-danger delete-submission" style="padding: 6px 12px; font-size: 0.9rem;">
+                    🗑️ 刪除
+                </button>
+            </div>
+        </td>
+    `;
+    row.querySelector('.delete-submission').addEventListener('click', () => {
+        deleteSubmission(submission.id, submission.student_name);
+    });
+    
+    return row;
+}
+
+// 即時推播：新作答與刪除以事件送達，不需重新載入整個列表
+function connectSubmissionEvents() {
+    if (!PAGE_DATA.liveUpdates || !window.EventSource) {
+        startSubmissionPolling();
+        return;
+    }
+    const source = new EventSource(`/api/quiz-bank/${PAGE_DATA.quizBankId}/events`);
+    source.addEventListener('submission', (e) => handleNewSubmission(JSON.parse(e.data)));
+    source.addEventListener('deletion', (e) => handleDeletedSubmission(JSON.parse(e.data)));
+    source.addEventListener('reset', () => loadSubmissions());
+    source.onerror = () => {
+        // 伺服器拒絕連線（例如連線數已滿）時瀏覽器不會自動重連，稍後再試
+        if (source.readyState === EventSource.CLOSED) {
+            setTimeout(connectSubmissionEvents, 30000);
+        }
+    };
+}
+
+// 伺服器未開啟即時推播時（例如同步 worker），每 30 秒檢查最新一筆作答
+const POLL_INTERVAL = 30000;
+let latestSubmissionId = null;
+
+function startSubmissionPolling() {
+    pollLatestSubmission();
+    setInterval(pollLatestSubmission, POLL_INTERVAL);
+}
+
+async function pollLatestSubmission() {
+    if (document.hidden) return;
+    try {
+        const params = new URLSearchParams({ sort: 'time', order: 'desc', limit: 1 });
+        const page = await fetchSubmissionsPage(params);
+        const latest = page.submissions.length ? page.submissions[0].id : 0;
+        if (latestSubmissionId !== null && latest > latestSubmissionId) {
+            const query = currentQuery();
+            if (query.get('sort') === 'time' && query.get('order') === 'desc' && !query.has('name') && !query.has('email')) {
+                loadSubmissions();
+            } else {
+                const notice = document.getElementById('new-submissions-notice');
+                notice.textContent = '有新作答，點此重新載入';
+                notice.style.display = 'block';
+            }
+        }
+        latestSubmissionId = latest;
+    } catch (error) {
+        // 下一次輪詢再試
+    }
+}
+
+function updateStatistics(stats) {
+    if (stats) {
+        displayStatistics(stats);
+        return;
+    }
+    // 伺服器端沒有快取的統計時，合併短時間內的多個事件後再查詢一次
+    clearTimeout(statisticsTimer);
+    statisticsTimer = setTimeout(loadStatistics, 2000);
+}
+
+function handleNewSubmission(data) {
+    const submission = data.submission;
+    if (submissionsData.some(s => s.id === submission.id)) return;
+    if (totalSubmissions === 0) {
+        loadSubmissions();
+        return;
+    }
+    
+    const query = currentQuery();
+    if (query.get('sort') === 'time' && query.get('order') === 'desc' && !query.has('name') && !query.has('email')) {
+        // 依時間由新到舊排序時直接加在最上方
+        submissionsData.unshift(submission);
+        totalSubmissions += 1;
+        const tbody = document.getElementById('submissions-tbody');
+        tbody.insertBefore(buildSubmissionRow(submission), tbody.firstChild);
+        document.getElementById('filtered-count').textContent = `（共 ${totalSubmissions} 筆）`;
+    } else {
+        pendingNewSubmissions += 1;
+        const notice = document.getElementById('new-submissions-notice');
+        notice.textContent = `有 ${pendingNewSubmissions} 筆新作答，點此重新載入`;
+        notice.style.display = 'block';
+    }
+    updateStatistics(data.stats);
+}
+
+function handleDeletedSubmission(data) {
+    const row = document.querySelector(`#submissions-tbody tr[data-submission-id="${data.submission_id}"]`);
+    if (row) {
+        row.remove();
+        submissionsData = submissionsData.filter(s => s.id !== data.submission_id);
+        totalSubmissions = Math.max(totalSubmissions - 1, 0);
+        document.getElementById('filtered-count').textContent = `（共 ${totalSubmissions} 筆）`;
+    }
+    updateStatistics(data.stats);
+}
+
+// 由伺服器串流產生匯出檔（含每題作答與對錯）
+function exportSubmissions(format) {
+    window.location.href = `/api/quiz-bank/${PAGE_DATA.quizBankId}/export?format=${format}`;
+}
+
+function copyQuizLink(accessCode) {
+    const link = window.location.origin + '/quiz/' + accessCode;
+    
+    if (navigator.clipboard) {
+        navigator.clipboard.writeText(link).then(() => {
+            alert('題庫連結已複製到剪貼簿！\n' + link);
+        }).catch(() => {
+            fallbackCopyTextToClipboard(link);
+        });
+    } else {
+        fallbackCopyTextToClipboard(link);
+    }
+}
+
+function fallbackCopyTextToClipboard(text) {
+    const textArea = document.createElement("textarea");
+    textArea.value = text;
+    textArea.style.position = "fixed";
+    textArea.style.left = "-999999px";
+    textArea.style.top = "-999999px";
+    document.body.appendChild(textArea);
+    textArea.focus();
+    textArea.select();
+    
+    try {
+        document.execCommand('copy');
+        alert('題庫連結已複製到剪貼簿！\n' + text);
+    } catch (err) {
+        alert('無法複製連結，請手動複製：\n' + text);
+    }
+    
+    document.body.removeChild(textArea);
+}
+
+async function deleteSubmission(submissionId, studentName) {
+    if (!confirm(`確定要刪除 ${studentName} 的成績嗎？\n\n⚠️ 此操作無法復原！`)) {
+        return;
+    }
+    
+    try {
+        const response = await fetch(`/api/submission/${submissionId}`, {
+            method: 'DELETE',
+            headers: {
+                'Content-Type': 'application/json',
+            }
+        });
+        
+        const result = await response.json();
+        
+        if (response.ok) {
+            alert(result.message);
+            // 其他開啟中的成績頁由 deletion 事件更新
+            handleDeletedSubmission({ submission_id: submissionId, stats: null });
+        } else {
+            alert(result.error || '刪除失敗，請稍後再試');
+        }
+    } catch (error) {
+        alert('網路錯誤，請檢查連線');
+    }
+}
+
+// 頁面載入時載入資料
+document.addEventListener('DOMContentLoaded', () => {
+    loadSubmissions();
+    connectSubmissionEvents();
+});
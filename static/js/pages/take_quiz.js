@@ -0,0 +1,690 @@
+// 頁面資料由模板以 JSON 寫入 #page-data
+const PAGE_DATA = JSON.parse(document.getElementById('page-data').textContent);
+
+let currentQuestionIndex = 0;
+let totalQuestions = PAGE_DATA.questions.length;
+let studentAnswers = {};
+let quizStarted = false;
+
+// 作答進度保存在本機，重新整理或斷線後可還原
+const quizStorage = new QuizStorage(PAGE_DATA.accessCode);
+const submitUrl = `/api/quiz/${PAGE_DATA.accessCode}/submit`;
+let retryDelay = 2000;
+
+// 伺服器端草稿：每 15 秒只送出上次儲存後有變動的題目
+const draftsUrl = `/api/quiz/${PAGE_DATA.accessCode}/drafts`;
+const DRAFT_SYNC_INTERVAL = 15000;
+let draftId = null;
+let draftSynced = {};
+let draftSyncTimer = null;
+
+// 確保 studentAnswers 在全域範圍內可存取
+window.studentAnswers = studentAnswers;
+
+// 儲存題目資料供 JavaScript 使用
+window.questionsData = PAGE_DATA.questions;
+
+function startQuiz() {
+    const studentName = document.getElementById('student-name').value.trim();
+    if (!studentName) {
+        alert('請輸入您的姓名');
+        return;
+    }
+    
+    quizStarted = true;
+    document.getElementById('student-info-section').style.display = 'none';
+    document.getElementById('quiz-progress').style.display = 'block';
+    document.getElementById('quiz-questions').style.display = 'block';
+    
+    showQuestion(0);
+    startDraftSync();
+}
+
+function showQuestion(index) {
+    // 隱藏所有題目
+    const questions = document.querySelectorAll('.question-card');
+    questions.forEach(q => q.style.display = 'none');
+    
+    // 顯示當前題目
+    if (questions[index]) {
+        questions[index].style.display = 'block';
+        currentQuestionIndex = index;
+        
+        // 更新進度
+        document.getElementById('current-question').textContent = index + 1;
+        const progress = ((index + 1) / totalQuestions) * 100;
+        document.getElementById('progress-bar').style.width = progress + '%';
+        
+        // 初始化 Parsons Puzzle
+        initializeParsons(questions[index]);
+        
+        // 初始化下拉選單填空題
+        initializeDropdownFillblank(questions[index]);
+        
+        // 還原動態產生的作答元件（下拉選單填空、程式碼排序）
+        restoreDynamicAnswer(questions[index]);
+        autosave();
+        
+        // 重新渲染 MathJax
+        if (typeof MathJax !== 'undefined') {
+            MathJax.typesetPromise([questions[index]]).catch((err) => console.log('MathJax typeset error:', err));
+        }
+    }
+}
+
+function nextQuestion() {
+    if (currentQuestionIndex < totalQuestions - 1) {
+        showQuestion(currentQuestionIndex + 1);
+    }
+}
+
+function previousQuestion() {
+    if (currentQuestionIndex > 0) {
+        showQuestion(currentQuestionIndex - 1);
+    }
+}
+
+function selectSingleOption(element, questionId) {
+    // 從 data 屬性讀取選項值
+    const value = element.getAttribute('data-option-value');
+    
+    // 清除同組其他選項的選中狀態
+    const container = element.parentNode;
+    container.querySelectorAll('.option').forEach(opt => {
+        opt.classList.remove('selected');
+        opt.querySelector('input').checked = false;
+    });
+    
+    // 設定當前選項為選中
+    element.classList.add('selected');
+    element.querySelector('input').checked = true;
+    
+    // 確保 studentAnswers 對象存在
+    if (typeof studentAnswers === 'undefined') {
+        window.studentAnswers = {};
+    }
+    
+    // 儲存答案
+    studentAnswers[questionId] = value;
+    autosave();
+}
+
+function toggleMultipleOption(element, questionId) {
+    // 從 data 屬性讀取選項值
+    const value = element.getAttribute('data-option-value');
+    const checkbox = element.querySelector('input');
+    const isChecked = !checkbox.checked;
+    
+    checkbox.checked = isChecked;
+    element.classList.toggle('selected', isChecked);
+    
+    // 確保 studentAnswers 對象存在
+    if (typeof studentAnswers === 'undefined') {
+        window.studentAnswers = {};
+    }
+    
+    // 儲存答案
+    if (!studentAnswers[questionId]) {
+        studentAnswers[questionId] = [];
+    }
+    
+    if (isChecked) {
+        if (!studentAnswers[questionId].includes(value)) {
+            studentAnswers[questionId].push(value);
+        }
+    } else {
+        studentAnswers[questionId] = studentAnswers[questionId].filter(v => v !== value);
+    }
+    
+    autosave();
+}
+
+// Parsons Puzzle 拖拉功能
+function initializeParsons(questionElement) {
+    const parsonsContainer = questionElement.querySelector('.parsons-container');
+    if (!parsonsContainer) return;
+    
+    const questionId = questionElement.dataset.questionId;
+    const codeBlocks = parsonsContainer.querySelectorAll('.code-block');
+    const answerSlots = parsonsContainer.querySelectorAll('.answer-slot');
+    
+    // 初始化程式碼塊的拖拉功能
+    codeBlocks.forEach(block => {
+        block.addEventListener('dragstart', handleDragStart);
+        block.addEventListener('dragend', handleDragEnd);
+    });
+    
+    // 初始化答案區塊的拖放功能
+    answerSlots.forEach(slot => {
+        slot.addEventListener('dragover', handleSlotDragOver);
+        slot.addEventListener('drop', e => handleSlotDrop(e, questionId));
+        slot.addEventListener('dragenter', handleSlotDragEnter);
+        slot.addEventListener('dragleave', handleSlotDragLeave);
+        
+        // 為已經放置的程式碼塊添加移除功能
+        const existingBlock = slot.querySelector('.code-block');
+        if (existingBlock && !existingBlock.querySelector('button')) {
+            addRemoveButton(existingBlock, slot, questionId);
+        }
+    });
+    
+    // 打亂左側程式碼塊順序
+    shuffleCodeBlocks(questionId);
+}
+
+// 初始化下拉選單填空題
+function initializeDropdownFillblank(questionElement) {
+    const container = questionElement.querySelector('.dropdown-fillblank-container');
+    if (!container) return;
+    
+    const questionId = container.dataset.questionId;
+    const fillblankTextElement = container.querySelector('.fillblank-text');
+    
+    if (!fillblankTextElement) return;
+    
+    // 獲取題目資料
+    const questionData = window.questionsData.find(q => q.id == questionId);
+    if (!questionData || !questionData.blanks) return;
+    
+    let fillblankText = questionData.fillblank_text;
+    
+    // 找到所有 {{}} 並替換為下拉選單
+    let blankIndex = 0;
+    fillblankText = fillblankText.replace(/\{\{[^}]*\}\}/g, function(match) {
+        const blank = questionData.blanks[blankIndex];
+        if (!blank) return match;
+        
+        let selectHTML = `<select id="blank_${blankIndex}_q${questionId}" onchange="saveDropdownFillblankAnswer(${questionId}, ${blankIndex}, this.value)" style="margin: 0 0.25rem; padding: 0.25rem; border: 1px solid #ddd; border-radius: 3px; font-size: 1rem; font-family: Consolas, monospace;">`;
+        selectHTML += '<option value="">請選擇...</option>';
+        
+        blank.options.forEach(option => {
+            // 注意：HTML的option元素不支持多行显示，但我们仍然保留原始格式用于值
+            selectHTML += `<option value="${option}">${option.replace(/\n/g, ' ')}</option>`;
+        });
+        
+        selectHTML += '</select>';
+        blankIndex++;
+        
+        return selectHTML;
+    });
+    
+    fillblankTextElement.innerHTML = fillblankText;
+}
+
+// 儲存下拉選單填空題答案
+function saveDropdownFillblankAnswer(questionId, blankIndex, value) {
+    if (!studentAnswers[questionId]) {
+        studentAnswers[questionId] = {};
+    }
+    studentAnswers[questionId][`blank_${blankIndex}`] = value;
+    autosave();
+}
+
+let draggedElement = null;
+
+function handleDragStart(e) {
+    draggedElement = e.target;
+    e.target.classList.add('dragging');
+}
+
+function handleDragEnd(e) {
+    e.target.classList.remove('dragging');
+    draggedElement = null;
+    
+    // 移除所有高亮效果
+    document.querySelectorAll('.answer-slot').forEach(slot => {
+        slot.classList.remove('slot-highlight', 'drag-over');
+    });
+}
+
+function handleSlotDragOver(e) {
+    e.preventDefault();
+}
+
+function handleSlotDragEnter(e) {
+    e.preventDefault();
+    const targetSlot = e.currentTarget;
+    
+    // 固定區塊不顯示拖拉高亮效果
+    if (targetSlot.dataset.fixed === 'true') {
+        return;
+    }
+    
+    if (draggedElement && !targetSlot.querySelector('.code-block')) {
+        targetSlot.classList.add('slot-highlight');
+    }
+}
+
+function handleSlotDragLeave(e) {
+    // 只有當離開的是答案區塊本身時才移除高亮
+    if (!e.currentTarget.contains(e.relatedTarget)) {
+        e.currentTarget.classList.remove('slot-highlight');
+    }
+}
+
+function handleSlotDrop(e, questionId) {
+    e.preventDefault();
+    e.stopPropagation();
+    
+    if (!draggedElement) return;
+    
+    const targetSlot = e.currentTarget;
+    
+    // 禁止在固定區塊上拖放
+    if (targetSlot.dataset.fixed === 'true') {
+        targetSlot.classList.remove('slot-highlight');
+        alert('此位置是固定的程式碼區塊，無法放置其他程式碼');
+        return;
+    }
+    
+    // 檢查這個區塊是否已經有程式碼塊
+    if (targetSlot.querySelector('.code-block')) {
+        targetSlot.classList.remove('slot-highlight');
+        return;
+    }
+    
+    placeCodeBlock(draggedElement, targetSlot, questionId);
+    updateParsonsAnswer(questionId);
+}
+
+// 將程式碼塊複製到答案區塊（拖放與還原作答共用）
+function placeCodeBlock(sourceBlock, targetSlot, questionId) {
+    const clonedBlock = sourceBlock.cloneNode(true);
+    clonedBlock.classList.remove('dragging');
+    clonedBlock.draggable = false;
+    
+    // 確保代碼塊樣式正確（不顯示標籤）
+    clonedBlock.style.wordBreak = 'keep-all';
+    clonedBlock.style.display = 'block';
+    clonedBlock.style.width = '100%';
+    clonedBlock.style.overflow = 'auto';
+    clonedBlock.style.padding = '0.4rem 1rem';
+    clonedBlock.style.height = 'auto';
+    clonedBlock.style.minHeight = '0';
+    clonedBlock.style.lineHeight = '1.4';
+    
+    // 隱藏原始的提示文字
+    const slotContent = targetSlot.querySelector('.slot-content');
+    slotContent.style.display = 'none';
+    
+    // 添加程式碼塊到區塊中
+    targetSlot.appendChild(clonedBlock);
+    targetSlot.classList.add('slot-occupied');
+    targetSlot.classList.remove('slot-highlight');
+    
+    // 添加移除按鈕
+    addRemoveButton(clonedBlock, targetSlot, questionId);
+}
+
+function addRemoveButton(codeBlock, slot, questionId) {
+    const removeBtn = document.createElement('button');
+    removeBtn.textContent = '✕';
+    removeBtn.style.cssText = 'position: absolute; top: 8px; right: 8px; background: #e74c3c; color: white; border: none; border-radius: 50%; width: 24px; height: 24px; cursor: pointer; font-size: 14px; z-index: 10; display: flex; align-items: center; justify-content: center; font-weight: bold; box-shadow: 0 2px 4px rgba(0,0,0,0.2);';
+    removeBtn.onmouseenter = () => {
+        removeBtn.style.background = '#c0392b';
+        removeBtn.style.transform = 'scale(1.1)';
+    };
+    removeBtn.onmouseleave = () => {
+        removeBtn.style.background = '#e74c3c';
+        removeBtn.style.transform = 'scale(1)';
+    };
+    removeBtn.onclick = (e) => {
+        e.stopPropagation();
+        codeBlock.remove();
+        slot.classList.remove('slot-occupied');
+        
+        // 重新顯示提示文字
+        const slotContent = slot.querySelector('.slot-content');
+        slotContent.style.display = 'flex';
+        
+        updateParsonsAnswer(questionId);
+    };
+    
+    codeBlock.style.position = 'relative';
+    codeBlock.style.paddingRight = '35px'; // 為刪除按鈕預留空間
+    codeBlock.appendChild(removeBtn);
+}
+
+function shuffleCodeBlocks(questionId) {
+    const bank = document.querySelector(`#code-bank-${questionId}`);
+    const blocks = Array.from(bank.children);
+    
+    // Fisher-Yates 洗牌演算法
+    for (let i = blocks.length - 1; i > 0; i--) {
+        const j = Math.floor(Math.random() * (i + 1));
+        bank.appendChild(blocks[j]);
+        [blocks[i], blocks[j]] = [blocks[j], blocks[i]];
+    }
+}
+
+function updateParsonsAnswer(questionId) {
+    const targetZone = document.querySelector(`#code-target-${questionId}`);
+    const answerSlots = targetZone.querySelectorAll('.answer-slot');
+    
+    // 收集每個空格的標籤(A, B, C...)
+    const slotAnswers = {};
+    
+    answerSlots.forEach(slot => {
+        const slotNumber = slot.dataset.slot;
+        
+        // 跳過固定區塊
+        if (slot.dataset.fixed === 'true') {
+            return;
+        }
+        
+        const block = slot.querySelector('.code-block');
+        if (block) {
+            const blockLabel = block.dataset.label;
+            slotAnswers[slotNumber] = blockLabel;
+        }
+    });
+    
+    // 儲存答案
+    studentAnswers[questionId] = {
+        slot_answers: slotAnswers
+    };
+    
+    autosave();
+}
+
+// 收集填空題和下拉選單答案
+function collectTextAnswers() {
+    const fillBlanks = document.querySelectorAll('input[id^="answer-"]');
+    fillBlanks.forEach(input => {
+        const questionId = input.id.replace('answer-', '');
+        studentAnswers[questionId] = input.value;
+    });
+    
+    const dropdowns = document.querySelectorAll('select[id^="answer-"]');
+    dropdowns.forEach(select => {
+        const questionId = select.id.replace('answer-', '');
+        studentAnswers[questionId] = select.value;
+    });
+}
+
+function currentProgress() {
+    collectTextAnswers();
+    return {
+        student_name: document.getElementById('student-name').value,
+        student_email: document.getElementById('student-email').value,
+        answers: studentAnswers,
+        current: currentQuestionIndex,
+        draft_id: draftId
+    };
+}
+
+function autosave() {
+    if (quizStarted) {
+        quizStorage.scheduleSave(currentProgress);
+    }
+}
+
+// 還原頁面載入時就存在的作答元件（選擇題、填空題、下拉選單）
+function restoreStaticAnswers() {
+    document.querySelectorAll('.question-card').forEach(card => {
+        const questionId = card.dataset.questionId;
+        const answer = studentAnswers[questionId];
+        if (answer === undefined || answer === null) return;
+        
+        const type = card.dataset.questionType;
+        if (type === 'single_choice' || type === 'multiple_choice') {
+            const selected = Array.isArray(answer) ? answer : [answer];
+            card.querySelectorAll('.option').forEach(option => {
+                const isSelected = selected.includes(option.getAttribute('data-option-value'));
+                option.classList.toggle('selected', isSelected);
+                option.querySelector('input').checked = isSelected;
+            });
+        } else if (type === 'fill_blank' || type === 'dropdown') {
+            const input = document.getElementById(`answer-${questionId}`);
+            if (input) input.value = answer;
+        }
+    });
+}
+
+function restoreDynamicAnswer(card) {
+    const questionId = card.dataset.questionId;
+    const answer = studentAnswers[questionId];
+    if (!answer || typeof answer !== 'object') return;
+    
+    const type = card.dataset.questionType;
+    if (type === 'dropdown_fillblank') {
+        Object.entries(answer).forEach(([blank, value]) => {
+            const select = document.getElementById(`${blank}_q${questionId}`);
+            if (select) select.value = value;
+        });
+    } else if (type === 'parsons' && answer.slot_answers) {
+        const bank = document.querySelector(`#code-bank-${questionId}`);
+        Object.entries(answer.slot_answers).forEach(([slotNumber, label]) => {
+            const slot = card.querySelector(`.answer-slot[data-slot="${slotNumber}"]`);
+            const block = Array.from(bank.children).find(b => b.dataset.label === label);
+            if (slot && block && slot.dataset.fixed !== 'true' && !slot.querySelector('.code-block')) {
+                placeCodeBlock(block, slot, questionId);
+            }
+        });
+    }
+}
+
+function restoreProgress() {
+    const progress = quizStorage.loadProgress();
+    if (!progress || !progress.student_name) return;
+    
+    document.getElementById('student-name').value = progress.student_name;
+    document.getElementById('student-email').value = progress.student_email || '';
+    Object.assign(studentAnswers, progress.answers || {});
+    draftId = progress.draft_id || null;
+    restoreStaticAnswers();
+    startQuiz();
+    showQuestion(Math.min(progress.current || 0, totalQuestions - 1));
+    showMessage('已還原上次未提交的作答', 'info');
+}
+
+// 上次同步後有變動的題目
+function draftChanges() {
+    collectTextAnswers();
+    const changes = {};
+    Object.entries(studentAnswers).forEach(([questionId, answer]) => {
+        if (JSON.stringify(answer) !== draftSynced[questionId]) {
+            changes[questionId] = answer;
+        }
+    });
+    return changes;
+}
+
+async function syncDraft() {
+    if (!quizStarted || document.getElementById('completion-message').style.display !== 'none') return;
+    try {
+        if (!draftId) {
+            const response = await fetch(draftsUrl, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({
+                    student_name: document.getElementById('student-name').value,
+                    student_email: document.getElementById('student-email').value
+                })
+            });
+            if (!response.ok) return;
+            draftId = (await response.json()).draft_id;
+            draftSynced = {};
+            autosave();
+        }
+        
+        const changes = draftChanges();
+        if (Object.keys(changes).length === 0) return;
+        const response = await fetch(`${draftsUrl}/${draftId}`, {
+            method: 'PATCH',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ changes: changes })
+        });
+        if (response.ok) {
+            Object.entries(changes).forEach(([questionId, answer]) => {
+                draftSynced[questionId] = JSON.stringify(answer);
+            });
+        } else if (response.status === 404) {
+            // 草稿已過期或被刪除，下次重新建立
+            draftId = null;
+        }
+        // 429（儲存過於頻繁）時保留變更，下次一起送出
+    } catch (error) {
+        console.log('草稿同步失敗:', error);
+    }
+}
+
+function startDraftSync() {
+    if (draftSyncTimer === null) {
+        syncDraft();
+        draftSyncTimer = setInterval(syncDraft, DRAFT_SYNC_INTERVAL);
+    }
+}
+
+// 送出待送出的作答；無法連線時保留在本機，恢復連線或稍後自動重送
+async function deliverSubmission() {
+    const pending = quizStorage.loadPending();
+    if (!pending) return;
+    
+    document.getElementById('score-percentage').textContent = '--';
+    document.getElementById('score-details').textContent = '提交中...';
+    const { retry, response, result } = await sendPendingSubmission(pending.url || submitUrl, pending);
+    
+    if (retry) {
+        document.getElementById('score-details').textContent = '目前無法連線，作答已保存在此裝置，恢復連線後會自動送出';
+        setTimeout(deliverSubmission, retryDelay);
+        retryDelay = Math.min(retryDelay * 2, 60000);
+        return;
+    }
+    retryDelay = 2000;
+    
+    if (response.status === 404 && pending.fallback) {
+        // 草稿已不存在：改送完整作答（沿用同一個冪等鍵）
+        quizStorage.savePending(pending.fallback, pending.idempotency_key);
+        return deliverSubmission();
+    }
+    if (response.status === 202) {
+        // 排隊模式：先顯示完成畫面，再輪詢評分結果
+        quizStorage.clear();
+        document.getElementById('score-details').textContent = '評分中...';
+        pollSubmissionStatus(result.status_url);
+    } else if (response.ok) {
+        quizStorage.clear();
+        showQuizResult(result);
+    } else {
+        // 伺服器拒絕（例如測驗已關閉）：保留作答進度，回到作答畫面
+        quizStorage.clearPending();
+        document.getElementById('completion-message').style.display = 'none';
+        document.getElementById('quiz-questions').style.display = 'block';
+        document.getElementById('quiz-progress').style.display = 'block';
+        alert(result.error || '提交失敗，請稍後再試');
+    }
+}
+
+async function submitQuiz() {
+    if (!confirm('確定要提交測驗嗎？提交後將無法修改。')) {
+        return;
+    }
+    
+    // 收集所有答案
+    collectTextAnswers();
+    
+    const studentName = document.getElementById('student-name').value;
+    const studentEmail = document.getElementById('student-email').value;
+    
+    // 沒有記錄到任何答案時，改從畫面上已選取的選項收集
+    if (Object.keys(studentAnswers).length === 0) {
+        document.querySelectorAll('.option.selected').forEach(option => {
+            const questionId = option.closest('.question-card').dataset.questionId;
+            studentAnswers[questionId] = option.getAttribute('data-option-value');
+        });
+    }
+    
+    // 先存為待送出項目，重送時沿用同一個冪等鍵
+    quizStorage.saveProgress(currentProgress());
+    const fullSubmission = {
+        student_name: studentName,
+        student_email: studentEmail,
+        answers: studentAnswers
+    };
+    if (draftId) {
+        // 有伺服器端草稿時只需送出尚未同步的變更
+        quizStorage.savePending({ changes: draftChanges() }, QuizStorage.newIdempotencyKey(),
+                                `${draftsUrl}/${draftId}/submit`, fullSubmission);
+    } else {
+        quizStorage.savePending(fullSubmission, QuizStorage.newIdempotencyKey());
+    }
+    showCompletion();
+    await deliverSubmission();
+}
+
+function showCompletion() {
+    // 隱藏測驗內容
+    document.getElementById('quiz-questions').style.display = 'none';
+    document.getElementById('quiz-progress').style.display = 'none';
+    document.getElementById('completion-message').style.display = 'block';
+    
+    // 滾動到頂部
+    window.scrollTo(0, 0);
+}
+
+function showQuizResult(result) {
+    // 顯示結果
+    document.getElementById('score-percentage').textContent = result.percentage + '%';
+    document.getElementById('score-details').textContent = `得分：${result.score} / ${result.total_points} 分`;
+    
+    // 添加查看詳情按鈕
+    const detailsButton = document.createElement('a');
+    detailsButton.href = `/result/${result.submission_id}`;
+    detailsButton.className = 'btn';
+    detailsButton.style.marginTop = '1rem';
+    detailsButton.textContent = '查看測驗詳情';
+    document.getElementById('score-display').appendChild(detailsButton);
+}
+
+async function pollSubmissionStatus(statusUrl, delay = 1000) {
+    try {
+        const response = await fetch(statusUrl);
+        const status = await response.json();
+        if (response.ok && status.status === 'done') {
+            showQuizResult(status);
+            return;
+        }
+        if (response.ok && status.status === 'failed') {
+            document.getElementById('score-details').textContent = status.error || '評分失敗，請聯繫老師';
+            return;
+        }
+    } catch (error) {
+        console.log('查詢評分狀態失敗:', error);
+    }
+    setTimeout(() => pollSubmissionStatus(statusUrl, Math.min(delay * 1.5, 5000)), delay);
+}
+
+// 頁面載入時初始化
+document.addEventListener('DOMContentLoaded', function() {
+    // 防止意外離開頁面
+    window.addEventListener('beforeunload', function(e) {
+        if (quizStarted && document.getElementById('completion-message').style.display === 'none') {
+            e.preventDefault();
+            e.returnValue = '您還未提交測驗，確定要離開嗎？';
+        }
+    });
+    
+    // 初始渲染 MathJax
+    if (typeof MathJax !== 'undefined') {
+        MathJax.typesetPromise().catch((err) => console.log('MathJax typeset error:', err));
+    }
+    
+    // 填空題與下拉選單沒有個別的事件處理，統一在這裡保存
+    document.getElementById('quiz-questions').addEventListener('input', autosave);
+    document.getElementById('quiz-questions').addEventListener('change', autosave);
+    window.addEventListener('online', () => {
+        retryDelay = 2000;
+        deliverSubmission();
+    });
+    
+    if (quizStorage.loadPending()) {
+        // 上次已確認提交但尚未送達：直接重送
+        quizStarted = true;
+        document.getElementById('student-info-section').style.display = 'none';
+        showCompletion();
+        deliverSubmission();
+    } else {
+        restoreProgress();
+    }
+});
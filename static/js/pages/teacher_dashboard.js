@@ -0,0 +1,88 @@
+function copyQuizLink(accessCode) {
+    const link = window.location.origin + '/quiz/' + accessCode;
+    
+    if (navigator.clipboard) {
+        navigator.clipboard.writeText(link).then(() => {
+            alert('題庫連結已複製到剪貼簿！\n' + link);
+        }).catch(() => {
+            fallbackCopyTextToClipboard(link);
+        });
+    } else {
+        fallbackCopyTextToClipboard(link);
+    }
+}
+
+function fallbackCopyTextToClipboard(text) {
+    const textArea = document.createElement("textarea");
+    textArea.value = text;
+    textArea.style.position = "fixed";
+    textArea.style.left = "-999999px";
+    textArea.style.top = "-999999px";
+    document.body.appendChild(textArea);
+    textArea.focus();
+    textArea.select();
+    
+    try {
+        document.execCommand('copy');
+        alert('題庫連結已複製到剪貼簿！\n' + text);
+    } catch (err) {
+        alert('無法複製連結，請手動複製：\n' + text);
+    }
+    
+    document.body.removeChild(textArea);
+}
+
+async function toggleQuizBank(quizBankId, isActive) {
+    const action = isActive ? '停用' : '啟用';
+    if (!confirm(`確定要${action}這個題庫嗎？`)) {
+        return;
+    }
+    
+    try {
+        const response = await fetch(`/api/quiz-bank/${quizBankId}/toggle`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            }
+        });
+        
+        if (response.ok) {
+            location.reload();
+        } else {
+            alert('操作失敗，請稍後再試');
+        }
+    } catch (error) {
+        alert('網路錯誤，請檢查連線');
+    }
+}
+
+async function deleteQuizBank(quizBankId) {
+    if (!confirm('確定要刪除這個題庫嗎？\n\n⚠️ 警告：此操作將永久刪除題庫及其所有題目，且無法復原！')) {
+        return;
+    }
+    
+    // 再次確認
+    if (!confirm('這是最後確認！\n刪除後所有相關的題目、學生作答紀錄都會被永久刪除。\n\n確定要繼續嗎？')) {
+        return;
+    }
+    
+    try {
+        const response = await fetch(`/api/quiz-bank/${quizBankId}`, {
+            method: 'DELETE',
+            headers: {
+                'Content-Type': 'application/json',
+            }
+        });
+        
+        const result = await response.json();
+        
+        if (response.ok) {
+            alert(result.message);
+            location.reload();
+        } else {
+            alert(result.error || '刪除失敗，請稍後再試');
+        }
+    } catch (error) {
+        alert('網路錯誤，請檢查連線');
+    }
+}
@@ -0,0 +1,94 @@
+// 測驗作答的本機保存
+// 作答過程自動存入 localStorage，重新整理或斷線後可還原；
+// 提交內容連同冪等鍵（Idempotency-Key）先存為待送出項目，送出成功才清除，
+// 重送時沿用同一個鍵，伺服器不會重複建立作答。
+
+class QuizStorage {
+    constructor(accessCode) {
+        this.progressKey = `quiz:${accessCode}:progress`;
+        this.pendingKey = `quiz:${accessCode}:pending`;
+        this.saveTimer = null;
+    }
+
+    static newIdempotencyKey() {
+        if (window.crypto && typeof window.crypto.randomUUID === 'function') {
+            return window.crypto.randomUUID().replace(/-/g, '');
+        }
+        const bytes = new Uint8Array(16);
+        window.crypto.getRandomValues(bytes);
+        return Array.from(bytes, b => b.toString(16).padStart(2, '0')).join('');
+    }
+
+    _read(key) {
+        try {
+            const value = localStorage.getItem(key);
+            return value ? JSON.parse(value) : null;
+        } catch (error) {
+            return null;
+        }
+    }
+
+    _write(key, value) {
+        try {
+            localStorage.setItem(key, JSON.stringify(value));
+        } catch (error) {
+            // 私密瀏覽或空間不足時無法保存，作答仍可正常進行
+            console.log('無法保存作答進度:', error);
+        }
+    }
+
+    loadProgress() {
+        return this._read(this.progressKey);
+    }
+
+    saveProgress(progress) {
+        this._write(this.progressKey, Object.assign({}, progress, { saved_at: Date.now() }));
+    }
+
+    // 連續變更時合併成一次寫入
+    scheduleSave(getProgress, delay = 500) {
+        clearTimeout(this.saveTimer);
+        this.saveTimer = setTimeout(() => this.saveProgress(getProgress()), delay);
+    }
+
+    loadPending() {
+        return this._read(this.pendingKey);
+    }
+
+    // url 為空時送到一般提交網址；fallback 為草稿已不存在時改送的完整作答
+    savePending(body, idempotencyKey, url = null, fallback = null) {
+        this._write(this.pendingKey, {
+            body: body, idempotency_key: idempotencyKey, url: url, fallback: fallback, queued_at: Date.now()
+        });
+    }
+
+    clearPending() {
+        localStorage.removeItem(this.pendingKey);
+    }
+
+    clear() {
+        clearTimeout(this.saveTimer);
+        localStorage.removeItem(this.progressKey);
+        localStorage.removeItem(this.pendingKey);
+    }
+}
+
+// 送出待送出的作答；網路錯誤或伺服器暫時無法處理（5xx、429）時回傳 retry: true
+async function sendPendingSubmission(url, pending) {
+    try {
+        const response = await fetch(url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Idempotency-Key': pending.idempotency_key
+            },
+            body: JSON.stringify(pending.body)
+        });
+        if (response.status >= 500 || response.status === 429) {
+            return { retry: true };
+        }
+        return { retry: false, response: response, result: await response.json() };
+    } catch (error) {
+        return { retry: true };
+    }
+}
@@ -0,0 +1,120 @@
+# 成績統計快取
+# 以每 1% 為一格的分數分布作為基礎資料，平均、最高、及格率與直方圖都由它推導；
+# 新增或刪除成績時就地增量更新，百分位數則在資料變動後重新查詢。
+import math
+import threading
+import time
+
+BUCKET_COUNT = 101  # 0% ~ 100%，每 1% 一格
+
+
+def percentage_bucket(percentage):
+    """百分比所屬的分布格（與 SQL 端 CAST(... AS INTEGER) 一致）"""
+    return min(max(int(percentage), 0), BUCKET_COUNT - 1)
+
+
+class BankStats:
+    """單一題庫的統計基礎資料"""
+
+    def __init__(self, buckets, total, highest, expires_at):
+        self.buckets = buckets
+        self.count = sum(buckets)
+        self.total = total
+        self.highest = highest
+        self.expires_at = expires_at
+        self.percentiles = {}
+
+    def add(self, percentage):
+        self.buckets[percentage_bucket(percentage)] += 1
+        self.count += 1
+        self.total += percentage
+        self.highest = percentage if self.highest is None else max(self.highest, percentage)
+        self.percentiles = {}
+
+    def remove(self, percentage):
+        """移除一筆成績；若移除的是最高分則回傳 False，需重新計算"""
+        if self.highest is None or percentage >= self.highest or self.count <= 1:
+            return False
+        self.buckets[percentage_bucket(percentage)] -= 1
+        self.count -= 1
+        self.total -= percentage
+        self.percentiles = {}
+        return True
+
+    def pass_count(self, threshold):
+        """百分比 >= threshold（0~100 的整數）的筆數"""
+        return sum(self.buckets[percentage_bucket(threshold):])
+
+    def histogram(self, bins):
+        """將 0~100% 等分為 bins 格（最後一格包含 100%）"""
+        width = 100 // bins
+        histogram = []
+        for i in range(bins):
+            start = i * width
+            end = start + width if i < bins - 1 else BUCKET_COUNT
+            histogram.append({
+                'from': start,
+                'to': start + width,
+                'count': sum(self.buckets[start:end])
+            })
+        return histogram
+
+    def percentile_ranks(self, percentiles):
+        """最近排名法：第 p 百分位數為排序後第 ceil(p/100*n) 筆"""
+        return {p: max(1, math.ceil(p / 100 * self.count)) for p in percentiles}
+
+
+class SubmissionStatsCache:
+    """以題庫ID為鍵的統計快取，ttl 秒後過期（多個 worker 時其他 worker 的新增會在過期後反映）"""
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def get(self, quiz_bank_id, load_buckets):
+        """取得統計基礎資料，load_buckets() 回傳 [(格, 筆數, 總和, 最大值), ...]"""
+        stats = self._stats.get(quiz_bank_id)
+        if stats is None or stats.expires_at < time.monotonic():
+            buckets = [0] * BUCKET_COUNT
+            total = 0.0
+            highest = None
+            for bucket, count, bucket_total, bucket_max in load_buckets():
+                buckets[percentage_bucket(bucket)] += count
+                total += bucket_total or 0
+                if bucket_max is not None:
+                    highest = bucket_max if highest is None else max(highest, bucket_max)
+            stats = BankStats(buckets, total, highest, time.monotonic() + self.ttl)
+            with self._lock:
+                self._stats[quiz_bank_id] = stats
+        return stats
+
+    def summary(self, quiz_bank_id, pass_threshold=60):
+        """已快取時回傳摘要統計（不查詢資料庫），否則回傳 None"""
+        stats = self._stats.get(quiz_bank_id)
+        if stats is None or stats.expires_at < time.monotonic():
+            return None
+        count = stats.count
+        return {
+            'count': count,
+            'average_percentage': round(stats.total / count, 2) if count else 0,
+            'highest_percentage': round(stats.highest, 2) if count and stats.highest is not None else 0,
+            'pass_threshold': pass_threshold,
+            'pass_rate': round(stats.pass_count(pass_threshold) / count * 100, 2) if count else 0,
+        }
+
+    def record_submission(self, quiz_bank_id, percentage):
+        with self._lock:
+            stats = self._stats.get(quiz_bank_id)
+            if stats is not None:
+                stats.add(percentage)
+
+    def record_deletion(self, quiz_bank_id, percentage):
+        with self._lock:
+            stats = self._stats.get(quiz_bank_id)
+            if stats is not None and not stats.remove(percentage):
+                self._stats.pop(quiz_bank_id, None)
+
+    def invalidate(self, quiz_bank_id):
+        with self._lock:
+            self._stats.pop(quiz_bank_id, None)
@@ -0,0 +1,29 @@
+# 測試共用設定
+# app 在匯入時依環境變數建立資料庫連線，因此在匯入前將主資料庫與唯讀副本指向暫存的 SQLite 檔案。
+import os
+import sys
+import tempfile
+
+import pytest
+
+TEST_DIR = tempfile.mkdtemp(prefix='quiz-tests-')
+PRIMARY_PATH = os.path.join(TEST_DIR, 'primary.db')
+REPLICA_PATH = os.path.join(TEST_DIR, 'replica.db')
+
+os.environ['FLASK_ENV'] = 'production'
+os.environ['SECRET_KEY'] = 'test'
+os.environ['DATABASE_URL'] = f'sqlite:///{PRIMARY_PATH}'
+os.environ['DATABASE_REPLICA_URLS'] = f'sqlite:///{REPLICA_PATH}'
+os.environ['ARCHIVE_DIR'] = os.path.join(TEST_DIR, 'archive')
+os.environ['SUBMISSION_INGEST_MODE'] = 'sync'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def quiz_app():
+    """已套用所有遷移的 app 模組"""
+    import app as quiz_app
+    with quiz_app.app.app_context():
+        quiz_app.migrations.upgrade(quiz_app.db.engine)
+    return quiz_app
@@ -0,0 +1,34 @@
+# 常用查詢的執行計畫：確認 hot_queries() 中的查詢在遷移後的資料庫上都使用索引
+# 設定 TEST_POSTGRES_URL 時另外在該 PostgreSQL 資料庫上執行（會在其中套用遷移，請使用測試專用的資料庫）
+import os
+
+import pytest
+from sqlalchemy import create_engine
+
+import migrations
+
+
+def _assert_plans_use_indexes(engine, queries):
+    failures = {}
+    with engine.connect() as connection:
+        for name, statement in queries.items():
+            uses_index, plan = migrations.explain(connection, statement)
+            if not uses_index:
+                failures[name] = plan
+    assert not failures, failures
+
+
+def test_hot_queries_use_indexes_on_sqlite(quiz_app):
+    with quiz_app.app.app_context():
+        assert not migrations.pending_migrations(quiz_app.db.engine)
+        _assert_plans_use_indexes(quiz_app.db.engine, quiz_app.hot_queries())
+
+
+@pytest.mark.skipif(not os.environ.get('TEST_POSTGRES_URL'), reason='未設定 TEST_POSTGRES_URL')
+def test_hot_queries_use_indexes_on_postgres(quiz_app):
+    engine = create_engine(os.environ['TEST_POSTGRES_URL'])
+    try:
+        migrations.upgrade(engine)
+        _assert_plans_use_indexes(engine, quiz_app.hot_queries())
+    finally:
+        engine.dispose()
@@ -0,0 +1,177 @@
+# 唯讀副本的讀寫分流：以兩個 SQLite 檔案分別作為主資料庫與副本（副本為某一時點的複本，之後不再同步，模擬複寫延遲）
+import shutil
+
+import pytest
+from sqlalchemy import event
+
+from conftest import PRIMARY_PATH, REPLICA_PATH
+
+WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class StatementRecorder:
+    """記錄主資料庫與副本各自執行的 SQL"""
+
+    def __init__(self, primary, replica):
+        self.statements = []
+        self._listeners = [(primary, self._listener('primary')), (replica, self._listener('replica'))]
+        for engine, listener in self._listeners:
+            event.listen(engine, 'before_cursor_execute', listener)
+
+    def _listener(self, name):
+        def record(conn, cursor, statement, parameters, context, executemany):
+            self.statements.append((name, statement.lstrip().upper()))
+        return record
+
+    def remove(self):
+        for engine, listener in self._listeners:
+            event.remove(engine, 'before_cursor_execute', listener)
+
+    def clear(self):
+        self.statements.clear()
+
+    def on(self, name, table=None):
+        return [s for engine, s in self.statements
+                if engine == name and (table is None or f'FROM {table.upper()}' in s or f'INTO {table.upper()}' in s
+                                       or f'UPDATE {table.upper()}' in s)]
+
+    def writes(self, name):
+        return [s for s in self.on(name) if s.startswith(WRITE_PREFIXES)]
+
+
+def _forget_recent_write(client):
+    """清除「剛寫入過」的記錄，之後的請求回到讀副本"""
+    with client.session_transaction() as session:
+        session.pop('db_written_at', None)
+
+
+@pytest.fixture(scope='module')
+def routing(quiz_app):
+    app, db = quiz_app.app, quiz_app.db
+    assert quiz_app.replicas, '未設定 DATABASE_REPLICA_URLS'
+
+    teacher = app.test_client()
+    teacher.post('/register', json={'username': 'replica-teacher', 'email': 'rt@example.com', 'password': 'pw'})
+    assert teacher.post('/login', json={'username': 'replica-teacher', 'password': 'pw'}).status_code == 200
+    bank = teacher.post('/create-quiz-bank', json={'title': '分流', 'description': ''}).get_json()
+    question_id = teacher.post(f"/api/quiz-bank/{bank['quiz_bank_id']}/questions", json={
+        'title': 'q1', 'question_text': '1+1', 'question_type': 'fill_blank',
+        'question_data': {'correct_answer': '2'}, 'points': 1,
+    }).get_json()['question_id']
+    first = app.test_client().post(f"/api/quiz/{bank['access_code']}/submit", json={
+        'student_name': 'replicated', 'answers': {str(question_id): '2'},
+    }).get_json()
+
+    # 建立副本：目前的主資料庫內容複製為副本，之後主資料庫的寫入不會出現在副本
+    with app.app_context():
+        with db.engine.connect() as connection:
+            connection.exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)')
+    replica = quiz_app.replicas.engines[0]
+    replica.dispose()
+    shutil.copyfile(PRIMARY_PATH, REPLICA_PATH)
+
+    with app.app_context():
+        recorder = StatementRecorder(db.engine, replica)
+    yield {
+        'app': app, 'teacher': teacher, 'bank': bank, 'question_id': question_id,
+        'first_submission_id': first['submission_id'], 'recorder': recorder,
+    }
+    recorder.remove()
+
+
+def _submit(routing, client, name, answer='2'):
+    response = client.post(f"/api/quiz/{routing['bank']['access_code']}/submit", json={
+        'student_name': name, 'answers': {str(routing['question_id']): answer},
+    })
+    assert response.status_code == 200
+    return response.get_json()['submission_id']
+
+
+def test_analytics_reads_use_replica(routing):
+    teacher, bank_id, recorder = routing['teacher'], routing['bank']['quiz_bank_id'], routing['recorder']
+    _forget_recent_write(teacher)
+    for url in (
+        f'/api/quiz-bank/{bank_id}/submissions',
+        f'/api/quiz-bank/{bank_id}/stats',
+        f'/api/quiz-bank/{bank_id}/question-stats',
+        f'/api/quiz-bank/{bank_id}/item-analysis',
+        f'/api/quiz-bank/{bank_id}/similar-submissions',
+        f'/api/quiz-bank/{bank_id}/export?format=csv',
+        '/teacher-dashboard',
+    ):
+        recorder.clear()
+        response = teacher.get(url)
+        response.get_data()  # 匯出為串流回應，讀完內容才會執行查詢
+        assert response.status_code == 200, url
+        assert recorder.on('replica', 'submission'), url
+        assert not recorder.on('primary', 'submission'), url
+        assert not recorder.writes('replica'), url
+
+
+def test_replica_lag_is_visible_to_teacher_reads(routing):
+    teacher, bank_id = routing['teacher'], routing['bank']['quiz_bank_id']
+    _submit(routing, routing['app'].test_client(), 'after-snapshot')
+    _forget_recent_write(teacher)
+    names = [s['student_name'] for s in teacher.get(f'/api/quiz-bank/{bank_id}/submissions').get_json()['submissions']]
+    assert names == ['replicated']
+
+
+def test_submit_writes_to_primary(routing):
+    recorder = routing['recorder']
+    recorder.clear()
+    _submit(routing, routing['app'].test_client(), 'writer')
+    assert recorder.writes('primary')
+    assert recorder.on('primary', 'submission')
+    assert not recorder.on('replica')
+
+
+def test_question_edit_writes_to_primary(routing):
+    teacher, recorder = routing['teacher'], routing['recorder']
+    _forget_recent_write(teacher)
+    recorder.clear()
+    response = teacher.put(f"/api/question/{routing['question_id']}", json={
+        'title': 'q1', 'question_text': '1+1=?', 'question_type': 'fill_blank', 'question_data': {'correct_answer': '2'},
+    })
+    assert response.status_code == 200
+    assert [s for s in recorder.writes('primary') if s.startswith('UPDATE QUESTION')]
+    assert not recorder.on('replica')
+
+
+def test_teacher_reads_primary_right_after_a_write(routing):
+    teacher, bank_id, recorder = routing['teacher'], routing['bank']['quiz_bank_id'], routing['recorder']
+    _forget_recent_write(teacher)
+    teacher.put(f"/api/question/{routing['question_id']}", json={
+        'title': 'q1', 'question_text': '1+1', 'question_type': 'fill_blank', 'question_data': {'correct_answer': '2'},
+    })
+    recorder.clear()
+    assert teacher.get(f'/api/quiz-bank/{bank_id}/submissions').status_code == 200
+    assert recorder.on('primary', 'submission')
+    assert not recorder.on('replica')
+
+
+def test_submitting_student_reads_own_result_from_primary(routing):
+    recorder = routing['recorder']
+    student = routing['app'].test_client()
+    submission_id = _submit(routing, student, 'reader')
+    recorder.clear()
+    response = student.get(f'/result/{submission_id}')
+    assert response.status_code == 200
+    assert 'reader' in response.get_data(as_text=True)
+    assert recorder.on('primary', 'submission')
+    assert not recorder.on('replica')
+
+
+def test_result_falls_back_to_primary_when_replica_lags(routing):
+    recorder = routing['recorder']
+    submission_id = _submit(routing, routing['app'].test_client(), 'lagging')
+    recorder.clear()
+    # 沒有寫入記錄的瀏覽器先讀副本（尚無此作答），再改讀主資料庫
+    response = routing['app'].test_client().get(f'/result/{submission_id}')
+    assert response.status_code == 200
+    assert recorder.on('replica', 'submission')
+    assert recorder.on('primary', 'submission')
+    # 已複製到副本的作答只讀副本
+    recorder.clear()
+    assert routing['app'].test_client().get(f"/result/{routing['first_submission_id']}").status_code == 200
+    assert recorder.on('replica', 'submission')
+    assert not recorder.on('primary', 'submission')